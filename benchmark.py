@@ -0,0 +1,473 @@
+# benchmark.py
+"""
+性能計測用ベンチマーク
+    python benchmark.py setup [--iterations N] [--output result.json]
+    python benchmark.py render [--plans a.json ...] [--iterations N] [--output result.json]
+    python benchmark.py startup [--plan plan.json] [--runs N] [--output result.json]
+    python benchmark.py table [--rows 1000 5000 10000] [--budget-ms MS] [--output result.json]
+
+- setup : 1デッキあたりの固定コスト（Presentation 生成・テーマ準備・SlideFactory 初期化）
+- render: 同梱の設計図 × 全テーマのレンダリング時間（スライド種別ごと）・ピークRSS・出力サイズ
+          リモート画像は合成したローカル画像に差し替えてオフラインで計測する
+- startup: 新しいプロセスでのコールドスタート（import main / import json2Slide の時間、
+           最初と2回目のビルド時間、ウォームアップ後の最初のビルド時間）
+- table : 大きな表1つ（見出し + N 行、続きのスライドに分割）のビルド時間。行数を変えて1行あたりの時間の伸び
+          （線形性）を見る。最大の行数のビルド（レンダリング + 保存）が --budget-ms を超えたら終了コード 1
+          既定の予算は 10,000 行 × 5 列を 10 秒
+"""
+import argparse
+import copy
+import hashlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+THEMES = ("default", "simplenote")
+BUNDLED_PLANS = ("AllTest.json", "plan.json", "plan2.json", "plan3.json", "plan4.json", "plan5.json",
+                 "plan6.json", "plan7.json", "plan8.json", "test.json", "tmp.json")
+FIXTURE_SIZE = (1600, 1000)
+TABLE_ROWS = (1000, 2500, 5000, 10000)
+TABLE_BUDGET_MS = 10000
+# 1行あたりの時間が最小の行数の何倍までなら線形とみなすか
+TABLE_MAX_SCALING = 2.0
+
+
+def _measure(fn: Callable[[], Any], iterations: int) -> Dict[str, float]:
+    """fn を iterations 回実行し、ミリ秒単位の統計を返す"""
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {
+        "mean_ms": round(statistics.mean(samples), 3),
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "min_ms": round(samples[0], 3),
+    }
+
+
+def _theme_instance(name: str):
+    from theme_registry import get_theme
+    return get_theme(name)
+
+
+# ---------------- setup: デッキごとの固定コスト ----------------
+def bench_setup(args) -> Dict[str, Any]:
+    from pptx import Presentation
+    from json2Slide import SlideFactory
+    from theme_registry import ThemeRegistry, layout_for
+    import template_cache
+
+    layout = layout_for(_theme_instance("default"), None)
+
+    def fresh_presentation():
+        prs = Presentation()
+        prs.slide_width = layout.page_w
+        prs.slide_height = layout.page_h
+
+    results = {
+        "presentation_parse": _measure(fresh_presentation, args.iterations),
+        # テーマ定義の読み込み・検証・変換（プロセスで1回だけ払うコスト）
+        "theme_registry_load": _measure(ThemeRegistry, args.iterations),
+        # 全座標パスを1回ずつ引く（変換済みの表を引くだけ）
+        "layout_get_rect_all": _measure(lambda: [layout.get_rect(p) for p in layout.paths()], args.iterations),
+    }
+
+    for name in THEMES:
+        theme = _theme_instance(name)
+        template_cache.clear()
+        t0 = time.perf_counter()
+        template_cache.get_base_presentation(theme, layout.page_w, layout.page_h, lambda p: f"images/{p}")
+        results[f"{name}.template_build"] = {"once_ms": round((time.perf_counter() - t0) * 1000, 3)}
+        # テンプレートファイルの解決（stat とハッシュ済みの索引を引くだけ。リクエストごとのコスト）
+        results[f"{name}.template_lookup"] = _measure(lambda: template_cache.template_for(theme), args.iterations)
+        results[f"{name}.template_clone"] = _measure(
+            lambda: template_cache.new_presentation(theme, layout.page_w, layout.page_h, lambda p: f"images/{p}"),
+            args.iterations
+        )
+        results[f"{name}.factory_init"] = _measure(
+            lambda: SlideFactory({"slides": []}, theme), args.iterations
+        )
+
+    for key, value in results.items():
+        print(f"{key:32s} " + "  ".join(f"{k}={v}" for k, v in value.items()))
+    return results
+
+
+# ---------------- render: 設計図ごとのレンダリング性能 ----------------
+def _make_fixtures(plans: Dict[str, Any], fixtures_dir: str, size=FIXTURE_SIZE) -> Dict[str, str]:
+    """設計図が参照するリモート画像ごとに合成 JPEG を作り、URL -> ローカルパスの対応を返す"""
+    from PIL import Image
+    from image_prefetch import collect_image_refs
+
+    os.makedirs(fixtures_dir, exist_ok=True)
+    fixtures = {}
+    for plan in plans.values():
+        for ref in collect_image_refs(plan):
+            if not ref.startswith(("http://", "https://")) or ref in fixtures:
+                continue
+            digest = hashlib.sha1(ref.encode("utf-8")).digest()
+            path = os.path.join(fixtures_dir, f"{digest.hex()[:16]}.jpg")
+            if not os.path.exists(path):
+                # URL ごとに色の違うグラデーション（写真相当のサイズ・圧縮率になるようにする）
+                w, h = size
+                base = Image.linear_gradient("L").resize((w, h))
+                im = Image.merge("RGB", (
+                    base.point(lambda v, k=digest[0]: (v + k) % 256),
+                    base.transpose(Image.FLIP_LEFT_RIGHT).point(lambda v, k=digest[1]: (v + k) % 256),
+                    base.rotate(90, expand=False).point(lambda v, k=digest[2]: (v + k) % 256),
+                ))
+                im.save(path, "JPEG", quality=90)
+            fixtures[ref] = path
+    return fixtures
+
+
+def _localize(value, fixtures: Dict[str, str]):
+    """設計図中のリモート画像 URL をローカルの合成画像に置き換える"""
+    if isinstance(value, dict):
+        return {k: _localize(v, fixtures) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_localize(v, fixtures) for v in value]
+    if isinstance(value, str) and value in fixtures:
+        return fixtures[value]
+    return value
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KB、macOS はバイト単位
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def _render_task(plan: Dict[str, Any], theme_name: str, warmup: int, iterations: int) -> Dict[str, Any]:
+    """子プロセスで1デッキを繰り返しレンダリングし、フェーズ・スライド種別ごとの時間を返す"""
+    from json2Slide import SlideFactory
+
+    theme = _theme_instance(theme_name)
+    walls, phases = [], defaultdict(float)
+    types = defaultdict(lambda: {"count": 0, "total_ms": 0.0})
+    output_bytes = 0
+    text_styles = {}
+
+    for i in range(warmup + iterations):
+        timed = i >= warmup
+        t_start = time.perf_counter()
+        sf = SlideFactory(plan, theme)
+        t_init = time.perf_counter()
+        for spec in plan.get("slides", []):
+            t0 = time.perf_counter()
+            sf.add_slide(spec)
+            if timed:
+                entry = types[str(spec.get("type"))]
+                entry["count"] += 1
+                entry["total_ms"] += (time.perf_counter() - t0) * 1000
+        t_render = time.perf_counter()
+        buffer = io.BytesIO()
+        sf.save(buffer)
+        t_end = time.perf_counter()
+
+        if timed:
+            walls.append((t_end - t_start) * 1000)
+            phases["init_ms"] += (t_init - t_start) * 1000
+            phases["render_ms"] += (t_render - t_init) * 1000
+            phases["save_ms"] += (t_end - t_render) * 1000
+            output_bytes = len(buffer.getvalue())
+            text_styles = dict(sf.metrics["text_styles"])
+
+    walls.sort()
+    return {
+        "wall_ms": {
+            "mean": round(statistics.mean(walls), 1),
+            "p50": round(walls[len(walls) // 2], 1),
+            "min": round(walls[0], 1),
+        },
+        "phases_ms": {k: round(v / iterations, 1) for k, v in phases.items()},
+        "slide_types": {k: {"count": v["count"] // iterations, "total_ms": round(v["total_ms"] / iterations, 2)}
+                        for k, v in types.items()},
+        "peak_rss_mb": _peak_rss_mb(),
+        "output_bytes": output_bytes,
+        # 既定テキストスタイルとの差分だけを書いたことで省いた a:rPr のバイト数（非圧縮）
+        "text_styles": text_styles,
+        "output_slides": len(sf.prs.slides),
+    }
+
+
+def bench_render(args) -> Dict[str, Any]:
+    plans = {}
+    for path in args.plans:
+        with open(path, "r", encoding="utf-8") as f:
+            plans[path] = json.load(f)
+
+    fixtures_dir = args.fixtures_dir or os.path.join(tempfile.gettempdir(), "json2slide_bench_fixtures")
+    fixtures = _make_fixtures(plans, fixtures_dir)
+    print(f"fixtures: {len(fixtures)} images -> {fixtures_dir}")
+
+    # キャッシュの影響を受けないよう、子プロセスはスライド・デッキキャッシュ無効で動かす
+    os.environ["DECK_CACHE"] = "0"
+    os.environ["SLIDE_CACHE"] = "0"
+
+    decks: List[Dict[str, Any]] = []
+    started_at = time.perf_counter()
+    # 1デッキ1プロセス（ピークRSSをデッキごとに分けて測る）
+    with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as ex:
+        for path, plan in plans.items():
+            local_plan = _localize(copy.deepcopy(plan), fixtures)
+            for theme_name in args.themes:
+                result = ex.submit(_render_task, local_plan, theme_name, args.warmup, args.iterations).result()
+                slides = sum(v["count"] for v in result["slide_types"].values())
+                decks.append({"plan": path, "theme": theme_name, "slides": slides, **result})
+                print(f"{path:14s} {theme_name:11s} slides={slides:3d} wall={result['wall_ms']['mean']:8.1f}ms "
+                      f"init={result['phases_ms']['init_ms']:6.1f} render={result['phases_ms']['render_ms']:7.1f} "
+                      f"save={result['phases_ms']['save_ms']:7.1f} rss={result['peak_rss_mb']}MB "
+                      f"bytes={result['output_bytes']} rpr_saved={result['text_styles'].get('saved_bytes', 0)}")
+    elapsed = time.perf_counter() - started_at
+
+    # スライド種別ごとの集計（全デッキ・全テーマ）
+    slide_types = defaultdict(lambda: {"count": 0, "total_ms": 0.0})
+    for deck in decks:
+        for name, v in deck["slide_types"].items():
+            slide_types[name]["count"] += v["count"]
+            slide_types[name]["total_ms"] += v["total_ms"]
+    for v in slide_types.values():
+        v["total_ms"] = round(v["total_ms"], 2)
+        v["mean_ms"] = round(v["total_ms"] / v["count"], 3) if v["count"] else 0.0
+
+    print(f"\n{'slide type':16s} {'count':>6s} {'mean_ms':>9s} {'total_ms':>10s}")
+    for name, v in sorted(slide_types.items(), key=lambda kv: -kv[1]["total_ms"]):
+        print(f"{name:16s} {v['count']:6d} {v['mean_ms']:9.3f} {v['total_ms']:10.2f}")
+
+    totals = {
+        "decks": len(decks),
+        "slides": sum(d["slides"] for d in decks),
+        "wall_ms": round(sum(d["wall_ms"]["mean"] for d in decks), 1),
+        "output_bytes": sum(d["output_bytes"] for d in decks),
+        "text_style_saved_bytes": sum(d["text_styles"].get("saved_bytes", 0) for d in decks),
+        "max_peak_rss_mb": max((d["peak_rss_mb"] or 0) for d in decks) if decks else None,
+        "elapsed_s": round(elapsed, 2),
+    }
+    print(f"\ntotal: {totals['decks']} decks, {totals['slides']} slides, wall {totals['wall_ms']}ms/iteration, "
+          f"{totals['output_bytes']} bytes (rPr saved {totals['text_style_saved_bytes']}), peak rss {totals['max_peak_rss_mb']}MB")
+    return {"config": {"iterations": args.iterations, "warmup": args.warmup, "fixture_size": list(FIXTURE_SIZE)},
+            "decks": decks, "slide_types": dict(slide_types), "totals": totals}
+
+
+# ---------------- table: 大きな表 ----------------
+def _table_plan(n_rows: int, n_cols: int) -> Dict[str, Any]:
+    """n_rows 行の表1つの設計図（7行に1行は折り返す長さの説明文）"""
+    headers = ["名前", "ID", "値", "説明", "区分", "担当", "備考", "更新日"][:n_cols]
+    headers += [f"列{j + 1}" for j in range(len(headers), n_cols)]
+    rows = []
+    for i in range(n_rows):
+        row = [f"項目{i}", f"ID-{i:06d}", str(i * 37 % 1000),
+               "長めの説明テキストで、セルの中で折り返しが発生する行" if i % 7 == 0 else "説明テキスト",
+               f"区分{i % 13}", f"担当{i % 5}", "", f"2024-{i % 12 + 1:02d}-01"]
+        rows.append((row + [str(i)] * n_cols)[:n_cols])
+    return {"slides": [{"type": "table", "title": f"{n_rows} 行の表", "headers": headers, "rows": rows,
+                        "bodyText": "表の下の本文", "note": "ノート"}]}
+
+
+def bench_table(args) -> Dict[str, Any]:
+    os.environ["DECK_CACHE"] = "0"
+    os.environ["SLIDE_CACHE"] = "0"
+
+    cases = []
+    with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as ex:
+        for theme_name in args.themes:
+            for n_rows in sorted(args.rows):
+                plan = _table_plan(n_rows, args.cols)
+                result = ex.submit(_render_task, plan, theme_name, args.warmup, args.iterations).result()
+                # 設計図の読み込みを除いた、デッキの構築（初期化・レンダリング・保存）の時間
+                wall_ms = result["wall_ms"]["mean"]
+                case = {"theme": theme_name, "rows": n_rows, "cols": args.cols,
+                        "slides": result["output_slides"], "wall_ms": wall_ms,
+                        "us_per_row": round(wall_ms * 1000 / n_rows, 1),
+                        "phases_ms": result["phases_ms"], "peak_rss_mb": result["peak_rss_mb"],
+                        "output_bytes": result["output_bytes"]}
+                cases.append(case)
+                print(f"{theme_name:11s} rows={n_rows:6d} slides={case['slides']:4d} wall={wall_ms:9.1f}ms "
+                      f"({case['us_per_row']:7.1f}us/row) render={result['phases_ms']['render_ms']:8.1f} "
+                      f"save={result['phases_ms']['save_ms']:7.1f} rss={result['peak_rss_mb']}MB "
+                      f"bytes={result['output_bytes']}")
+
+    # 線形性: テーマごとに、最大の行数の1行あたりの時間 / 最小の行数の1行あたりの時間
+    checks = {}
+    ok = True
+    for theme_name in args.themes:
+        runs = [c for c in cases if c["theme"] == theme_name]
+        smallest, largest = runs[0], runs[-1]
+        scaling = round(largest["us_per_row"] / smallest["us_per_row"], 2)
+        within_budget = largest["wall_ms"] <= args.budget_ms
+        linear = scaling <= args.max_scaling
+        ok = ok and within_budget and linear
+        checks[theme_name] = {"rows": largest["rows"], "wall_ms": largest["wall_ms"], "budget_ms": args.budget_ms,
+                              "within_budget": within_budget, "scaling": scaling, "linear": linear}
+        print(f"{'✅' if within_budget and linear else '❌'} {theme_name}: {largest['rows']} 行 "
+              f"{largest['wall_ms']:.0f}ms（予算 {args.budget_ms}ms）、1行あたりの時間 {smallest['rows']} 行の "
+              f"{scaling} 倍（上限 {args.max_scaling} 倍）")
+
+    return {"config": {"rows": sorted(args.rows), "cols": args.cols, "iterations": args.iterations,
+                       "warmup": args.warmup, "budget_ms": args.budget_ms, "max_scaling": args.max_scaling},
+            "cases": cases, "checks": checks, "ok": ok}
+
+
+# ---------------- startup: コールドスタート ----------------
+# 計測は毎回新しいインタプリタで行う（モジュール・テンプレート・画像がどれも未読み込みの状態）
+_STARTUP_SCRIPT = """
+import io, json, sys, time
+t0 = time.perf_counter()
+if {mode!r} == "api":
+    import main
+    result = {{"import_main_ms": (time.perf_counter() - t0) * 1000,
+              "pptx_loaded": "pptx" in sys.modules}}
+else:
+    with open({plan_path!r}, "r", encoding="utf-8") as f:
+        plan = json.load(f)
+    import json2Slide
+    result = {{"import_json2slide_ms": (time.perf_counter() - t0) * 1000}}
+    if {mode!r} == "warm":
+        t0 = time.perf_counter()
+        json2Slide.warm_up()
+        result["warm_up_ms"] = (time.perf_counter() - t0) * 1000
+    for key in ("first_build_ms", "second_build_ms"):
+        t0 = time.perf_counter()
+        json2Slide.build_pptx_from_plan(plan, io.BytesIO(), themename={theme!r})
+        result[key] = (time.perf_counter() - t0) * 1000
+print(json.dumps(result))
+"""
+
+
+def _run_startup(mode: str, plan_path: str, theme: str, env: Dict[str, str]) -> Dict[str, float]:
+    script = _STARTUP_SCRIPT.format(mode=mode, plan_path=plan_path, theme=theme)
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, env=env,
+                          cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - t0) * 1000
+    return result
+
+
+def bench_startup(args) -> Dict[str, Any]:
+    with open(args.plan, "r", encoding="utf-8") as f:
+        plan = json.load(f)
+    fixtures_dir = args.fixtures_dir or os.path.join(tempfile.gettempdir(), "json2slide_bench_fixtures")
+    plan = _localize(plan, _make_fixtures({args.plan: plan}, fixtures_dir))
+
+    with tempfile.TemporaryDirectory(prefix="json2slide_startup_") as work_dir:
+        plan_path = os.path.join(work_dir, "plan.json")
+        with open(plan_path, "w", encoding="utf-8") as f:
+            json.dump(plan, f, ensure_ascii=False)
+
+        # キャッシュは無効・空の状態で測る（保存先やジョブDBも一時ディレクトリに向ける）
+        env = dict(os.environ, DECK_CACHE="0", SLIDE_CACHE="0",
+                   IMAGE_CACHE_DIR=os.path.join(work_dir, "images"),
+                   JOB_DB_PATH=os.path.join(work_dir, "jobs.sqlite3"))
+        samples = defaultdict(list)
+        for _ in range(args.runs):
+            for mode in ("api", "cold", "warm"):
+                for key, value in _run_startup(mode, plan_path, args.theme, env).items():
+                    samples[f"{mode}.{key}"].append(value)
+
+    results = {}
+    for key, values in samples.items():
+        if isinstance(values[0], bool):
+            results[key] = any(values)
+            print(f"{key:32s} {results[key]}")
+            continue
+        values.sort()
+        results[key] = {
+            "mean_ms": round(statistics.mean(values), 1),
+            "p50_ms": round(values[len(values) // 2], 1),
+            "min_ms": round(values[0], 1),
+        }
+        print(f"{key:32s} " + "  ".join(f"{k}={v}" for k, v in results[key].items()))
+    return {"config": {"plan": args.plan, "theme": args.theme, "runs": args.runs}, "results": results}
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _write_results(kind: str, results: Dict[str, Any], path: str):
+    payload = {
+        "benchmark": kind,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    print(f"✅ 結果を保存しました: {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="json2Slide ベンチマーク")
+    sub = parser.add_subparsers(dest="kind", required=True)
+
+    p_setup = sub.add_parser("setup", help="デッキごとの固定コストを計測")
+    p_setup.add_argument("--iterations", type=int, default=50)
+    p_setup.add_argument("--output", help="結果JSONの出力先")
+    p_setup.set_defaults(func=bench_setup)
+
+    p_render = sub.add_parser("render", help="同梱の設計図のレンダリング性能を計測")
+    p_render.add_argument("--plans", nargs="+", default=list(BUNDLED_PLANS))
+    p_render.add_argument("--themes", nargs="+", default=list(THEMES), choices=THEMES)
+    p_render.add_argument("--iterations", type=int, default=3)
+    p_render.add_argument("--warmup", type=int, default=1)
+    p_render.add_argument("--fixtures-dir", help="合成画像の置き場所（既定: 一時ディレクトリ）")
+    p_render.add_argument("--output", help="結果JSONの出力先")
+    p_render.set_defaults(func=bench_render)
+
+    p_startup = sub.add_parser("startup", help="import とコールドスタート時のビルド時間を計測")
+    p_startup.add_argument("--plan", default="plan.json")
+    p_startup.add_argument("--theme", default="default", choices=THEMES)
+    p_startup.add_argument("--runs", type=int, default=5)
+    p_startup.add_argument("--fixtures-dir", help="合成画像の置き場所（既定: 一時ディレクトリ）")
+    p_startup.add_argument("--output", help="結果JSONの出力先")
+    p_startup.set_defaults(func=bench_startup)
+
+    p_table = sub.add_parser("table", help="大きな表のビルド時間と線形性を計測")
+    p_table.add_argument("--rows", nargs="+", type=int, default=list(TABLE_ROWS))
+    p_table.add_argument("--cols", type=int, default=5)
+    p_table.add_argument("--themes", nargs="+", default=list(THEMES), choices=THEMES)
+    p_table.add_argument("--iterations", type=int, default=1)
+    p_table.add_argument("--warmup", type=int, default=0)
+    p_table.add_argument("--budget-ms", type=float, default=TABLE_BUDGET_MS,
+                         help="最大の行数のビルド時間の上限（ミリ秒）")
+    p_table.add_argument("--max-scaling", type=float, default=TABLE_MAX_SCALING,
+                         help="1行あたりの時間の伸びの上限（最大 / 最小の行数）")
+    p_table.add_argument("--output", help="結果JSONの出力先")
+    p_table.set_defaults(func=bench_table)
+
+    args = parser.parse_args(argv)
+    results = args.func(args)
+    if args.output:
+        _write_results(args.kind, results, args.output)
+    # 予算・線形性の判定がある計測は、満たさなければ失敗として終了する
+    return 0 if results.get("ok", True) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+# build_executor.py
+"""
+PPTX ビルドをイベントループの外で実行するエグゼキュータ層
+- inline : 呼び出し元でそのまま実行（デバッグ用・イベントループをブロックする）
+- thread : スレッドプールで実行
+- process: プロセスプールで実行（既定）
+キュー待ち時間とビルド時間を分けて計測して返す
+out_path を省略するとメモリ上のバッファに保存し、PPTX 本体を info["data"] (bytes) で返す
+profile=True（または BUILD_PROFILE=1）ならワーカー内で cProfile を掛け、結果を info["profile"] で返す
+BUILD_WARMUP=1（既定）なら各ワーカーの起動時に json2Slide の読み込みとテーマ別ベースの構築を済ませる
+（API の起動時に warm_up をバックグラウンドで呼び、最初のリクエストに起動コストを払わせない）
+"""
+import asyncio
+import io
+import os
+import sys
+import threading
+import time
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+import metrics
+
+from profiling import profile_requested, run_profiled
+
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+
+def _run_build(plan: Dict[str, Any], out_path: Optional[str], themename: str, submitted_at: float,
+               use_cache: bool = True, profile: bool = False) -> Dict[str, Any]:
+    """ワーカー側で実行されるビルド本体（プロセスプール用にトップレベル関数）"""
+    from json2Slide import build_pptx_from_plan
+
+    buffer = io.BytesIO() if out_path is None else None
+    target = buffer if buffer is not None else out_path
+
+    def build():
+        return build_pptx_from_plan(plan, target, themename=themename, use_cache=use_cache)
+
+    started_at = time.time()
+    if profile:
+        info, info_profile = run_profiled(build, plan, themename)
+        info["profile"] = info_profile
+    else:
+        info = build()
+    if buffer is not None:
+        info["data"] = buffer.getvalue()
+    finished_at = time.time()
+
+    info["timings"] = {
+        "queue_wait_ms": round((started_at - submitted_at) * 1000, 1),
+        "build_ms": round((finished_at - started_at) * 1000, 1),
+    }
+    return info
+
+
+def _warm_up_worker():
+    """ワーカーの初期化（プロセスプールでは initializer として各子プロセスで1回だけ走る）"""
+    from json2Slide import warm_up
+    warm_up()
+
+
+class BuildExecutor:
+    def __init__(self, mode: Optional[str] = None, workers: Optional[int] = None):
+        mode = (mode or os.getenv("BUILD_EXECUTOR", "process")).lower()
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"BUILD_EXECUTOR は {EXECUTOR_MODES} のいずれかを指定してください: {mode}")
+
+        self.mode = mode
+        self.workers = int(workers or os.getenv("BUILD_WORKERS", "0")) or (os.cpu_count() or 1)
+        self.warmup = os.getenv("BUILD_WARMUP", "1") != "0"
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._in_flight = 0
+
+    def _get_pool(self):
+        # プールは最初のビルド（か warm_up）の時に生成する
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    if self.mode == "thread":
+                        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pptx-build")
+                    else:
+                        initializer = _warm_up_worker if self.warmup else None
+                        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=initializer)
+        return self._pool
+
+    def _discard_pool(self, pool):
+        """壊れたプールを捨てる（次の _get_pool で作り直す）。他の呼び出しが作り直した後なら何もしない"""
+        with self._pool_lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def warm_up(self) -> Dict[str, Any]:
+        """
+        ワーカーを起動して初期化まで済ませる（ブロッキング。API ではスレッドに逃がして呼ぶ）
+        プロセスプールは全ワーカーを立ち上げ、initializer の完了を待つ
+        """
+        t0 = time.perf_counter()
+        if not self.warmup:
+            workers = 0
+        elif self.mode == "process":
+            pool = self._get_pool()
+            # 空きワーカーが無いと新しいプロセスが起動されるので、ワーカー数ぶんまとめて投入する
+            futures = [pool.submit(os.getpid) for _ in range(self.workers)]
+            workers = len({f.result() for f in futures})
+        else:
+            # inline / thread はモジュールとベースをプロセス内で共有するので1回で足りる
+            _warm_up_worker()
+            workers = 1
+        return {"mode": self.mode, "workers": workers, "ms": round((time.perf_counter() - t0) * 1000, 1)}
+
+    async def run(self, plan: Dict[str, Any], out_path, themename: str, use_cache: bool = True,
+                  profile: bool = False) -> Dict[str, Any]:
+        """ビルドを投入して完了まで待ち、ビルド情報（timings, cache, slides[, data, profile]）を返す"""
+        submitted_at = time.time()
+        out_path = None if out_path is None else str(out_path)
+        profile = profile_requested(profile)
+
+        self._in_flight += 1
+        metrics.set_build_load(self._in_flight, self.workers)
+        try:
+            if self.mode == "inline":
+                info = _run_build(plan, out_path, themename, submitted_at, use_cache, profile)
+            else:
+                loop = asyncio.get_running_loop()
+                # ワーカーが落ちる（OOM kill など）とプロセスプールは壊れたままになるので、
+                # プールを作り直して1回だけ再実行する
+                for attempt in (1, 2):
+                    pool = self._get_pool()
+                    try:
+                        info = await loop.run_in_executor(
+                            pool, _run_build, plan, out_path, themename, submitted_at, use_cache, profile
+                        )
+                        break
+                    except BrokenProcessPool:
+                        self._discard_pool(pool)
+                        if attempt == 2:
+                            raise
+                        print("[WARN] ビルドワーカーが異常終了しました。プロセスプールを作り直して再実行します",
+                              file=sys.stderr, flush=True)
+        finally:
+            self._in_flight -= 1
+            metrics.set_build_load(self._in_flight, self.workers)
+
+        metrics.observe_build(info, themename)
+
+        timings = info["timings"]
+        print(
+            f"[BUILD] mode={self.mode} theme={themename} cache={info['cache']['status']} "
+            f"slides_reused={info['slides']['reused']} slides_rendered={info['slides']['rendered']} "
+            f"queue_wait={timings['queue_wait_ms']}ms build={timings['build_ms']}ms",
+            file=sys.stderr, flush=True
+        )
+        if info.get("profile", {}).get("kept"):
+            print(f"[PROFILE] {info['profile']['summary']}", file=sys.stderr, flush=True)
+        return info
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
@@ -0,0 +1,189 @@
+# deck_cache.py
+"""
+完成デッキ(PPTX)のキャッシュ
+- キー = 正規化した設計図JSON + テーマ名 + レンダラーバージョン + 画像の内容ハッシュ
+         + 出力に影響する設定値 の sha256
+- ヒットすればレンダリングせずに前回の PPTX（と、あれば Blob URL）を返す
+- ディスク上に <key>.pptx と <key>.json（メタ情報）を置き、合計サイズ・件数で上限管理する
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from typing import Any, Dict, List, Optional
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "json2slide_deck_cache")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 1000
+
+CACHE_HIT = "hit"
+CACHE_MISS = "miss"
+CACHE_BYPASS = "bypass"
+
+
+def canonical_json(plan: Dict[str, Any]) -> str:
+    """キー順・区切りを固定した JSON 文字列（同じ内容なら同じ文字列になる）"""
+    return json.dumps(plan, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+def plan_fingerprint(plan: Dict[str, Any]) -> str:
+    return hashlib.sha256(canonical_json(plan).encode("utf-8")).hexdigest()
+
+
+def deck_key(plan: Dict[str, Any], themename: str, renderer_version: str,
+             image_hashes: Dict[str, str], options: Dict[str, Any] = None) -> str:
+    h = hashlib.sha256()
+    h.update(canonical_json(plan).encode("utf-8"))
+    h.update(b"\0theme=" + str(themename).encode("utf-8"))
+    h.update(b"\0renderer=" + renderer_version.encode("utf-8"))
+    for ref in sorted(image_hashes):
+        h.update(f"\0img={ref}={image_hashes[ref]}".encode("utf-8"))
+    if options:
+        h.update(b"\0opts=" + canonical_json(options).encode("utf-8"))
+    return h.hexdigest()
+
+
+class DeckCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _pptx_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pptx")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_meta(self, key: str) -> Dict[str, Any]:
+        try:
+            with open(self._meta_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, key: str, meta: Dict[str, Any]):
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, self._meta_path(key))
+
+    # ---------------- 公開API ----------------
+    def get(self, key: str) -> Optional[str]:
+        """キャッシュ済み PPTX のパスを返す（無ければ None）"""
+        path = self._pptx_path(key)
+        try:
+            # LRU 判定用に最終アクセス時刻を更新
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put(self, key: str, src):
+        """生成済み PPTX（ファイルパス、またはバイナリストリーム）をキャッシュに登録する"""
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        if isinstance(src, (str, os.PathLike)):
+            os.close(fd)
+            shutil.copyfile(src, tmp)
+        else:
+            # ストリームは先頭から読み、読み終えたら元の位置に戻す
+            pos = src.tell()
+            src.seek(0)
+            with os.fdopen(fd, "wb") as f:
+                shutil.copyfileobj(src, f)
+            src.seek(pos)
+        os.replace(tmp, self._pptx_path(key))
+        self._write_meta(key, {"created_at": time.time(), "size": os.path.getsize(self._pptx_path(key))})
+        self._evict()
+
+    def get_url(self, key: str, min_valid_seconds: float = 24 * 60 * 60) -> Optional[str]:
+        """このデッキをアップロード済みで、URL の有効期限が十分残っていればその URL を返す"""
+        stored = self.get_stored(key, min_valid_seconds)
+        return stored["url"] if stored else None
+
+    def get_stored(self, key: str, min_valid_seconds: float = 24 * 60 * 60) -> Optional[Dict[str, Any]]:
+        """get_url と同じ条件で、URL と保存先の Blob 名（記録があれば）を返す"""
+        meta = self._read_meta(key)
+        url, expires_at = meta.get("url"), meta.get("url_expires_at", 0)
+        if url and expires_at - time.time() > min_valid_seconds:
+            return {"url": url, "blob_name": meta.get("blob_name")}
+        return None
+
+    def set_url(self, key: str, url: str, expires_at: float, blob_name: Optional[str] = None):
+        if not os.path.exists(self._pptx_path(key)):
+            return
+        meta = self._read_meta(key)
+        meta.update(url=url, url_expires_at=expires_at, blob_name=blob_name)
+        self._write_meta(key, meta)
+
+    def drop_url(self, key: str):
+        """保存先から消えていた URL を忘れる（次のヒットで再アップロードさせる）"""
+        meta = self._read_meta(key)
+        if meta.pop("url", None) is not None:
+            meta.pop("url_expires_at", None)
+            meta.pop("blob_name", None)
+            self._write_meta(key, meta)
+
+    def invalidate(self, key: str) -> bool:
+        removed = False
+        for path in (self._pptx_path(key), self._meta_path(key)):
+            try:
+                os.remove(path)
+                removed = True
+            except OSError:
+                pass
+        return removed
+
+    def clear(self) -> int:
+        keys = [name[:-5] for name in os.listdir(self.cache_dir) if name.endswith(".pptx")]
+        for key in keys:
+            self.invalidate(key)
+        return len(keys)
+
+    def stats(self) -> Dict[str, int]:
+        entries = self._entries()
+        return {"entries": len(entries), "bytes": sum(size for _, size, _ in entries)}
+
+    # ---------------- 上限管理 ----------------
+    def _entries(self) -> List:
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pptx"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((name[:-5], st.st_size, st.st_mtime))
+        return entries
+
+    def _evict(self):
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda e: e[2])
+            total = sum(size for _, size, _ in entries)
+            while entries and (total > self.max_bytes or len(entries) > self.max_entries):
+                key, size, _ = entries.pop(0)
+                self.invalidate(key)
+                total -= size
+
+
+_shared_cache = None
+
+
+def get_deck_cache() -> DeckCache:
+    """プロセス全体で共有するデッキキャッシュ（環境変数で設定）"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = DeckCache(
+            cache_dir=os.getenv("DECK_CACHE_DIR", DEFAULT_CACHE_DIR),
+            max_bytes=int(os.getenv("DECK_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+            max_entries=int(os.getenv("DECK_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+        )
+    return _shared_cache
@@ -0,0 +1,425 @@
+# image_cache.py
+"""
+リクエストをまたいで共有するプロセス全体の画像キャッシュ
+- メモリ層: 内容ハッシュ(sha256)をキーにした LRU（バイト数上限あり）
+- ディスク層: blobs/ に内容ハッシュ名で保存、urls/ に URL → ハッシュの索引を保存
+  （同じディレクトリを使う別プロセスとも共有できる）
+- メモリ上の URL 索引も件数上限つきの LRU（溢れた分はディスクの索引から読み直す）
+- URL 索引には TTL があり、期限切れのリモート画像は ETag / Last-Modified を使った
+  条件付きGETで再検証する（304 なら本体を再ダウンロードしない）
+- IMAGE_CACHE_STALE_WHILE_REVALIDATE=1 なら期限切れでも手元の画像を即返し、
+  再検証はバックグラウンドで行う
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "json2slide_image_cache")
+DEFAULT_MEM_BYTES = 256 * 1024 * 1024
+DEFAULT_DISK_BYTES = 2 * 1024 * 1024 * 1024
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_INDEX_ENTRIES = 10000
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class ImageCache:
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_CACHE_DIR, mem_bytes: int = DEFAULT_MEM_BYTES,
+                 disk_bytes: int = DEFAULT_DISK_BYTES, ttl: float = DEFAULT_TTL,
+                 index_entries: int = DEFAULT_INDEX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.mem_limit = mem_bytes
+        self.disk_limit = disk_bytes
+        self.ttl = ttl
+        self.index_limit = index_entries
+
+        self._lock = threading.RLock()
+        self._blobs = OrderedDict()   # digest -> bytes（LRU順）
+        self._index = OrderedDict()   # key -> {"digest", "fetched_at"}（LRU順、件数上限あり）
+        self._mem_bytes = 0
+        self._disk_bytes = 0
+
+        self.counters = {
+            "mem_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0,
+            "mem_evictions": 0, "disk_evictions": 0, "index_evictions": 0, "bytes_stored": 0,
+            "revalidated": 0, "refreshed": 0, "stale_served": 0,
+        }
+
+        if self.cache_dir:
+            os.makedirs(os.path.join(self.cache_dir, "blobs"), exist_ok=True)
+            os.makedirs(os.path.join(self.cache_dir, "urls"), exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._scan_disk_blobs())
+
+    # ---------------- 公開API ----------------
+    def lookup(self, key: str) -> Optional[Tuple[bytes, dict]]:
+        """期限に関係なく (バイト列, メタ情報) を返す（無ければ None）"""
+        with self._lock:
+            meta = self._get_meta(key)
+            if meta is None:
+                self.counters["misses"] += 1
+                return None
+
+            data = self._get_blob(meta["digest"])
+            if data is None:
+                self.counters["misses"] += 1
+                self._index.pop(key, None)
+                return None
+
+            self._put_meta(key, meta)
+            return data, meta
+
+    def is_fresh(self, meta: dict) -> bool:
+        return not self.ttl or time.time() - meta["fetched_at"] <= self.ttl
+
+    def get(self, key: str) -> Optional[bytes]:
+        """キーに対応する画像バイト列を返す（無い・期限切れなら None）"""
+        found = self.lookup(key)
+        if found is None:
+            return None
+        data, meta = found
+        if not self.is_fresh(meta):
+            with self._lock:
+                self.counters["expired"] += 1
+            return None
+        return data
+
+    def put(self, key: str, data: bytes, persist: bool = True,
+            etag: Optional[str] = None, last_modified: Optional[str] = None) -> str:
+        """画像を格納して内容ハッシュを返す（persist=False ならメモリ層のみ）"""
+        digest = content_hash(data)
+        meta = {"digest": digest, "fetched_at": time.time()}
+        if etag:
+            meta["etag"] = etag
+        if last_modified:
+            meta["last_modified"] = last_modified
+        with self._lock:
+            self._put_meta(key, meta)
+            self._put_mem(digest, data)
+            if persist and self.cache_dir:
+                self._put_disk(key, digest, data, meta)
+            self.counters["bytes_stored"] += len(data)
+        return digest
+
+    def touch(self, key: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """304 応答を受けたエントリの取得時刻（と検証子）を更新する"""
+        with self._lock:
+            meta = self._get_meta(key)
+            if meta is None:
+                return
+            meta = dict(meta, fetched_at=time.time())
+            meta.pop("key", None)
+            if etag:
+                meta["etag"] = etag
+            if last_modified:
+                meta["last_modified"] = last_modified
+            self._put_meta(key, meta)
+            if self.cache_dir and os.path.exists(self._blob_path(meta["digest"])):
+                self._atomic_write(
+                    self._index_path(key),
+                    json.dumps(dict(meta, key=key)).encode("utf-8")
+                )
+
+    def digest_of(self, key: str) -> Optional[str]:
+        with self._lock:
+            meta = self._get_meta(key)
+            return meta["digest"] if meta else None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(
+                self.counters,
+                mem_bytes=self._mem_bytes,
+                mem_entries=len(self._blobs),
+                index_entries=len(self._index),
+                disk_bytes=self._disk_bytes,
+            )
+
+    def clear(self):
+        with self._lock:
+            self._blobs.clear()
+            self._index.clear()
+            self._mem_bytes = 0
+            if self.cache_dir:
+                for path, _, _ in self._scan_disk_blobs():
+                    self._remove(path)
+                urls_dir = os.path.join(self.cache_dir, "urls")
+                for name in os.listdir(urls_dir):
+                    self._remove(os.path.join(urls_dir, name))
+                self._disk_bytes = 0
+
+    # ---------------- メモリ層 ----------------
+    def _get_meta(self, key: str) -> Optional[dict]:
+        meta = self._index.get(key)
+        if meta is not None:
+            self._index.move_to_end(key)
+            return meta
+        return self._read_disk_index(key)
+
+    def _put_meta(self, key: str, meta: dict):
+        self._index[key] = meta
+        self._index.move_to_end(key)
+        while len(self._index) > self.index_limit:
+            self._index.popitem(last=False)
+            self.counters["index_evictions"] += 1
+
+    def _get_blob(self, digest: str) -> Optional[bytes]:
+        data = self._blobs.get(digest)
+        if data is not None:
+            self._blobs.move_to_end(digest)
+            self.counters["mem_hits"] += 1
+            return data
+
+        data = self._read_disk_blob(digest)
+        if data is not None:
+            self.counters["disk_hits"] += 1
+            self._put_mem(digest, data)
+        return data
+
+    def _put_mem(self, digest: str, data: bytes):
+        if digest in self._blobs:
+            self._blobs.move_to_end(digest)
+            return
+        if len(data) > self.mem_limit:
+            return
+        self._blobs[digest] = data
+        self._mem_bytes += len(data)
+        while self._mem_bytes > self.mem_limit:
+            _, old = self._blobs.popitem(last=False)
+            self._mem_bytes -= len(old)
+            self.counters["mem_evictions"] += 1
+
+    # ---------------- ディスク層 ----------------
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, "blobs", digest[:2], digest)
+
+    def _index_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, "urls", hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _read_disk_index(self, key: str) -> Optional[dict]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._index_path(key), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("key") == key else None
+
+    def _read_disk_blob(self, digest: str) -> Optional[bytes]:
+        if not self.cache_dir:
+            return None
+        path = self._blob_path(digest)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # LRU 判定用に最終アクセス時刻を更新
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def _put_disk(self, key: str, digest: str, data: bytes, meta: dict):
+        if len(data) > self.disk_limit:
+            return
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._atomic_write(path, data)
+            self._disk_bytes += len(data)
+            self._evict_disk()
+        self._atomic_write(
+            self._index_path(key),
+            json.dumps(dict(meta, key=key)).encode("utf-8")
+        )
+
+    def _evict_disk(self):
+        if self._disk_bytes <= self.disk_limit:
+            return
+        # 最終アクセスが古い順に削除
+        blobs = sorted(self._scan_disk_blobs(), key=lambda b: b[2])
+        for path, size, _ in blobs:
+            if self._disk_bytes <= self.disk_limit:
+                break
+            if self._remove(path):
+                self._disk_bytes -= size
+                self.counters["disk_evictions"] += 1
+                self._blobs.pop(os.path.basename(path), None)
+
+    def _scan_disk_blobs(self):
+        blobs_dir = os.path.join(self.cache_dir, "blobs")
+        for sub in os.listdir(blobs_dir):
+            sub_dir = os.path.join(blobs_dir, sub)
+            if not os.path.isdir(sub_dir):
+                continue
+            for name in os.listdir(sub_dir):
+                path = os.path.join(sub_dir, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+# バックグラウンド再検証用
+_revalidate_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="img-revalidate")
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+
+
+def get_image_cache() -> ImageCache:
+    """プロセス全体で共有する画像キャッシュ（環境変数で設定）"""
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_lock:
+            if _shared_cache is None:
+                _shared_cache = ImageCache(
+                    cache_dir=os.getenv("IMAGE_CACHE_DIR", DEFAULT_CACHE_DIR) or None,
+                    mem_bytes=int(os.getenv("IMAGE_CACHE_MEM_BYTES", DEFAULT_MEM_BYTES)),
+                    disk_bytes=int(os.getenv("IMAGE_CACHE_DISK_BYTES", DEFAULT_DISK_BYTES)),
+                    ttl=float(os.getenv("IMAGE_CACHE_TTL", DEFAULT_TTL)),
+                    index_entries=int(os.getenv("IMAGE_CACHE_INDEX_ENTRIES", DEFAULT_INDEX_ENTRIES)),
+                )
+    return _shared_cache
+
+
+# ---------------- リモート画像の取得と再検証 ----------------
+def _download(url: str, cache: ImageCache, meta: Optional[dict] = None, timeout: float = 10) -> bytes:
+    """GET（meta があれば条件付きGET）してキャッシュを更新する（304 なら None を返す）"""
+    # requests の読み込みは重いので、実際に取得するまで遅らせる（API プロセスの起動を速くする）
+    import requests
+
+    headers = {}
+    if meta:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = requests.get(url, headers=headers, timeout=timeout)
+
+    if response.status_code == 304 and meta:
+        cache.touch(
+            url,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+        with cache._lock:
+            cache.counters["revalidated"] += 1
+        return None
+
+    response.raise_for_status()
+    data = response.content
+    cache.put(
+        url, data,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+    )
+    if meta:
+        with cache._lock:
+            cache.counters["refreshed"] += 1
+    return data
+
+
+def _revalidate_in_background(url: str, cache: ImageCache, meta: dict, timeout: float):
+    with _revalidating_lock:
+        if url in _revalidating:
+            return
+        _revalidating.add(url)
+
+    def run():
+        try:
+            _download(url, cache, meta, timeout)
+        except Exception as e:
+            print(f"[WARN] revalidate {url} -> {repr(e)}", file=sys.stderr, flush=True)
+        finally:
+            with _revalidating_lock:
+                _revalidating.discard(url)
+
+    _revalidate_pool.submit(run)
+
+
+def fetch_remote_image(url: str, cache: Optional[ImageCache] = None, timeout: float = 10,
+                       outcome: Optional[dict] = None) -> bytes:
+    """
+    キャッシュ経由でリモート画像を取得する
+    - 新鮮なエントリはそのまま返す
+    - 期限切れで検証子があれば条件付きGETで再検証（stale-while-revalidate 時は裏で実行）
+    - それ以外は通常のGET
+    outcome を渡すと結果（hit / stale / revalidated / miss）とダウンロードしたバイト数を書き込む
+    """
+    cache = cache or get_image_cache()
+    outcome = {} if outcome is None else outcome
+    outcome.update(result="miss", bytes_fetched=0)
+    found = cache.lookup(url)
+
+    if found is not None:
+        data, meta = found
+        if cache.is_fresh(meta):
+            outcome["result"] = "hit"
+            return data
+
+        with cache._lock:
+            cache.counters["expired"] += 1
+
+        if meta.get("etag") or meta.get("last_modified"):
+            if os.getenv("IMAGE_CACHE_STALE_WHILE_REVALIDATE", "0") == "1":
+                with cache._lock:
+                    cache.counters["stale_served"] += 1
+                _revalidate_in_background(url, cache, meta, timeout)
+                outcome["result"] = "stale"
+                return data
+
+            fresh = _download(url, cache, meta, timeout)
+            if fresh is None:
+                outcome["result"] = "revalidated"
+                return data
+            outcome["bytes_fetched"] = len(fresh)
+            return fresh
+
+    data = _download(url, cache, timeout=timeout)
+    outcome["bytes_fetched"] = len(data)
+    return data
+
+
+# ---------------- ローカル画像 ----------------
+def read_local_image(path: str, cache: Optional[ImageCache] = None, outcome: Optional[dict] = None) -> bytes:
+    """ローカル画像を更新時刻込みのキーでメモリ層にキャッシュしつつ読み込む"""
+    cache = cache or get_image_cache()
+    st = os.stat(path)
+    key = f"{path}?mtime={st.st_mtime_ns}&size={st.st_size}"
+    data = cache.get(key)
+    if outcome is not None:
+        outcome.update(result="hit" if data is not None else "miss", bytes_fetched=0)
+    if data is None:
+        with open(path, "rb") as f:
+            data = f.read()
+        cache.put(key, data, persist=False)
+    return data
@@ -0,0 +1,128 @@
+# image_optimize.py
+"""
+埋め込み画像の最適化（保存直前のポストパス）
+- スライド上の p:pic を走査し、画像パートごとに実際の表示サイズ(EMU)の最大値を求める
+- 表示サイズ × DPI より大きい画像だけを縮小・再エンコードする
+  （JPEG は品質指定、PNG は optimize。EXIF などのメタデータは落とし、ICC は残す）
+- 画像ごとの処理はスレッドプールで並列実行（PIL はリサイズ・エンコード中 GIL を解放する）
+"""
+import io
+import math
+import os
+import sys
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from pptx.oxml.ns import qn
+from pptx.util import Emu
+
+from image_probe import probe_image
+
+DEFAULT_DPI = 150
+DEFAULT_JPEG_QUALITY = 85
+DEFAULT_WORKERS = 4
+
+# EXIF の Orientation タグ（回転指定付きの画像はメタデータを落とすと向きが変わるので触らない）
+_EXIF_ORIENTATION = 0x0112
+
+
+def optimize_blob(blob: bytes, cx: int, cy: int, dpi: int = DEFAULT_DPI,
+                  quality: int = DEFAULT_JPEG_QUALITY) -> Optional[bytes]:
+    """表示サイズ cx, cy (EMU) に合わせて縮小した画像を返す（効果が無ければ None）"""
+    # まずヘッダだけで縮小が必要か判定し、必要な画像だけデコードする
+    info = probe_image(blob)
+    fmt = info.format
+    if fmt not in ("JPEG", "PNG"):
+        return None
+
+    target_w = math.ceil(Emu(cx).inches * dpi)
+    target_h = math.ceil(Emu(cy).inches * dpi)
+    scale = max(target_w / info.width, target_h / info.height)
+    if scale >= 1:
+        return None
+
+    from PIL import Image
+
+    im = Image.open(io.BytesIO(blob))
+    if im.getexif().get(_EXIF_ORIENTATION, 1) != 1:
+        return None
+
+    new_size = (max(1, round(info.width * scale)), max(1, round(info.height * scale)))
+    icc_profile = im.info.get("icc_profile")
+    if fmt == "JPEG":
+        # libjpeg の縮小デコード（1/2〜1/8）で必要最小限の解像度だけ展開する
+        im.draft(im.mode, new_size)
+    resized = im.resize(new_size, Image.LANCZOS)
+
+    out = io.BytesIO()
+    if fmt == "JPEG":
+        if resized.mode not in ("RGB", "L", "CMYK"):
+            resized = resized.convert("RGB")
+        resized.save(out, "JPEG", quality=quality, optimize=True, icc_profile=icc_profile)
+    else:
+        resized.save(out, "PNG", optimize=True, icc_profile=icc_profile)
+
+    data = out.getvalue()
+    return data if len(data) < len(blob) else None
+
+
+def _collect_targets(prs) -> Dict[object, list]:
+    """画像パート -> [最大表示幅, 最大表示高さ] を集める"""
+    targets = {}
+    slide_like = list(prs.slides)
+    for master in prs.slide_masters:
+        slide_like.append(master)
+        slide_like.extend(master.slide_layouts)
+
+    for slide in slide_like:
+        part = slide.part
+        for pic in slide._element.iter(qn("p:pic")):
+            blip = pic.find(".//" + qn("a:blip"))
+            ext = pic.find(".//" + qn("a:xfrm") + "/" + qn("a:ext"))
+            if blip is None or ext is None:
+                continue
+            # トリミング指定付きの画像は対象外
+            if pic.find(".//" + qn("a:srcRect")) is not None:
+                continue
+            rId = blip.get(qn("r:embed"))
+            if not rId:
+                continue
+            image_part = part.related_part(rId)
+            cur = targets.setdefault(image_part, [0, 0])
+            cur[0] = max(cur[0], int(ext.get("cx")))
+            cur[1] = max(cur[1], int(ext.get("cy")))
+    return targets
+
+
+def optimize_presentation_images(prs, dpi: int = None, quality: int = None,
+                                 workers: int = None) -> Dict[str, int]:
+    """プレゼン内の画像パートを表示サイズに合わせて置き換え、削減量を返す"""
+    dpi = int(dpi or os.getenv("IMAGE_DPI", DEFAULT_DPI))
+    quality = int(quality or os.getenv("IMAGE_JPEG_QUALITY", DEFAULT_JPEG_QUALITY))
+    workers = int(workers or os.getenv("IMAGE_OPTIMIZE_WORKERS", DEFAULT_WORKERS))
+
+    targets = _collect_targets(prs)
+    stats = {"images": len(targets), "optimized": 0, "bytes_before": 0, "bytes_after": 0}
+    if not targets:
+        return stats
+
+    def run(item):
+        image_part, (cx, cy) = item
+        try:
+            return image_part, optimize_blob(image_part.blob, cx, cy, dpi, quality)
+        except Exception as e:
+            print(f"[WARN] optimize {image_part.partname} -> {repr(e)}", file=sys.stderr, flush=True)
+            return image_part, None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(targets))),
+                            thread_name_prefix="img-optimize") as ex:
+        results = list(ex.map(run, targets.items()))
+
+    for image_part, new_blob in results:
+        stats["bytes_before"] += len(image_part.blob)
+        if new_blob is not None:
+            image_part._blob = new_blob
+            stats["optimized"] += 1
+        stats["bytes_after"] += len(image_part.blob)
+    return stats
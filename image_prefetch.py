@@ -0,0 +1,132 @@
+# image_prefetch.py
+"""
+レンダリング前の画像一括プリフェッチ
+- 設計図(JSON)から参照されている画像を全て集める
+- ホストごとの同時接続数を制限しつつスレッドプールで並列取得し、
+  SlideFactory の画像キャッシュに詰めておく
+- バッチ生成では全設計図のリモート画像を先にプロセス共有キャッシュへ取り込んでおく
+"""
+import os
+import sys
+import threading
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+from urllib.parse import urlparse
+
+DEFAULT_PREFETCH_WORKERS = 8
+DEFAULT_PREFETCH_PER_HOST = 4
+
+
+def collect_image_refs(plan: Dict[str, Any]) -> List[str]:
+    """設計図から background-image / image / images[].url を出現順・重複なしで集める"""
+    refs = []
+
+    def add(ref):
+        if isinstance(ref, str) and ref and ref not in refs:
+            refs.append(ref)
+
+    add(plan.get("background-image"))
+    for spec in plan.get("slides", []):
+        if not isinstance(spec, dict):
+            continue
+        add(spec.get("background-image"))
+        add(spec.get("image"))
+        # images[] を描画するのは image-auto のみ
+        if spec.get("type") == "image-auto":
+            for img in spec.get("images", []) or []:
+                if isinstance(img, dict):
+                    add(img.get("url"))
+    return refs
+
+
+def _fetch_all(paths: List[str], fetch, max_workers: int, per_host: int):
+    """ホストごとの同時接続数を制限しつつ paths を並列に fetch する"""
+    host_slots = defaultdict(lambda: threading.BoundedSemaphore(per_host))
+    for path in paths:
+        host_slots[urlparse(path).netloc or "file"]
+
+    def run(path):
+        with host_slots[urlparse(path).netloc or "file"]:
+            fetch(path)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(paths)), thread_name_prefix="img-prefetch") as ex:
+        list(ex.map(run, paths))
+
+
+def prefetch_images(factory, refs: List[str], max_workers: int = None, per_host: int = None) -> Dict[str, int]:
+    """
+    refs の画像を並列に取得して factory の画像キャッシュに格納する
+    取得に失敗した画像は例外を記録しておき、レンダリング時に _load_image が再送出する
+    """
+    max_workers = int(max_workers or os.getenv("IMAGE_PREFETCH_WORKERS", DEFAULT_PREFETCH_WORKERS))
+    per_host = int(per_host or os.getenv("IMAGE_PREFETCH_PER_HOST", DEFAULT_PREFETCH_PER_HOST))
+
+    paths = []
+    for ref in refs:
+        path = factory._resolve_image_path(ref)
+        if path not in factory._image_cache and path not in paths:
+            paths.append(path)
+
+    stats = {"requested": len(paths), "fetched": 0, "failed": 0}
+    if not paths or max_workers <= 0:
+        return stats
+
+    lock = threading.Lock()
+
+    def fetch(path):
+        try:
+            loaded = factory._fetch_image(path)
+        except Exception as e:
+            print(f"[WARN] prefetch {path} -> {repr(e)}", file=sys.stderr, flush=True)
+            with lock:
+                factory._image_errors[path] = e
+                stats["failed"] += 1
+            return
+        with lock:
+            factory._image_cache[path] = loaded
+            stats["fetched"] += 1
+
+    # ホストごとの同時接続数制限（ローカルファイルは "file" 扱い）
+    _fetch_all(paths, fetch, max_workers, per_host)
+    return stats
+
+
+def warm_image_cache(plans: List[Dict[str, Any]], max_workers: int = None, per_host: int = None) -> Dict[str, int]:
+    """
+    複数の設計図が参照するリモート画像を重複なしで取得し、プロセス共有の画像キャッシュに入れる
+    （ディスク層があればプロセスプールの各ワーカーもそこから読む）
+    """
+    from image_cache import fetch_remote_image, get_image_cache
+
+    max_workers = int(max_workers or os.getenv("IMAGE_PREFETCH_WORKERS", DEFAULT_PREFETCH_WORKERS))
+    per_host = int(per_host or os.getenv("IMAGE_PREFETCH_PER_HOST", DEFAULT_PREFETCH_PER_HOST))
+
+    urls = []
+    for plan in plans:
+        for ref in collect_image_refs(plan):
+            if ref.startswith(("http://", "https://")) and ref not in urls:
+                urls.append(ref)
+
+    stats = {"requested": len(urls), "fetched": 0, "failed": 0}
+    if not urls or max_workers <= 0:
+        return stats
+
+    cache = get_image_cache()
+    lock = threading.Lock()
+
+    def fetch(url):
+        try:
+            fetch_remote_image(url, cache, timeout=10)
+        except Exception as e:
+            # 失敗した画像は各ビルドの中で改めてエラーとして扱われる
+            print(f"[WARN] warm {url} -> {repr(e)}", file=sys.stderr, flush=True)
+            with lock:
+                stats["failed"] += 1
+            return
+        with lock:
+            stats["fetched"] += 1
+
+    _fetch_all(urls, fetch, max_workers, per_host)
+    return stats
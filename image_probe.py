@@ -0,0 +1,77 @@
+# image_probe.py
+"""
+画像のヘッダだけを読んでサイズと形式を調べる
+- PNG / JPEG / GIF / BMP は自前でヘッダを解析（ピクセルは一切デコードしない）
+- それ以外は PIL の Image.open（遅延読み込み）でヘッダのみ参照する
+レンダラーが必要とするのは im.size だけなので、縮小などピクセルが必要な処理でのみデコードする
+"""
+import io
+import struct
+
+from typing import NamedTuple, Optional
+
+
+class ImageInfo(NamedTuple):
+    format: str
+    width: int
+    height: int
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+
+# SOF マーカー（DHT=C4, JPG=C8, DAC=CC を除く C0〜CF）
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _probe_jpeg(data: bytes) -> Optional[ImageInfo]:
+    pos = 2
+    n = len(data)
+    while pos + 4 <= n:
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        # フィルバイト
+        if marker == 0xFF:
+            pos += 1
+            continue
+        # 長さを持たないマーカー
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        seg_len = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        if marker in _JPEG_SOF:
+            if pos + 9 > n:
+                return None
+            height, width = struct.unpack(">HH", data[pos + 5:pos + 9])
+            return ImageInfo("JPEG", width, height)
+        pos += 2 + seg_len
+    return None
+
+
+def _probe_header(data: bytes) -> Optional[ImageInfo]:
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and data[12:16] == b"IHDR":
+        width, height = struct.unpack(">II", data[16:24])
+        return ImageInfo("PNG", width, height)
+    if data[:2] == b"\xff\xd8":
+        return _probe_jpeg(data)
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        width, height = struct.unpack("<HH", data[6:10])
+        return ImageInfo("GIF", width, height)
+    if data[:2] == b"BM" and len(data) >= 26:
+        width, height = struct.unpack("<ii", data[18:26])
+        return ImageInfo("BMP", width, abs(height))
+    return None
+
+
+def probe_image(data: bytes) -> ImageInfo:
+    """画像バイト列からサイズと形式を取得する（解析できない画像は例外）"""
+    info = _probe_header(data)
+    if info is not None and info.width > 0 and info.height > 0:
+        return info
+
+    # 自前で読めない形式は PIL に任せる（open はヘッダのみ読む）
+    from PIL import Image
+    with Image.open(io.BytesIO(data)) as im:
+        return ImageInfo(im.format, im.width, im.height)
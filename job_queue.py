@@ -0,0 +1,313 @@
+# job_queue.py
+"""
+非同期ジョブAPI用の永続ジョブキュー
+- SQLite に設計図(JSON)ごと保存するので、再起動してもキュー内の仕事は失われない
+- JobWorkers が複数のワーカーでキューを消化する
+- 実行中のジョブはリース（lease_until）を持ち、ワーカーが実行中は定期的に延長する
+  リースが切れたジョブ（プロセスのクラッシュ・OOM など）だけを別のワーカー・プロセスが再投入する
+  （同じ DB を共有する複数プロセスでも、生きているプロセスのジョブは二重に実行しない）
+- 再投入は JOB_MAX_ATTEMPTS 回まで。超えたジョブは failed にする（毎回ワーカーを落とす設計図を繰り返さない）
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import uuid
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+DEFAULT_DB_PATH = os.path.join(tempfile.gettempdir(), "json2slide_jobs.sqlite3")
+DEFAULT_LEASE_SECONDS = 60
+DEFAULT_MAX_ATTEMPTS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    status      TEXT NOT NULL,
+    theme       TEXT NOT NULL,
+    plan        TEXT NOT NULL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    created_at  TEXT NOT NULL,
+    started_at  TEXT,
+    lease_until TEXT,
+    finished_at TEXT,
+    result      TEXT,
+    error       TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+"""
+
+
+def _now(offset_seconds: float = 0) -> str:
+    return (datetime.utcnow() + timedelta(seconds=offset_seconds)).isoformat(timespec="milliseconds") + "Z"
+
+
+class JobStore:
+    """SQLite バックエンドのジョブストア（呼び出しはすべて同期・短時間）"""
+
+    def __init__(self, db_path: Optional[str] = None, retention_days: Optional[int] = None,
+                 lease_seconds: Optional[float] = None, max_attempts: Optional[int] = None):
+        self.db_path = db_path or os.getenv("JOB_DB_PATH", DEFAULT_DB_PATH)
+        self.retention_days = int(retention_days or os.getenv("JOB_RETENTION_DAYS", "7"))
+        self.lease_seconds = float(lease_seconds or os.getenv("JOB_LEASE_SECONDS", DEFAULT_LEASE_SECONDS))
+        self.max_attempts = max(1, int(max_attempts or os.getenv("JOB_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)))
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+        with self._session() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            # lease_until の無い以前の DB には列を足す
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "lease_until" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN lease_until TEXT")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _session(self):
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _expire_leases(self, conn):
+        """
+        リースの切れた running ジョブを、試行回数が上限に達していれば failed に、そうでなければ queued に戻す
+        （リースは実行中のワーカーが延長し続けるので、切れている = 実行していたプロセスが落ちた）
+        """
+        now = _now()
+        error = json.dumps({
+            "code": "MAX_ATTEMPTS_EXCEEDED",
+            "message": f"ジョブの実行が {self.max_attempts} 回とも完了しませんでした（ワーカーの異常終了など）",
+        }, ensure_ascii=False)
+        expired = "status = ? AND (lease_until IS NULL OR lease_until < ?)"
+        failed = conn.execute(
+            f"UPDATE jobs SET status = ?, finished_at = ?, lease_until = NULL, error = ? "
+            f"WHERE {expired} AND attempts >= ?",
+            (JOB_FAILED, now, error, JOB_RUNNING, now, self.max_attempts)
+        ).rowcount
+        requeued = conn.execute(
+            f"UPDATE jobs SET status = ?, started_at = NULL, lease_until = NULL WHERE {expired}",
+            (JOB_QUEUED, JOB_RUNNING, now)
+        ).rowcount
+        if failed or requeued:
+            print(f"[JOBS] リースの切れたジョブ: 再投入 {requeued}件 / 試行回数超過で失敗 {failed}件",
+                  file=sys.stderr, flush=True)
+
+    def recover(self):
+        """リースの切れた実行中ジョブをキューに戻し（または失敗にし）、古い完了ジョブを削除する"""
+        expire = (datetime.utcnow() - timedelta(days=self.retention_days)).isoformat() + "Z"
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._expire_leases(conn)
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (JOB_DONE, JOB_FAILED, expire)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def enqueue(self, plan: Dict[str, Any], theme: str) -> str:
+        job_id = uuid.uuid4().hex
+        with self._session() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, theme, plan, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, JOB_QUEUED, theme, json.dumps(plan, ensure_ascii=False), _now())
+            )
+        return job_id
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        最も古い queued ジョブを1件取り出して running にする（無ければ None）
+        取り出す前に、他のプロセスが落として残したリース切れのジョブも戻しておく
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._expire_leases(conn)
+            row = conn.execute(
+                "SELECT id, theme, plan, attempts FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (JOB_QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                (JOB_RUNNING, _now(), _now(self.lease_seconds), row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        return {
+            "id": row["id"],
+            "theme": row["theme"],
+            "plan": json.loads(row["plan"]),
+            "attempts": row["attempts"] + 1,
+        }
+
+    def renew(self, job_id: str, attempt: int) -> bool:
+        """実行中ジョブのリースを延長する（この試行がまだジョブを持っていれば True）"""
+        with self._session() as conn:
+            return conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = ? AND attempts = ?",
+                (_now(self.lease_seconds), job_id, JOB_RUNNING, attempt)
+            ).rowcount > 0
+
+    def release(self, job_id: str, attempt: int):
+        """シャットダウンで中断したジョブをキューに戻す（試行回数には数えない）"""
+        with self._session() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, lease_until = NULL, attempts = attempts - 1 "
+                "WHERE id = ? AND status = ? AND attempts = ?",
+                (JOB_QUEUED, job_id, JOB_RUNNING, attempt)
+            )
+
+    def complete(self, job_id: str, result: Dict[str, Any], attempt: Optional[int] = None):
+        self._finish(job_id, JOB_DONE, attempt, result=result)
+
+    def fail(self, job_id: str, error: Dict[str, Any], attempt: Optional[int] = None):
+        self._finish(job_id, JOB_FAILED, attempt, error=error)
+
+    def _finish(self, job_id: str, status: str, attempt: Optional[int], result=None, error=None):
+        # attempt を渡すと、その試行がまだジョブを持っている場合だけ結果を書く
+        # （リース切れで別のワーカーに渡った後に、遅れて終わった古い試行が上書きしないように）
+        owner = "" if attempt is None else " AND status = ? AND attempts = ?"
+        with self._session() as conn:
+            conn.execute(
+                f"UPDATE jobs SET status = ?, finished_at = ?, lease_until = NULL, result = ?, error = ? "
+                f"WHERE id = ?{owner}",
+                (
+                    status, _now(),
+                    json.dumps(result, ensure_ascii=False) if result is not None else None,
+                    json.dumps(error, ensure_ascii=False) if error is not None else None,
+                    job_id,
+                    *(() if attempt is None else (JOB_RUNNING, attempt)),
+                )
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._session() as conn:
+            row = conn.execute(
+                "SELECT id, status, theme, attempts, created_at, started_at, finished_at, result, error "
+                "FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        job = {
+            "job_id": row["id"],
+            "status": row["status"],
+            "theme": row["theme"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+        if row["result"]:
+            job.update(json.loads(row["result"]))
+        if row["error"]:
+            job["error"] = json.loads(row["error"])
+        return job
+
+    def count(self, status: str) -> int:
+        with self._session() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+
+class JobWorkers:
+    """JobStore を消化するワーカー群（asyncio タスク）"""
+
+    def __init__(self, store: JobStore, handler: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 concurrency: int, poll_interval: float = 2.0):
+        self.store = store
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+
+    def start(self):
+        self.store.recover()
+        self._tasks = [
+            asyncio.create_task(self._worker_loop()) for _ in range(self.concurrency)
+        ]
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """新しいジョブが投入されたことをワーカーに知らせる"""
+        self._wakeup.set()
+
+    async def _worker_loop(self):
+        while True:
+            job = await asyncio.to_thread(self.store.claim)
+            if job is None:
+                # 新規投入の通知 or 定期ポーリングまで待機
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            # まだ残っているかもしれないので待機中の別ワーカーも起こす
+            self._wakeup.set()
+
+            heartbeat = asyncio.create_task(self._heartbeat(job))
+            try:
+                result = await self.handler(job)
+                await asyncio.to_thread(self.store.complete, job["id"], result, job["attempts"])
+            except asyncio.CancelledError:
+                # シャットダウン時はキューに戻す（戻せずに落ちてもリース切れで再投入される）
+                self.store.release(job["id"], job["attempts"])
+                raise
+            except Exception as e:
+                print(f"[JOBS] job={job['id']} failed -> {repr(e)}", file=sys.stderr, flush=True)
+                await asyncio.to_thread(
+                    self.store.fail, job["id"],
+                    {"code": "BUILD_FAILED", "message": f"PPTX生成に失敗しました: {str(e)}"},
+                    job["attempts"]
+                )
+            finally:
+                heartbeat.cancel()
+
+    async def _heartbeat(self, job):
+        """実行中はリースの 1/3 ごとに延長する"""
+        while True:
+            await asyncio.sleep(self.store.lease_seconds / 3)
+            try:
+                if not await asyncio.to_thread(self.store.renew, job["id"], job["attempts"]):
+                    print(f"[WARN] job={job['id']} のリースを失いました（別のワーカーに再投入済み）",
+                          file=sys.stderr, flush=True)
+                    return
+            except sqlite3.Error as e:
+                print(f"[WARN] job={job['id']} のリース延長に失敗しました -> {repr(e)}", file=sys.stderr, flush=True)
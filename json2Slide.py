@@ -8,27 +8,36 @@ majin-style slide factory with python-pptx
 """
 import json
 import sys
-import requests
 import io
 import os
 import platform
+import shutil
+import time
 
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.enum.text import PP_ALIGN
-from pptx.dml.color import RGBColor
-from pptx.util import Inches, Pt
+from pptx.util import Pt
 from pptx.enum.text import PP_ALIGN
 from pptx.dml.color import RGBColor
 from pptx.enum.shapes import MSO_SHAPE
 from pptx.util import Cm
 from pptx.enum.text import MSO_ANCHOR
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls
 from pptx.oxml.xmlchemy import OxmlElement
 
-from PIL import Image
+from deck_cache import CACHE_BYPASS, CACHE_HIT, CACHE_MISS, deck_key, get_deck_cache
+from image_cache import content_hash, fetch_remote_image, get_image_cache, read_local_image
+from image_optimize import optimize_presentation_images
+from image_prefetch import collect_image_refs, prefetch_images
+from image_probe import probe_image
+from master_layouts import append_slide, prune_unused_layouts, set_master_background
+from slide_cache import get_slide_cache, restore_slide, slide_key, snapshot_slide
+from template_cache import DEFAULT_LAYOUT_MAP, asset_digest, new_presentation, template_for  # noqa: F401
+from text_styles import TextStyler, style_run
+from theme_registry import get_theme, layout_for, palette_for, theme_names
 
 # -------- ユーザー環境に合わせて調整可能な既定値 --------
 DEFAULT_FONT = "Biz UDゴシック"           # 日本語フォントを既定化
@@ -39,143 +48,21 @@ BODY_FONT_SIZE = Pt(18)
 CAPTION_FONT_SIZE = Pt(14)
 ACA_BASE_URL = "https://myaca.azurecontainerapps.io/"
 
-# レイアウトの既定マップ（テンプレートにより差異あり）
-# 必要に応じて調整してください。
-DEFAULT_LAYOUT_MAP = {
-    "title": 0,           # Title Slide
-    "content": 1,         # Title and Content
-    "section": 2,         # Section Header
-    "two_content": 3,     # Two Content
-    "comparison": 4,      # Comparison
-    "title_only": 5,      # Title Only
-    "blank": 6,           # Blank
-    "with_caption": 7,    # Content with Caption
-    "pic_with_caption": 8 # Picture with Caption
-}
-
-# ---------------- Google風 CONFIG ----------------
-CONFIG = {
-    "BASE_PX": {"W": 960, "H": 540},
-
-    # ---------------- テーマカラー定義 ----------------
-    "COLORS": {
-        "primary"    : RGBColor(0x42, 0x85, 0xF4),   # メインカラー（タイトル・強調）
-        "accent"     : RGBColor(0xFB, 0xBC, 0x04),   # アクセントカラー（ハイライト・バー）
-        "background" : RGBColor(0xFF, 0xFF, 0xFF),   # スライド背景
-        "surface"    : RGBColor(0xF8, 0xF9, 0xFA),   # セクション背景・ボックス背景
-        "text"       : RGBColor(0x33, 0x33, 0x33),   # 標準本文
-        "subtext"    : RGBColor(0x9E, 0x9E, 0x9E),   # 補助テキスト（日付・キャプション）
-        "ghost"      : RGBColor(0xEF, 0xEF, 0xED),   # ゴースト数字・区切り用
-    },
-
-    # ---------------- フォント定義 ----------------
-    "FONTS": {
-        "family": "Biz UDゴシック",
-        "sizes": {
-            "title"        : Pt(45),
-            "sectionTitle" : Pt(38),
-            "contentTitle" : Pt(30),
-            "subhead"      : Pt(28),
-            "body"         : Pt(22),
-            "caption"      : Pt(18),
-            "ghostNum"     : Pt(180),
-        }
-    },
-
-    # ---------------- レイアウト座標 ----------------
-    "POS_PX": {
-        "titleSlide": {
-            "subject":  { "left": 80, "top": 140, "width": 800, "height": 40},  
-                "title"    : { "left": 80, "top": 190, "width": 800, "height": 90 },  
-                "lecturer" : { "left": 80, "top": 290, "width": 400, "height": 40 },  
-                "date"     : { "left": 80, "top": 330, "width": 250, "height": 40 },  
-        },        
-        "sectionSlide": {
-            "title"    : { "left":  55, "top": 230, "width": 840, "height":  80 },
-            "ghostNum" : { "left": 100, "top": 120, "width": 300, "height": 200 },
-        },
-        "contentSlide": {
-            "title"    : { "left": 50, "top":  30, "width": 830, "height":  50 },
-            "subhead"  : { "left": 50, "top": 100, "width": 830, "height":  30 },
-            "body"     : { "left": 50, "top": 150, "width": 910, "height": 303 },
-        }
-    }
-}
-
-THEME_COLORS = {
-    "Default": {
-        "primary"    : RGBColor(0x42, 0x85, 0xF4),  # Googleブルー
-        "accent"     : RGBColor(0xFB, 0xBC, 0x04),  # 黄色
-        "background" : RGBColor(0xFF, 0xFF, 0xFF),
-        "surface"    : RGBColor(0xF8, 0xF9, 0xFA),
-        "text"       : RGBColor(0x33, 0x33, 0x33),
-        "subtext"    : RGBColor(0x9E, 0x9E, 0x9E),
-        "ghost"      : RGBColor(0xEF, 0xEF, 0xED),
-    },
-    "Nature": {
-        "primary"    : RGBColor(0x2E, 0x7D, 0x32),  # 深緑
-        "accent"     : RGBColor(0xFF, 0xA0, 0x00),  # オレンジ
-        "background" : RGBColor(0xFF, 0xFF, 0xF5),
-        "surface"    : RGBColor(0xE8, 0xF5, 0xE9),
-        "text"       : RGBColor(0x1B, 0x5E, 0x20),
-        "subtext"    : RGBColor(0x6D, 0x6D, 0x6D),
-        "ghost"      : RGBColor(0xC8, 0xE6, 0xC9),
-    },
-    "Dark": {
-        "primary"    : RGBColor(0xBB, 0x86, 0xFC),  # 紫
-        "accent"     : RGBColor(0x03, 0xDA, 0xC6),  # シアン
-        "background" : RGBColor(0x12, 0x12, 0x12),
-        "surface"    : RGBColor(0x1E, 0x1E, 0x1E),
-        "text"       : RGBColor(0xEE, 0xEE, 0xEE),
-        "subtext"    : RGBColor(0xAA, 0xAA, 0xAA),
-        "ghost"      : RGBColor(0x33, 0x33, 0x33),
-    },
-    "Monochrome": {
-        "primary"    : RGBColor(0x00, 0x00, 0x00),
-        "accent"     : RGBColor(0x55, 0x55, 0x55),
-        "background" : RGBColor(0xFF, 0xFF, 0xFF),
-        "surface"    : RGBColor(0xF0, 0xF0, 0xF0),
-        "text"       : RGBColor(0x00, 0x00, 0x00),
-        "subtext"    : RGBColor(0x77, 0x77, 0x77),
-        "ghost"      : RGBColor(0xDD, 0xDD, 0xDD),
-    }
-}
-
-# ---------------- Layout Manager ----------------
-class LayoutManager:
-    def __init__(self, config):
-        self.cfg = config
-        self.base_w = config["BASE_PX"]["W"] * 0.75
-        self.base_h = config["BASE_PX"]["H"] * 0.75
-        self.page_w = Inches(13.33)  # 16:9 幅
-        self.page_h = Inches(7.5)    # 16:9 高さ
-        self.scale_x = self.page_w / self.base_w
-        self.scale_y = self.page_h / self.base_h
-
-    def get_rect(self, path: str):
-        keys = path.split(".")
-        pos = self.cfg["POS_PX"]
-        for k in keys:
-            pos = pos[k]
-        def px2pt(px): return px * 0.75
-        return {
-            "left": px2pt(pos["left"]) * self.scale_x,
-            "top": px2pt(pos["top"]) * self.scale_y,
-            "width": px2pt(pos["width"]) * self.scale_x,
-            "height": px2pt(pos["height"]) * self.scale_y,
-        }
+# レンダラーの出力が変わる変更をしたら上げる（完成デッキキャッシュのキーに含まれる）
+RENDERER_VERSION = "9"
+
+# レイアウトの既定マップ（DEFAULT_LAYOUT_MAP）は template_cache にある（互換のため json2Slide からも import できる）
+# テーマ定義の template.layouts でスライド種別ごとに、この名前・番号・テンプレート内のレイアウト名で指定する
+
+# ---------------- テーマ ----------------
+# 配色パレット・フォント・レイアウト座標は themes/*.json に定義（theme_registry が起動時に1度だけ読み込む）
 
 # ---------------------- ユーティリティ ----------------------
 
 def set_paragraph_style(paragraph, text: str, font_size: Pt, bold=False, italic=False, color: Optional[RGBColor]=None, align=None):
     paragraph.text = text
     run = paragraph.runs[0] if paragraph.runs else paragraph.add_run()
-    run.font.name = DEFAULT_FONT
-    run.font.size = font_size
-    run.font.bold = bold
-    run.font.italic = italic
-    if color:
-        run.font.color.rgb = color
+    style_run(run, font_size, bold=bold, italic=italic, color=color or None, font=DEFAULT_FONT)
     if align:
         paragraph.alignment = align
 
@@ -202,6 +89,7 @@ def add_speaker_notes(slide, notes: Optional[str]):
     p = tf.paragraphs[0]
     set_paragraph_style(p, notes, Pt(14))
 
+@lru_cache(maxsize=1024)
 def hex_to_rgbcolor(hex_str: str) -> RGBColor:
     hex_str = hex_str.lstrip("#")
     r, g, b = int(hex_str[0:2], 16), int(hex_str[2:4], 16), int(hex_str[4:6], 16)
@@ -215,11 +103,10 @@ def ensure_list(x) -> List[Any]:
 
 # ---------------- Slide Factory ----------------
 class SlideFactory:
-    def __init__(self, plan, theme, config=CONFIG):
+    def __init__(self, plan, theme):
 
         self.plan = plan
         self.theme = theme
-        self.prs = Presentation()
 
         self.image_base_dir = "images"
 
@@ -231,10 +118,15 @@ class SlideFactory:
         else:
             self.is_aca = False  # ローカル or Docker
         
-        # イメージキャッシュ
+        # イメージキャッシュ（プリフェッチ失敗分は例外を保持）
         self._image_cache = {}
+        self._image_errors = {}
+        self._image_digests = {}
+
+        # 計測値（ビルド情報として呼び出し元へ返し、API プロセス側でメトリクスに記録する）
+        self.metrics = {"slides": [], "image_fetches": [], "image_loads": [], "save_ms": 0.0}
 
-        # カラーテーマ選択
+        # カラーテーマ選択（パレットはテーマ定義から変換済みのものを共有する）
         theme_name = plan.get("color-theme", "Default")
 
         if theme_name == "Custom" and "colors" in plan:
@@ -242,24 +134,47 @@ class SlideFactory:
                 k: hex_to_rgbcolor(v) for k, v in plan["colors"].items()
             }
         else:
-            self.colors = THEME_COLORS.get(theme_name, THEME_COLORS["Default"])
+            self.colors = palette_for(theme, theme_name)
 
-        self.config = config
-        self.fonts = config["FONTS"]
-        self.layout = LayoutManager(config)
+        self.fonts = theme.fonts
+        # 座標はアスペクト比ごとに起動時に EMU へ変換済み（設計図の "aspect": "16:9" / "16:10" / "4:3"）
+        self.layout = layout_for(theme, plan.get("aspect"))
 
-        # 16:9 に固定
-        self.prs.slide_width = self.layout.page_w
-        self.prs.slide_height = self.layout.page_h
+        # テーマの template（社内テンプレートなど。無ければ既定テンプレート）とスライド種別ごとのレイアウト
+        self.template = template_for(theme)
+        self._asset_digest = asset_digest(theme, self._resolve_image_path)
+
+        # テーマ・スライドサイズ別のベースを複製（既定テンプレートの再パースを避ける）
+        self.prs = new_presentation(theme, self.layout.page_w, self.layout.page_h, self._resolve_image_path)
         
-        # 全体背景
-        self._global_bg = None
+        # 参照画像をまとめて先読み（レンダリング中にネットワーク待ちをしない）
+        self.prefetch_images()
+
+        # 全体背景（背景色と background-image はスライドごとではなくマスターに1度だけ置く）
+        global_bg = None
         if plan.get("background-image"):
-            self._global_bg, _ = self._load_image(plan["background-image"])
+            global_bg, _ = self._load_image(plan["background-image"])
+        set_master_background(self.prs, self.colors["background"], global_bg)
 
+        # テーマのフォントと本文色をデッキの既定テキストスタイルにし、ランには差分だけを書く
+        self.text_styles = TextStyler(self.prs, self.fonts["family"], self.colors["text"])
+        self.metrics["text_styles"] = self.text_styles.stats
 
-    def add_slide(self,spec):
+        # テーマがベース準備時に生成した装飾入りレイアウト
+        self._layouts = {layout.name: layout for layout in self.prs.slide_layouts}
+
+    def add_slide(self, spec):
+        """スライドを1枚（以上）追加し、種別ごとのレンダリング時間を記録する"""
+        t0 = time.perf_counter()
+        result = self._render_spec(spec)
+        self.metrics["slides"].append((str(spec.get("type")), (time.perf_counter() - t0) * 1000))
+        return result
+
+    def _render_spec(self,spec):
         t = spec.get("type")
+        if t in self.template.slide_layouts:
+            # テンプレートのレイアウトを割り当てた種別はプレースホルダーに流し込む
+            return self.theme.render_template(self, spec)
         if t == "title":
             return self.theme.render_title(self, spec) 
         elif t == "section":
@@ -295,18 +210,68 @@ class SlideFactory:
         elif t == "closing":
             return self.theme.render_closing(self, spec)
 
-    def save(self, out_path: str):
-        Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+    def build_slides(self, slide_cache=None, use_cache: bool = True) -> Dict[str, int]:
+        """
+        設計図の全スライドを追加する
+        slide_cache があれば仕様が変わっていないスライドは前回のレンダリング結果を再利用する
+        """
+        stats = {"reused": 0, "rendered": 0}
+        for spec in self.plan.get("slides", []):
+            if slide_cache is None:
+                self.add_slide(spec)
+                stats["rendered"] += 1
+                continue
+
+            key = self.slide_cache_key(spec)
+            snapshots = slide_cache.get(key) if use_cache else None
+            if snapshots is not None:
+                for snapshot in snapshots:
+                    restore_slide(self.prs, snapshot)
+                stats["reused"] += 1
+                continue
+
+            first = len(self.prs.slides)
+            self.add_slide(spec)
+            stats["rendered"] += 1
+            snapshots = [snapshot_slide(self.prs, slide) for slide in list(self.prs.slides)[first:]]
+            if None not in snapshots:
+                slide_cache.put(key, snapshots)
+        return stats
+
+    def save(self, out_path):
+        """ファイルパス、または書き込み可能なバイナリストリーム（BytesIO など）に保存する"""
+        if isinstance(out_path, (str, os.PathLike)):
+            Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+        # 埋め込み画像を表示サイズまで縮小（IMAGE_OPTIMIZE=0 で無効）
+        t0 = time.perf_counter()
+        # テーマが生成したレイアウトのうち、このデッキで使わなかったものは出力に含めない
+        prune_unused_layouts(self.prs, self.theme.generated_layout_names())
+        if os.getenv("IMAGE_OPTIMIZE", "1") != "0":
+            optimize_presentation_images(self.prs)
         self.prs.save(out_path)
+        self.metrics["save_ms"] = (time.perf_counter() - t0) * 1000
 
     # ---------------- 内部ユーティリティ ----------------
-    def _new_slide(self, data: Dict[str, Any],apply_background = True):
-        s = self.prs.slides.add_slide(self.prs.slide_layouts[6])
+    def _new_slide(self, data: Dict[str, Any],apply_background = True, notes: bool = True):
+        # notes=False ならノートページを作らない（表の続きのスライドなど。ノートのパート名の採番は
+        # パッケージ全体の走査になるので、大量に追加するスライドでは省く）
+        # 自前の背景画像を持つスライドと apply_background=False のスライドは、全体背景を隠したレイアウトを使う
+        template_layout = self.template.slide_layouts.get(data.get("type"))
+        hide_master_shapes = "background-image" in data or not apply_background
+        layout_name = self.theme.layout_name(data.get("type"), hide_master_shapes)
+        if template_layout is not None:
+            layout = self.prs.slide_layouts[template_layout.index]
+        elif layout_name:
+            layout = self._layouts[layout_name]
+        else:
+            layout = self.prs.slide_layouts[self.template.blank_index]
+        s = append_slide(self.prs, layout)
         # 背景
-        self._apply_background(s,data,apply_background)
+        self._apply_background(s,data)
         # スライドノート
-        note_text = data.get("note", "")
-        s.notes_slide.notes_text_frame.text = note_text
+        if notes:
+            note_text = data.get("note", "")
+            s.notes_slide.notes_text_frame.text = note_text
         return s
 
     def _style_text(self, paragraph, text: str, size: Pt, bold=False,
@@ -314,28 +279,47 @@ class SlideFactory:
         """統一的にフォントスタイルを適用"""
         paragraph.text = text
         run = paragraph.runs[0] if paragraph.runs else paragraph.add_run()
-        run.font.name = self.fonts["family"]
-        run.font.size = size
-        run.font.bold = bool(bold) if bold is not None else None
-        run.font.italic = italic
-        run.font.color.rgb = color or self.colors["text"]
+        self.text_styles.apply(run, size, bold=bool(bold) if bold is not None else None, italic=italic,
+                               color=color or self.colors["text"], font=self.fonts["family"])
         if align:
             paragraph.alignment = align
 
-    def _load_image(self, path_or_url: str):
-        #import logging, sys
-        #logger = logging.getLogger("uvicorn")
+    def _resolve_image_path(self, path_or_url: str) -> str:
+        # http/https ならそのまま外部URL
+        if path_or_url.startswith(("http://", "https://")):
+            return path_or_url
+        # ローカルファイルとして解釈
+        base_dir = os.getenv("IMAGE_BASE_DIR", self.image_base_dir)
+        # 絶対パスに正規化（/app/images/simplenote1.png など）
+        return os.path.abspath(os.path.join(base_dir, path_or_url))
+
+    def _fetch_image(self, path_or_url: str):
+        """解決済みのパス/URLから画像を読み込む（プロセス共有キャッシュ経由）"""
+        cache = get_image_cache()
+        outcome = {}
+        t0 = time.perf_counter()
+
+        if path_or_url.startswith(("http://", "https://")):
+            # 外部URL（SharePointなど）
+            data = fetch_remote_image(path_or_url, cache, timeout=10, outcome=outcome)
+        else:
+            # ローカルファイル（テーマ画像など）
+            data = read_local_image(path_or_url, cache, outcome=outcome)
 
-        #logger.info(f"[DEBUG] 入力: {path_or_url}, base_dir: {self.image_base_dir}, is_aca={self.is_aca}")
+        # (キャッシュ結果, 所要ms, ダウンロードしたバイト数)（プリフェッチの各スレッドから追記される）
+        self.metrics["image_fetches"].append(
+            (outcome.get("result", "miss"), (time.perf_counter() - t0) * 1000, outcome.get("bytes_fetched", 0))
+        )
 
-        # http/https ならそのまま外部URL
-        if not path_or_url.startswith(("http://", "https://")):
-            # ローカルファイルとして解釈
-            base_dir = os.getenv("IMAGE_BASE_DIR", self.image_base_dir)
-            # 絶対パスに正規化（/app/images/simplenote1.png など）
-            path_or_url = os.path.abspath(os.path.join(base_dir, path_or_url))
+        # デッキキャッシュのキー用に内容ハッシュを控えておく
+        self._image_digests[path_or_url] = content_hash(data)
+
+        # サイズと形式はヘッダだけから取得（ピクセルのデコードは最適化段階まで行わない）
+        return io.BytesIO(data), probe_image(data)
 
-        #logger.info(f"[DEBUG] resolved path_or_url={path_or_url}")
+    def _load_image(self, path_or_url: str):
+        path_or_url = self._resolve_image_path(path_or_url)
+        t0 = time.perf_counter()
 
         try:
             # キャッシュヒット確認
@@ -344,35 +328,69 @@ class SlideFactory:
                 stream.seek(0)
                 return stream, im
 
-            if path_or_url.startswith(("http://", "https://")):
-                # 外部URL（SharePointなど）
-                response = requests.get(path_or_url, timeout=10)
-                response.raise_for_status()
-                stream = io.BytesIO(response.content)
-            else:
-                # ローカルファイル（テーマ画像など）
-                with open(path_or_url, "rb") as f:
-                    stream = io.BytesIO(f.read())
+            # プリフェッチで失敗済みなら再取得せずにその例外を返す
+            if path_or_url in self._image_errors:
+                raise self._image_errors[path_or_url]
 
-            im = Image.open(stream)
-            im.load()
-            stream.seek(0)
+            stream, im = self._fetch_image(path_or_url)
             self._image_cache[path_or_url] = (stream, im)
 
             return stream, im
         except Exception as e:
             print(f"[ERROR] {path_or_url} -> {repr(e)}", file=sys.stderr, flush=True)
             raise
+        finally:
+            self.metrics["image_loads"].append((time.perf_counter() - t0) * 1000)
+
+    def prefetch_images(self):
+        """設計図が参照する画像を並列に先読みしてキャッシュに入れる"""
+        return prefetch_images(self, collect_image_refs(self.plan))
+
+    def deck_cache_key(self) -> str:
+        """完成デッキキャッシュのキー（画像は内容ハッシュで区別する）"""
+        image_hashes = {}
+        for ref in collect_image_refs(self.plan):
+            image_hashes[ref] = self._image_digests.get(self._resolve_image_path(ref), "!unavailable")
+
+        # 出力に影響する設定値もキーに含める
+        options = {
+            "image_optimize": os.getenv("IMAGE_OPTIMIZE", "1"),
+            "image_dpi": os.getenv("IMAGE_DPI", ""),
+            "image_jpeg_quality": os.getenv("IMAGE_JPEG_QUALITY", ""),
+        }
+        return deck_key(self.plan, self._theme_key(), RENDERER_VERSION, image_hashes, options)
     
-    def _add_slide_title(self, slide, title: str):
+    def _theme_key(self) -> str:
+        # テーマは名前と定義内容のハッシュ、テンプレートファイルと静的アセット（帯画像など）の内容ハッシュで区別する
+        # （themes/*.json・テンプレート・アセットのどれを変えても作り直す）
+        return f"{self.theme.name}@{self.theme.fingerprint}@{self.template.template.digest}@{self._asset_digest}"
+
+    def slide_cache_key(self, spec: Dict[str, Any]) -> str:
+        """スライドキャッシュのキー（仕様・テーマ・配色・参照画像の内容で決まる）"""
+        image_hashes = {}
+        for ref in collect_image_refs({"slides": [spec]}):
+            image_hashes[ref] = self._image_digests.get(self._resolve_image_path(ref), "!unavailable")
+
+        # 全体背景はマスターにあってスライドの XML には入らないので、キーに含めない
+        colors = {k: str(v) for k, v in self.colors.items()}
+        return slide_key(spec, self._theme_key(), colors, None, image_hashes,
+                         RENDERER_VERSION, (self.layout.page_w, self.layout.page_h))
+
+    def _add_slide_title(self, slide, title: Optional[str], default: Optional[str] = None):
         """
-        スライドタイトルを描画する共通関数
-        左端にアクセントカラーの縦長バーを置き、
+        スライドタイトルを描画する共通関数（slides_* の共通レンダラーから呼ばれる）
+        描き方はテーマの add_title に任せる（テーマ側で後から消して描き直さずに済む）
+        default は title が無いときの見出し。使うかどうかはテーマが決める
+        """
+        self.theme.add_title(self, slide, title, default)
+
+    def _add_accent_title(self, slide, title: str):
+        """
+        既定のタイトル: 左端にアクセントカラーの縦長バーを置き、
         その右にタイトルテキストを配置する。
         """
         # レイアウトからタイトル領域を取得
-        t_rect = self.layout.get_rect("contentSlide.title")
-        left, top, width, height = t_rect["left"], t_rect["top"], t_rect["width"], t_rect["height"]
+        left, top, width, height = self.layout.get_rect("contentSlide.title")
 
         # --- 縦長バー ---
         bar_width = Pt(6)   # 適度に細いバー
@@ -406,25 +424,24 @@ class SlideFactory:
         tp.alignment = PP_ALIGN.LEFT
         tf.vertical_anchor = MSO_ANCHOR.MIDDLE
 
-    def _apply_background(self, slide, slide_data: dict = None,apply_background = True):
-        bg_url = None
+    def _apply_background(self, slide, slide_data: dict = None):
+        """
+        スライド固有の背景画像だけを描く（背景色と全体背景はマスターから継承する）
+        画像はスライドの背景（p:bg の画像塗り）にする。図形にするとレイアウト側の装飾（帯画像・罫線）より
+        手前に来て隠してしまう（レイアウトの図形は常にスライドの図形の下に描かれる）
+        """
         if slide_data and "background-image" in slide_data:
-            bg_url = slide_data["background-image"]
-            stream, _ = self._load_image(bg_url)
+            stream, _ = self._load_image(slide_data["background-image"])
             if stream :
-                slide.shapes.add_picture(stream, 0, 0,
-                                        width=self.prs.slide_width,
-                                        height=self.prs.slide_height)
-        elif apply_background and self._global_bg:
-            if self._global_bg :
-                slide.shapes.add_picture(self._global_bg, 0, 0,
-                                        width=self.prs.slide_width,
-                                        height=self.prs.slide_height)
-        else:
-            fill = slide.background.fill
-            fill.solid()
-            fill.fore_color.rgb = self.colors["background"]    
-            
+                _, rId = slide.part.get_or_add_image_part(stream)
+                bgPr = slide._element.cSld.get_or_add_bgPr()
+                for fill in list(bgPr)[:-1]:
+                    bgPr.remove(fill)
+                bgPr.insert(0, parse_xml(
+                    f'<a:blipFill {nsdecls("a", "r")} dpi="0" rotWithShape="1"><a:blip r:embed="{rId}"/>'
+                    '<a:srcRect/><a:stretch><a:fillRect/></a:stretch></a:blipFill>'
+                ))
+
     def _set_shape_transparency(self, shape, alpha_val: int):
         """
         shape.fill に alpha 要素を追加して透過を指定（alpha_val は 0〜100000）
@@ -438,21 +455,71 @@ class SlideFactory:
         sF.append(alpha_elem)
 
     # ---------------------- ビルド関数 ----------------------
-def build_pptx_from_plan(plan: Dict[str, Any], out_path: str, themename):
-    
-    from themes_default import DefaultTheme
-    from themes_simplenote import SimpleNoteTheme
-
-    if themename == "default":
-        theme = DefaultTheme()
-    elif themename == "simplenote":    
-        theme = SimpleNoteTheme()
+def _with_metrics(info: Dict[str, Any], sf: SlideFactory, out_path, started_at: float) -> Dict[str, Any]:
+    """ビルド情報に計測値（ビルド時間・出力サイズ・スライド/画像ごとの時間）を付ける"""
+    if isinstance(out_path, (str, os.PathLike)):
+        output_bytes = os.path.getsize(out_path)
     else:
-        theme = DefaultTheme
-
-    sf = SlideFactory(plan,theme)
+        output_bytes = out_path.tell()
+    info["metrics"] = dict(sf.metrics, build_ms=(time.perf_counter() - started_at) * 1000,
+                           output_bytes=output_bytes)
+    return info
+
+
+def warm_up() -> Dict[str, Any]:
+    """
+    ワーカー起動直後に呼ぶ下準備（python-pptx 一式とテーマ定義の読み込み・テーマ別ベースの構築・静的アセットの先読み）
+    最初のリクエストがこれらの初期化コストを払わずに済む
+    """
+    timings = {}
+    for name in theme_names():
+        theme = get_theme(name)
+        for aspect in theme.layouts:
+            t0 = time.perf_counter()
+            SlideFactory({"slides": [], "aspect": aspect}, theme)
+            timings[f"{name}/{aspect}"] = round((time.perf_counter() - t0) * 1000, 1)
+    return timings
+
+
+def build_pptx_from_plan(plan: Dict[str, Any], out_path, themename, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    設計図から PPTX を生成して out_path に保存し、キャッシュ状態などのビルド情報を返す
+    out_path はファイルパスか、書き込み可能なバイナリストリーム（一時ファイルを作らずに済む）
+    use_cache=False ならキャッシュを読まずに必ずレンダリングする（結果はキャッシュを更新）
+    DECK_CACHE=0 / SLIDE_CACHE=0 ならデッキ / スライド単位のキャッシュを一切使わない
+    """
+    started_at = time.perf_counter()
+
+    # 共有のテーマオブジェクト（定義の読み込み・検証は初回のみ）
+    theme = get_theme(themename)
+    sf = SlideFactory(plan, theme)
+
+    # 完成デッキキャッシュ（画像はプリフェッチ済みなので内容ハッシュでキーを作れる）
+    deck_cache = get_deck_cache() if os.getenv("DECK_CACHE", "1") != "0" else None
+    key = sf.deck_cache_key() if deck_cache else None
+
+    if deck_cache and use_cache:
+        cached = deck_cache.get(key)
+        if cached:
+            if isinstance(out_path, (str, os.PathLike)):
+                Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(cached, out_path)
+            else:
+                with open(cached, "rb") as f:
+                    shutil.copyfileobj(f, out_path)
+            slides = {"reused": len(plan.get("slides", [])), "rendered": 0}
+            return _with_metrics({"cache": {"status": CACHE_HIT, "key": key}, "slides": slides},
+                                 sf, out_path, started_at)
 
-    for spec in plan.get("slides", []):
-        sf.add_slide(spec)
+    # 変更の無いスライドは前回のレンダリング結果を再利用する
+    slide_cache = get_slide_cache() if os.getenv("SLIDE_CACHE", "1") != "0" else None
+    slides = sf.build_slides(slide_cache, use_cache=use_cache)
 
     sf.save(out_path)
+
+    if deck_cache:
+        deck_cache.put(key, out_path)
+        info = {"cache": {"status": CACHE_MISS if use_cache else CACHE_BYPASS, "key": key}, "slides": slides}
+    else:
+        info = {"cache": {"status": CACHE_BYPASS, "key": None}, "slides": slides}
+    return _with_metrics(info, sf, out_path, started_at)
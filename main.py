@@ -1,81 +1,184 @@
-import sys, json, uuid, tempfile, os
+import sys, json, uuid, tempfile, os, asyncio, time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from datetime import datetime, timedelta
-from fastapi import FastAPI, UploadFile, Body, File, Query
-from fastapi.responses import JSONResponse
-import uvicorn
+from fastapi import FastAPI, UploadFile, Body, File, Header, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 
 
-# --- PPTX生成関数 ---
-from json2Slide import build_pptx_from_plan  
+# --- PPTX生成（json2Slide / python-pptx はビルドするワーカー側でだけ読み込む）---
+from build_executor import BuildExecutor
+from deck_cache import CACHE_HIT, get_deck_cache
+from image_prefetch import warm_image_cache
+from profiling import profile_requested, run_profiled
+from job_queue import JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JobStore, JobWorkers
+import metrics
+from storage import PPTX_MEDIA_TYPE, LocalStorage, get_storage
 
-# --- APIモード用: Blob設定 ---
-BLOB_CONN_STR = os.environ.get("AZURE_STORAGE_CONNECTION_STRING")
-CONTAINER_NAME = "pptx-output"
+# --- ビルド実行層（BUILD_EXECUTOR=inline/thread/process, BUILD_WORKERS=N）---
+build_executor = BuildExecutor()
+
+# --- APIモード用: 保存先（STORAGE_BACKEND=azure/local, AZURE_STORAGE_CONNECTION_STRING）---
+storage = get_storage()
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# --- バッチ生成の同時ビルド数の上限（BATCH_MAX_CONCURRENCY）---
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "0")) or build_executor.workers * 2
 
 ENV = os.getenv("APP_ENV", "dev")
 
-if BLOB_CONN_STR:
-    from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
-    blob_service_client = BlobServiceClient.from_connection_string(BLOB_CONN_STR)
-    container_client = blob_service_client.get_container_client(CONTAINER_NAME)
+async def upload_output(info) -> str:
+    """生成したPPTXを保存してURLを返す（キャッシュヒットしたデッキは保存済みURLを再利用）"""
+    cache = info["cache"]
+    if cache["status"] == CACHE_HIT:
+        saved = get_deck_cache().get_stored(cache["key"])
+        # 保存先から消えていた（ライフサイクル管理などで削除された）URL は返さず、アップロードし直す
+        if saved and saved["blob_name"] and await storage.verify_async(saved["blob_name"]):
+            return saved["url"]
+        if saved:
+            get_deck_cache().drop_url(cache["key"])
+
+    stored = await storage.upload_async(info["data"])
+    if cache["key"]:
+        get_deck_cache().set_url(cache["key"], stored["url"], stored["expires_at"], stored["blob_name"])
+    return stored["url"]
+
+def save_local(info, name: str) -> str:
+    """開発用: Blob未設定のときだけPPTXをローカルに書き出す"""
+    out_path = Path(tempfile.gettempdir()) / f"{name}.pptx"
+    out_path.write_bytes(info["data"])
+    return str(out_path)
+
+async def store_result(info, name) -> dict:
+    """ビルド結果を保存先に置き、URL（Blob未設定の開発環境ではローカルパス）とビルド情報を返す"""
+    result = {"timings": info["timings"], "cache": info["cache"], "slides": info["slides"]}
+    if "profile" in info:
+        result["profile"] = info["profile"]
+
+    if storage is None:
+        if ENV == "dev":
+            local_path = await asyncio.to_thread(save_local, info, name)
+            return {"local_path": local_path, "note": "Blob未設定なのでローカル保存", **result}
+        raise RuntimeError("保存先が未設定です！（AZURE_STORAGE_CONNECTION_STRING または STORAGE_BACKEND）")
+
+    sas_url = await upload_output(info)
+    return {"url": sas_url, **result}
+
+def pptx_response(info) -> StreamingResponse:
+    """メモリ上のPPTXをそのままクライアントへストリーミングする"""
+    data = memoryview(info["data"])
+
+    def chunks():
+        for offset in range(0, len(data), STREAM_CHUNK_SIZE):
+            yield data[offset:offset + STREAM_CHUNK_SIZE]
+
+    return StreamingResponse(
+        chunks(),
+        media_type=PPTX_MEDIA_TYPE,
+        headers={
+            "Content-Disposition": 'attachment; filename="slides.pptx"',
+            "Content-Length": str(len(data)),
+            "X-Deck-Cache": info["cache"]["status"],
+            "X-Slides-Reused": str(info["slides"]["reused"]),
+            "X-Slides-Rendered": str(info["slides"]["rendered"]),
+            "X-Build-Ms": str(info["timings"]["build_ms"]),
+            **({"X-Profile": info["profile"]["summary"]} if info.get("profile", {}).get("kept") else {}),
+        },
+    )
+
+# --- 非同期ジョブ: ワーカー側の処理 ---
+async def run_job(job):
+    """キューから取り出したジョブをビルドし、保存先の情報を返す"""
+    info = await build_executor.run(job["plan"], None, job["theme"])
+    return await store_result(info, job["id"])
+
+# --- 非同期ジョブ: キュー（JOB_DB_PATH, JOB_WORKERS=N, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS）---
+job_store = JobStore()
+job_workers = JobWorkers(
+    job_store, run_job,
+    concurrency=int(os.getenv("JOB_WORKERS", "0")) or build_executor.workers
+)
+
+# --- 起動後の準備（保存先コンテナの作成・ビルドワーカーのウォームアップ）---
+READY_RETRY_SECONDS = float(os.getenv("READY_RETRY_SECONDS", "5"))
+readiness = {"ready": False, "checks": {}}
+
+async def prepare_storage():
+    """保存先のクライアント生成とコンテナ作成（失敗したら間を置いて再試行する）"""
+    if storage is None:
+        readiness["checks"]["storage"] = {"status": "skipped"}
+        return
+    while True:
+        t0 = time.perf_counter()
+        try:
+            await asyncio.to_thread(storage.prepare)
+            readiness["checks"]["storage"] = {"status": "ok", "backend": storage.name,
+                                              "ms": round((time.perf_counter() - t0) * 1000, 1)}
+            return
+        except Exception as e:
+            readiness["checks"]["storage"] = {"status": "error", "backend": storage.name, "error": repr(e)}
+            print(f"[ERROR] 保存先の準備に失敗しました（{READY_RETRY_SECONDS}s後に再試行）: {repr(e)}",
+                  file=sys.stderr, flush=True)
+            await asyncio.sleep(READY_RETRY_SECONDS)
+
+async def prepare_builds():
+    """ビルドワーカーを起動し、json2Slide の読み込みとテーマ別ベースの構築を済ませておく"""
     try:
-        container_client.create_container()
-    except Exception:
-        pass
-
-    def upload_to_blob(output_path: str) -> str:
-        """BlobにアップロードしてSAS URLを返す"""
-        blob_name = f"{uuid.uuid4()}.pptx"
-        blob_client = container_client.get_blob_client(blob_name)
-        with open(output_path, "rb") as data:
-            blob_client.upload_blob(data, overwrite=True)
-
-        sas_token = generate_blob_sas(
-            account_name=blob_service_client.account_name,
-            container_name=CONTAINER_NAME,
-            blob_name=blob_name,
-            account_key=blob_service_client.credential.account_key,
-            permission=BlobSasPermissions(read=True),
-            expiry=datetime.utcnow() + timedelta(days=7),
-        )
-        return f"{blob_client.url}?{sas_token}"
+        warm = await asyncio.to_thread(build_executor.warm_up)
+        readiness["checks"]["build"] = {"status": "ok", **warm}
+    except Exception as e:
+        # ウォームアップに失敗してもビルド時にもう一度初期化されるので、準備完了として扱う
+        readiness["checks"]["build"] = {"status": "error", "error": repr(e)}
+        print(f"[WARN] ビルドワーカーのウォームアップに失敗しました: {repr(e)}", file=sys.stderr, flush=True)
+
+async def prepare_app():
+    t0 = time.perf_counter()
+    await asyncio.gather(prepare_storage(), prepare_builds())
+    readiness["ready"] = True
+    print(f"[READY] {(time.perf_counter() - t0) * 1000:.1f}ms {json.dumps(readiness['checks'], ensure_ascii=False)}",
+          file=sys.stderr, flush=True)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    job_workers.start()
+    # 準備を待たずにリクエストを受け付ける（準備状況は /readyz で確認できる）
+    prepare_task = asyncio.create_task(prepare_app())
+    yield
+    prepare_task.cancel()
+    await job_workers.stop()
+    build_executor.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 # --- APIモード: ファイルアップロード ---
 @app.post("/generate")
 async def generate(
     file: UploadFile = File(...),
-    theme: str = Query(..., description="スライドテーマ（必須）")
+    theme: str = Query(..., description="スライドテーマ（必須）"),
+    cache: bool = Query(True, description="完成デッキのキャッシュを使うか"),
+    download: bool = Query(False, description="PPTX本体をレスポンスとして直接返すか"),
+    profile: bool = Query(False, description="ビルドをプロファイルするか（X-Profile ヘッダでも可）"),
+    x_profile: str = Header(None)
 ):
-    # JSONを一時ファイルに保存
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".json") as tmp:
-        tmp.write(await file.read())
-        json_path = Path(tmp.name)
+    # アップロードされたJSONはメモリ上でそのままパース
+    plan = json.loads((await file.read()).decode("utf-8"))
 
-    out_path = Path(tempfile.gettempdir()) / f"{uuid.uuid4()}.pptx"
-
-    with json_path.open("r", encoding="utf-8") as f:
-        plan = json.load(f)
-
-    build_pptx_from_plan(plan, out_path, themename=theme)
-
-    if not BLOB_CONN_STR:
-        if ENV == "dev":
-            return {"local_path": str(out_path), "note": "Blob未設定なのでローカル保存"}
-        else:
-            raise RuntimeError("AZURE_STORAGE_CONNECTION_STRING が未設定です！")
+    info = await build_executor.run(plan, None, theme, use_cache=cache,
+                                    profile=profile or profile_requested(x_profile))
+    if download:
+        return pptx_response(info)
 
-    sas_url = upload_to_blob(out_path)
-    return {"url": sas_url}
+    return await store_result(info, uuid.uuid4())
 
 
 # --- APIモード: JSON直受け ---
 @app.post("/generate-json")
 async def generate_json(
     body: str = Body(...),
-    theme: str = Query(..., description="スライドテーマ（必須）")
+    theme: str = Query(..., description="スライドテーマ（必須）"),
+    cache: bool = Query(True, description="完成デッキのキャッシュを使うか"),
+    download: bool = Query(False, description="PPTX本体をレスポンスとして直接返すか"),
+    profile: bool = Query(False, description="ビルドをプロファイルするか（X-Profile ヘッダでも可）"),
+    x_profile: str = Header(None)
 ):
     try:
         # JSONパース（壊れていたらINVALID_JSON）
@@ -93,11 +196,10 @@ async def generate_json(
                 }
             )
 
-        out_path = Path(tempfile.gettempdir()) / f"{uuid.uuid4()}.pptx"
-
-        # PPTX生成
+        # PPTX生成（メモリ上に保存）
         try:
-            build_pptx_from_plan(plan, out_path, themename=theme)
+            info = await build_executor.run(plan, None, theme, use_cache=cache,
+                                            profile=profile or profile_requested(x_profile))
         except Exception as e:
             return JSONResponse(
                 status_code=500,
@@ -110,15 +212,24 @@ async def generate_json(
                 }
             )
 
+        # 直接ダウンロード
+        if download:
+            return pptx_response(info)
+
         # Blob保存 or ローカル返却
-        if not BLOB_CONN_STR:
+        if storage is None:
             if ENV == "dev":
+                local_path = await asyncio.to_thread(save_local, info, uuid.uuid4())
                 return JSONResponse(
                     status_code=200,
                     content={
                         "success": True,
-                        "local_path": str(out_path),
-                        "note": "Blob未設定なのでローカル保存"
+                        "local_path": local_path,
+                        "note": "Blob未設定なのでローカル保存",
+                        "timings": info["timings"],
+                        "cache": info["cache"],
+                        "slides": info["slides"],
+                        **({"profile": info["profile"]} if "profile" in info else {})
                     }
                 )
             else:
@@ -128,14 +239,19 @@ async def generate_json(
                         "success": False,
                         "error": {
                             "code": "NO_BLOB_CONFIG",
-                            "message": "AZURE_STORAGE_CONNECTION_STRING が未設定です"
+                            "message": "保存先が未設定です（AZURE_STORAGE_CONNECTION_STRING または STORAGE_BACKEND）"
                         }
                     }
                 )
 
         # 正常終了
-        sas_url = upload_to_blob(out_path)
-        return JSONResponse(status_code=200, content={"success": True, "url": sas_url})
+        sas_url = await upload_output(info)
+        return JSONResponse(
+            status_code=200,
+            content={"success": True, "url": sas_url, "timings": info["timings"],
+                     "cache": info["cache"], "slides": info["slides"],
+                     **({"profile": info["profile"]} if "profile" in info else {})}
+        )
 
     except Exception as e:
         # 想定外のエラー
@@ -150,21 +266,377 @@ async def generate_json(
             }
         )
 
+# --- APIモード: 非同期ジョブ投入 ---
+@app.post("/jobs", status_code=202)
+async def create_job(
+    body: str = Body(...),
+    theme: str = Query(..., description="スライドテーマ（必須）")
+):
+    try:
+        plan = json.loads(body)
+    except json.JSONDecodeError:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "success": False,
+                "error": {
+                    "code": "INVALID_JSON",
+                    "message": "アップロードされたJSONが壊れています"
+                }
+            }
+        )
+
+    job_id = await asyncio.to_thread(job_store.enqueue, plan, theme)
+    job_workers.notify()
+    return {"success": True, "job_id": job_id, "status": "queued"}
+
+
+# --- APIモード: 非同期ジョブの状態取得 ---
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        return JSONResponse(
+            status_code=404,
+            content={
+                "success": False,
+                "error": {
+                    "code": "JOB_NOT_FOUND",
+                    "message": f"ジョブが見つかりません: {job_id}"
+                }
+            }
+        )
+    return {"success": True, **job}
+
+# --- APIモード: バッチ生成（NDJSON in / NDJSON out）---
+def parse_batch_line(line: str, index: int, default_theme):
+    """
+    NDJSON の1行を (id, plan, theme) にする
+    {"id": ..., "theme": ..., "plan": {...}} の形式。plan キーが無ければ行全体を設計図とみなす
+    """
+    item = json.loads(line)
+    if not isinstance(item, dict):
+        raise ValueError("各行はJSONオブジェクトにしてください")
+    if "plan" in item:
+        plan, theme, item_id = item["plan"], item.get("theme") or default_theme, item.get("id", index)
+    else:
+        plan, theme, item_id = item, default_theme, index
+    if not isinstance(plan, dict):
+        raise ValueError("plan はJSONオブジェクトにしてください")
+    if not theme:
+        raise ValueError("theme が指定されていません（行の theme かクエリの theme）")
+    return item_id, plan, theme
+
+
+@app.post("/batch")
+async def batch_generate(
+    request: Request,
+    theme: str = Query(None, description="行に theme が無いときの既定テーマ"),
+    concurrency: int = Query(0, ge=0, description="同時ビルド数（0 なら既定。BATCH_MAX_CONCURRENCY が上限）"),
+    cache: bool = Query(True, description="完成デッキのキャッシュを使うか")
+):
+    lines = [line for line in (await request.body()).decode("utf-8").splitlines() if line.strip()]
+    limit = max(1, min(concurrency or build_executor.workers, BATCH_MAX_CONCURRENCY))
+    started_at = time.time()
+
+    # 先に全行をパース（壊れた行はその行だけエラーとして返す）
+    items, results = [], []
+    for index, line in enumerate(lines):
+        try:
+            items.append((index, *parse_batch_line(line, index, theme)))
+        except ValueError as e:
+            code = "INVALID_JSON" if isinstance(e, json.JSONDecodeError) else "INVALID_REQUEST"
+            results.append({"index": index, "id": index, "success": False,
+                            "error": {"code": code, "message": str(e)}})
+
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run_one(index, item_id, plan, item_theme):
+        async with semaphore:
+            try:
+                info = await build_executor.run(plan, None, item_theme, use_cache=cache)
+                stored = await store_result(info, uuid.uuid4())
+                return {"index": index, "id": item_id, "success": True, "theme": item_theme, **stored}
+            except Exception as e:
+                return {"index": index, "id": item_id, "success": False, "theme": item_theme,
+                        "error": {"code": "BUILD_FAILED", "message": f"PPTX生成に失敗しました: {str(e)}"}}
+
+    async def stream():
+        succeeded = failed = 0
+        for result in results:
+            failed += 1
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+        # 全設計図のリモート画像を重複なしで先に取得し、各ビルドで共有する
+        await asyncio.to_thread(warm_image_cache, [plan for _, _, plan, _ in items])
+
+        tasks = [asyncio.create_task(run_one(*item)) for item in items]
+        try:
+            # 終わったものから順に返す
+            for finished in asyncio.as_completed(tasks):
+                result = await finished
+                if result["success"]:
+                    succeeded += 1
+                else:
+                    failed += 1
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+        finally:
+            # クライアントが切断したら残りはキャンセル
+            for task in tasks:
+                task.cancel()
+
+        summary = {"done": True, "total": len(lines), "succeeded": succeeded, "failed": failed,
+                   "concurrency": limit, "elapsed_ms": round((time.time() - started_at) * 1000, 1)}
+        yield json.dumps(summary, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+# --- APIモード: ローカル保存先の配信（STORAGE_BACKEND=local の開発用）---
+@app.get("/storage/{blob_name}")
+async def get_stored_deck(blob_name: str):
+    if isinstance(storage, LocalStorage) and storage.exists(blob_name):
+        return FileResponse(storage.path_for(blob_name), media_type=PPTX_MEDIA_TYPE, filename=blob_name)
+    if storage is not None:
+        # 配信に失敗した Blob は「アップロード済み」の記録から外す（次のアップロードで置き直す）
+        storage.forget(blob_name)
+    return JSONResponse(
+        status_code=404,
+        content={"success": False, "error": {"code": "NOT_FOUND", "message": f"{blob_name} は保存されていません"}}
+    )
+
+# --- APIモード: ヘルスチェック ---
+@app.get("/healthz")
+async def healthz():
+    """プロセスが応答できるか（準備の完了は問わない）"""
+    return {"success": True, "status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """保存先とビルドワーカーの準備が済んだか（済むまでは 503）"""
+    if not readiness["ready"]:
+        return JSONResponse(
+            status_code=503,
+            content={"success": False, "error": {"code": "NOT_READY", "message": "起動準備中です"},
+                     "checks": readiness["checks"]}
+        )
+    return {"success": True, "status": "ready", "checks": readiness["checks"]}
+
+# --- APIモード: Prometheus メトリクス ---
+@app.get("/metrics")
+async def get_metrics():
+    if not metrics.ENABLED:
+        return JSONResponse(
+            status_code=503,
+            content={"success": False, "error": {"code": "METRICS_UNAVAILABLE",
+                                                 "message": "prometheus_client がインストールされていません"}}
+        )
+    counts = {}
+    for status in (JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED):
+        counts[status] = await asyncio.to_thread(job_store.count, status)
+    metrics.set_job_counts(counts)
+    return Response(metrics.render_latest(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+# --- APIモード: 完成デッキキャッシュの無効化 ---
+@app.delete("/cache/decks")
+async def clear_deck_cache():
+    removed = await asyncio.to_thread(get_deck_cache().clear)
+    return {"success": True, "removed": removed}
+
+
+@app.delete("/cache/decks/{key}")
+async def invalidate_deck_cache(key: str):
+    removed = await asyncio.to_thread(get_deck_cache().invalidate, key)
+    return {"success": True, "removed": int(removed)}
+
 # --- CLIモード ---
 def cli_main():
-    if len(sys.argv) < 4:
-        print("Usage: python main.py plan.json out.pptx theme")
+    from json2Slide import build_pptx_from_plan
+
+    if sys.argv[1] == "batch":
+        sys.exit(cli_batch(sys.argv[2:]))
+
+    flags = {"--no-cache", "--profile"}
+    args = [a for a in sys.argv[1:] if a not in flags]
+    use_cache = "--no-cache" not in sys.argv[1:]
+    profile = profile_requested("--profile" in sys.argv[1:])
+    if len(args) < 3:
+        print("Usage: python main.py plan.json out.pptx theme [--no-cache] [--profile]")
+        print("       python main.py batch [plans/globs/dirs ...] [--manifest FILE] --theme T "
+              "[--out-dir DIR] [--jobs N] [--no-cache] [--profile]")
         sys.exit(1)
 
-    plan_path = Path(sys.argv[1])
-    out_path = sys.argv[2]
-    theme = sys.argv[3]
+    plan_path = Path(args[0])
+    out_path = args[1]
+    theme = args[2]
 
     with plan_path.open("r", encoding="utf-8") as f:
         plan = json.load(f)
 
-    build_pptx_from_plan(plan, out_path, themename=theme)
-    print(f"✅ Done: {out_path}")
+    def build():
+        return build_pptx_from_plan(plan, out_path, themename=theme, use_cache=use_cache)
+
+    if profile:
+        info, info_profile = run_profiled(build, plan, theme)
+    else:
+        info, info_profile = build(), None
+    print(f"✅ Done: {out_path} (cache {info['cache']['status']}, "
+          f"slides reused={info['slides']['reused']} rendered={info['slides']['rendered']})")
+    text_styles = info.get("metrics", {}).get("text_styles", {})
+    if text_styles.get("runs"):
+        print(f"🔤 Text styles: runs={text_styles['runs']} rPr={text_styles['rpr_bytes']}B "
+              f"saved={text_styles['saved_bytes']}B")
+    if info_profile:
+        print(f"🔍 Profile: {info_profile.get('summary', 'threshold 未満のため保存なし')} "
+              f"({info_profile['build_ms']}ms)")
+
+
+# --- CLIモード: 複数設計図の並列生成 ---
+def collect_cli_plans(inputs, manifest, default_theme, out_dir):
+    """
+    glob・ディレクトリ・ファイル・マニフェストから (設計図パス, テーマ, 出力パス) の一覧を作る
+    マニフェストは1行に「設計図パス [テーマ [出力パス]]」（# 以降はコメント）
+    出力パスの既定は out_dir/<設計図名>.<テーマ>.pptx。設計図名が重なるときは親ディレクトリ名を、
+    それでも重なるときは通し番号を付ける。指定した出力パスが重なる場合は ValueError
+    """
+    import glob
+
+    entries = []
+
+    def add(plan_path, theme=None, out_path=None):
+        plan_path = Path(plan_path)
+        theme = theme or default_theme
+        if any(e[0] == plan_path and e[1] == theme for e in entries):
+            return
+        entries.append((plan_path, theme, Path(out_path) if out_path else None))
+
+    for pattern in inputs:
+        if Path(pattern).is_dir():
+            for path in sorted(Path(pattern).glob("*.json")):
+                add(path)
+        elif glob.has_magic(pattern):
+            for path in sorted(glob.glob(pattern)):
+                add(path)
+        else:
+            add(pattern)
+
+    if manifest:
+        base = Path(manifest).parent
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                fields = line.split("#", 1)[0].split()
+                if fields:
+                    add(base / fields[0], *fields[1:3])
+    return _assign_out_paths(entries, out_dir)
+
+
+def _assign_out_paths(entries, out_dir):
+    """出力パスの無い項目に、互いに（指定済みのパスとも）重ならない既定の出力パスを割り当てる"""
+    def default_name(plan_path, theme, with_parent, index=1):
+        prefix = f"{plan_path.resolve().parent.name}-" if with_parent else ""
+        suffix = f"-{index}" if index > 1 else ""
+        return f"{prefix}{plan_path.stem}{suffix}.{theme}.pptx"
+
+    taken = {os.path.abspath(out) for _, _, out in entries if out is not None}
+    stems = {}
+    for plan_path, theme, out in entries:
+        if out is None:
+            key = default_name(plan_path, theme, False)
+            stems[key] = stems.get(key, 0) + 1
+
+    resolved = []
+    for plan_path, theme, out in entries:
+        if out is None:
+            with_parent = stems[default_name(plan_path, theme, False)] > 1
+            out = Path(out_dir) / default_name(plan_path, theme, with_parent)
+            n = 1
+            while os.path.abspath(out) in taken:
+                n += 1
+                out = Path(out_dir) / default_name(plan_path, theme, with_parent, n)
+            taken.add(os.path.abspath(out))
+        resolved.append((plan_path, theme, out))
+
+    # 指定した出力パス同士の重なりはビルドの前にエラーにする（後のデッキが前のデッキを上書きしてしまう）
+    seen = {}
+    for plan_path, theme, out in resolved:
+        other = seen.setdefault(os.path.abspath(out), (plan_path, theme))
+        if other != (plan_path, theme):
+            raise ValueError(f"出力先が重なっています: {out}（{other[0]} [{other[1]}] と {plan_path} [{theme}]）")
+    return resolved
+
+
+def cli_batch(argv) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="main.py batch", description="複数の設計図をまとめて並列生成する")
+    parser.add_argument("inputs", nargs="*", help="設計図のパス・glob（例: 'plan*.json'）・ディレクトリ")
+    parser.add_argument("--manifest", help="1行に「設計図パス [テーマ [出力パス]]」を並べたファイル")
+    parser.add_argument("--theme", help="マニフェストで指定が無いときのテーマ")
+    parser.add_argument("--out-dir", default="out", help="出力先ディレクトリ（既定: out）")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1, help="並列プロセス数")
+    parser.add_argument("--no-cache", action="store_true", help="キャッシュを読まずに必ずレンダリングする")
+    parser.add_argument("--profile", action="store_true", help="各ビルドをプロファイルする（BUILD_PROFILE_* で設定）")
+    args = parser.parse_args(argv)
+
+    try:
+        entries = collect_cli_plans(args.inputs, args.manifest, args.theme, args.out_dir)
+    except ValueError as e:
+        parser.error(str(e))
+    if not entries:
+        parser.error("設計図が見つかりません")
+    missing = [str(plan_path) for plan_path, theme, _ in entries if not theme]
+    if missing:
+        parser.error(f"テーマが指定されていません（--theme かマニフェストで指定）: {', '.join(missing)}")
+
+    jobs = max(1, args.jobs)
+    executor = BuildExecutor(mode="process" if jobs > 1 else "inline", workers=jobs)
+    rows = []
+
+    async def run_all():
+        plans = {}
+        for plan_path, theme, out_path in entries:
+            try:
+                with plan_path.open("r", encoding="utf-8") as f:
+                    plans[plan_path] = json.load(f)
+            except (OSError, ValueError) as e:
+                rows.append((plan_path, theme, None, e))
+
+        # 全設計図のリモート画像を先に1回だけ取得（ディスクキャッシュ経由で全ワーカーが共有）
+        await asyncio.to_thread(warm_image_cache, list(plans.values()))
+
+        async def run_one(plan_path, theme, out_path):
+            try:
+                info = await executor.run(plans[plan_path], out_path, theme, use_cache=not args.no_cache,
+                                          profile=args.profile)
+                rows.append((plan_path, theme, out_path, info))
+            except Exception as e:
+                rows.append((plan_path, theme, out_path, e))
+
+        await asyncio.gather(*(run_one(*entry) for entry in entries if entry[0] in plans))
+
+    started_at = time.time()
+    try:
+        asyncio.run(run_all())
+    finally:
+        executor.shutdown()
+    elapsed = max(time.time() - started_at, 1e-6)
+
+    # ---- 結果サマリ ----
+    failed = slides = 0
+    print(f"{'plan':32s} {'theme':12s} {'cache':7s} {'slides':>6s} {'build_ms':>9s} {'wait_ms':>8s}  result")
+    for plan_path, theme, out_path, info in sorted(rows, key=lambda r: str(r[0])):
+        if isinstance(info, Exception):
+            failed += 1
+            print(f"{str(plan_path):32s} {theme:12s} {'-':7s} {'-':>6s} {'-':>9s} {'-':>8s}  ❌ {info!r}")
+            continue
+        count = info["slides"]["reused"] + info["slides"]["rendered"]
+        slides += count
+        print(f"{str(plan_path):32s} {theme:12s} {info['cache']['status']:7s} {count:6d} "
+              f"{info['timings']['build_ms']:9.1f} {info['timings']['queue_wait_ms']:8.1f}  ✅ {out_path}")
+
+    done = len(rows) - failed
+    print(f"\n{done}/{len(rows)} decks, {slides} slides in {elapsed:.2f}s with {jobs} jobs "
+          f"({done / elapsed:.2f} decks/s, {slides / elapsed:.1f} slides/s)")
+    return 1 if failed else 0
 
 
 # --- 実行切替 ---
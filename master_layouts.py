@@ -0,0 +1,128 @@
+# master_layouts.py
+"""
+スライドマスター・レイアウトへの静的な装飾の配置
+- テーマの装飾（帯画像・罫線など）はスライドごとの図形にせず、装飾の組み合わせごとに生成した
+  レイアウトへ1度だけ描く（テンプレートのベース構築時。以後はベースごと複製される）
+- 全体背景（background-image・背景色）はデッキごとにマスターへ1つだけ置く
+- 全体背景を出さないスライド用に、マスターの図形を隠した（showMasterSp="0"）レイアウトも対で作る
+- python-pptx にはレイアウトを追加する API が無いので、Blank レイアウトを複製して作る
+- 生成したレイアウトのうちデッキで使わなかったものは保存前に取り除く（prune_unused_layouts）
+- スライドの追加（append_slide）もここで行う（python-pptx の add_slide はスライド数に比例する走査を含む）
+"""
+import copy
+import io
+
+from pptx.opc.constants import CONTENT_TYPE as CT
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.oxml.ns import qn
+from pptx.parts.slide import SlideLayoutPart, SlidePart
+from pptx.shapes.shapetree import BaseShapeFactory
+
+BLANK_LAYOUT_INDEX = 6
+
+# スライドマスター・レイアウトの ID はこの値以上（ECMA-376）
+_MIN_LAYOUT_ID = 2147483648
+
+
+def layout_name(theme_name: str, decorations, hide_master_shapes: bool = False) -> str:
+    name = f"{theme_name}:{'+'.join(decorations) or 'blank'}"
+    return name + ":no-master" if hide_master_shapes else name
+
+
+def _next_layout_id(prs) -> int:
+    ids = [int(el.get("id")) for el in prs.part._element.iter(qn("p:sldMasterId"))]
+    for master in prs.slide_masters:
+        ids.extend(int(el.get("id")) for el in master._element.iter(qn("p:sldLayoutId")))
+    return max([_MIN_LAYOUT_ID - 1] + ids) + 1
+
+
+def add_layout(prs, name: str, hide_master_shapes: bool = False, source_index: int = BLANK_LAYOUT_INDEX):
+    """source_index のレイアウトを複製し、マスターの末尾に追加する"""
+    master = prs.slide_master
+    package = prs.part.package
+
+    element = copy.deepcopy(prs.slide_layouts[source_index]._element)
+    element.cSld.name = name
+    if hide_master_shapes:
+        element.set("showMasterSp", "0")
+
+    part = SlideLayoutPart(package.next_partname("/ppt/slideLayouts/slideLayout%d.xml"),
+                           CT.PML_SLIDE_LAYOUT, package, element)
+    part.relate_to(master.part, RT.SLIDE_MASTER)
+    rId = master.part.relate_to(part, RT.SLIDE_LAYOUT)
+
+    layout_id = _next_layout_id(prs)
+    entry = master._element.get_or_add_sldLayoutIdLst()._add_sldLayoutId(rId=rId)
+    entry.set("id", str(layout_id))
+    return part.slide_layout
+
+
+def append_slide(prs, layout):
+    """
+    layout を使うスライドを末尾に追加する（prs.slides.add_slide と同じ手順・同じ出力）
+    python-pptx はプレゼンからスライドへの関係を張るたびに既存の関係を全部調べる（get_or_add）ので、
+    何百枚も追加するとスライド数の2乗に比例する。新しいスライドへの関係は既存と重なり得ないので直接追加する
+    """
+    pres_part = prs.part
+    slide_part = SlidePart.new(pres_part._next_slide_partname, pres_part.package, layout.part)
+    rId = pres_part.rels._add_relationship(RT.SLIDE, slide_part)
+    slide = slide_part.slide
+    slide.shapes.clone_layout_placeholders(layout)
+    prs.slides._sldIdLst.add_sldId(rId)
+    return slide
+
+
+def prune_unused_layouts(prs, names) -> int:
+    """names のレイアウトのうち、どのスライドからも使われていないものをパッケージから外す"""
+    used = {slide.part.slide_layout.part for slide in prs.slides}
+    removed = 0
+    for master in prs.slide_masters:
+        id_list = master._element.get_or_add_sldLayoutIdLst()
+        for entry in list(id_list.sldLayoutId_lst):
+            layout = master.part.related_slide_layout(entry.rId)
+            if layout.name in names and layout.part not in used:
+                # SlideLayouts.remove と同じ手順（使用中の判定はスライド数ぶんの走査になるので先にまとめて行う）
+                id_list.remove(entry)
+                master.part.drop_rel(entry.rId)
+                removed += 1
+    return removed
+
+
+def add_picture(owner, image, left: int, top: int, width: int = None, height: int = None,
+                name: str = "Picture", at_back: bool = False):
+    """マスター / レイアウトに画像を置く（width / height の片方だけなら縦横比を保つ）"""
+    stream = io.BytesIO(image) if isinstance(image, bytes) else image
+    image_part, rId = owner.part.get_or_add_image_part(stream)
+    width, height = image_part.scale(width, height)
+
+    spTree = owner.shapes._spTree
+    shape_id = spTree._next_shape_id
+    pic = spTree.add_pic(shape_id, f"{name} {shape_id - 1}", image_part.desc, rId, left, top, width, height)
+    if at_back:
+        # nvGrpSpPr / grpSpPr の直後 = 最背面
+        spTree.remove(pic)
+        spTree.insert(2, pic)
+    return BaseShapeFactory(pic, owner.shapes)
+
+
+def add_rectangle(owner, left: int, top: int, width: int, height: int, rgb, name: str = "Rectangle"):
+    """マスター / レイアウトに枠線・影なしの塗りつぶし矩形を置く"""
+    spTree = owner.shapes._spTree
+    shape_id = spTree._next_shape_id
+    sp = spTree.add_autoshape(shape_id, f"{name} {shape_id - 1}", "rect", left, top, width, height)
+    shape = BaseShapeFactory(sp, owner.shapes)
+    shape.fill.solid()
+    shape.fill.fore_color.rgb = rgb
+    shape.line.fill.background()
+    shape.shadow.inherit = False
+    return shape
+
+
+def set_master_background(prs, color, image=None):
+    """デッキ全体の背景色と、全スライド共通の背景画像（任意）をマスターに設定する"""
+    master = prs.slide_master
+    fill = master.background.fill
+    fill.solid()
+    fill.fore_color.rgb = color
+    if image is not None:
+        add_picture(master, image, 0, 0, prs.slide_width, prs.slide_height, name="Background", at_back=True)
@@ -0,0 +1,125 @@
+# metrics.py
+"""
+Prometheus メトリクス（/metrics で公開）
+- ビルドはプロセスプールの子プロセスで走るため、子は計測値をビルド情報 (info["metrics"]) で返し、
+  API プロセス側の observe_build でまとめて記録する
+- prometheus_client が無い環境では何もしない（CLI やベンチマークはそのまま動く）
+"""
+import time
+
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+except ImportError:  # prometheus_client 未導入
+    Counter = Gauge = Histogram = generate_latest = None
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+ENABLED = Histogram is not None
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+_SLIDE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+_DECK_BYTES_BUCKETS = (32e3, 64e3, 128e3, 256e3, 512e3, 1e6, 2e6, 5e6, 10e6, 25e6, 50e6)
+
+if ENABLED:
+    BUILD_SECONDS = Histogram(
+        "json2slide_build_seconds", "build_pptx_from_plan の所要時間",
+        ["theme", "cache"], buckets=_LATENCY_BUCKETS)
+    QUEUE_WAIT_SECONDS = Histogram(
+        "json2slide_build_queue_wait_seconds", "ビルドがワーカーに渡るまでの待ち時間",
+        ["theme"], buckets=_LATENCY_BUCKETS)
+    SLIDE_SECONDS = Histogram(
+        "json2slide_slide_render_seconds", "SlideFactory.add_slide の所要時間（スライド種別ごと）",
+        ["theme", "slide_type"], buckets=_SLIDE_BUCKETS)
+    IMAGE_LOAD_SECONDS = Histogram(
+        "json2slide_image_load_seconds", "SlideFactory._load_image の所要時間",
+        ["theme"], buckets=_SLIDE_BUCKETS)
+    IMAGE_FETCH_SECONDS = Histogram(
+        "json2slide_image_fetch_seconds", "画像の取得時間（キャッシュ結果ごと）",
+        ["theme", "result"], buckets=_LATENCY_BUCKETS)
+    SAVE_SECONDS = Histogram(
+        "json2slide_save_seconds", "SlideFactory.save（画像最適化 + 書き出し）の所要時間",
+        ["theme"], buckets=_LATENCY_BUCKETS)
+    UPLOAD_SECONDS = Histogram(
+        "json2slide_upload_seconds", "保存先へのアップロード時間",
+        ["backend", "uploaded"], buckets=_LATENCY_BUCKETS)
+    DECK_BYTES = Histogram(
+        "json2slide_deck_bytes", "出力デッキのサイズ",
+        ["theme"], buckets=_DECK_BYTES_BUCKETS)
+
+    IMAGE_CACHE_REQUESTS = Counter(
+        "json2slide_image_cache_requests_total", "画像キャッシュの参照数（hit / miss / stale / revalidated）",
+        ["result"])
+    IMAGE_BYTES_FETCHED = Counter(
+        "json2slide_image_bytes_fetched_total", "ネットワークから取得した画像のバイト数")
+    DECK_CACHE_REQUESTS = Counter(
+        "json2slide_deck_cache_requests_total", "完成デッキキャッシュの結果", ["status"])
+    SLIDES = Counter(
+        "json2slide_slides_total", "生成したスライド数（reused / rendered）", ["result"])
+    TEXT_STYLE_SAVED_BYTES = Counter(
+        "json2slide_text_style_saved_bytes_total", "既定テキストスタイルとの差分だけを書いて省いた a:rPr のバイト数",
+        ["theme"])
+
+    BUILDS_IN_FLIGHT = Gauge("json2slide_builds_in_flight", "投入済みで未完了のビルド数")
+    BUILDS_QUEUED = Gauge("json2slide_builds_queued", "ワーカーの空き待ちのビルド数")
+    JOBS = Gauge("json2slide_jobs", "非同期ジョブ数（状態ごと）", ["status"])
+
+
+def observe_build(info: Dict[str, Any], theme: str):
+    """ビルド情報に含まれる計測値をメトリクスに記録する"""
+    if not ENABLED:
+        return
+    m = info.get("metrics") or {}
+    cache_status = info.get("cache", {}).get("status", "")
+
+    BUILD_SECONDS.labels(theme, cache_status).observe(m.get("build_ms", 0) / 1000)
+    QUEUE_WAIT_SECONDS.labels(theme).observe(info.get("timings", {}).get("queue_wait_ms", 0) / 1000)
+    DECK_CACHE_REQUESTS.labels(cache_status).inc()
+    for result in ("reused", "rendered"):
+        SLIDES.labels(result).inc(info.get("slides", {}).get(result, 0))
+
+    for slide_type, ms in m.get("slides", []):
+        SLIDE_SECONDS.labels(theme, slide_type).observe(ms / 1000)
+    for ms in m.get("image_loads", []):
+        IMAGE_LOAD_SECONDS.labels(theme).observe(ms / 1000)
+    for result, ms, nbytes in m.get("image_fetches", []):
+        IMAGE_FETCH_SECONDS.labels(theme, result).observe(ms / 1000)
+        IMAGE_CACHE_REQUESTS.labels(result).inc()
+        if nbytes:
+            IMAGE_BYTES_FETCHED.inc(nbytes)
+    if m.get("save_ms"):
+        SAVE_SECONDS.labels(theme).observe(m["save_ms"] / 1000)
+    if "output_bytes" in m:
+        DECK_BYTES.labels(theme).observe(m["output_bytes"])
+    if m.get("text_styles", {}).get("saved_bytes"):
+        TEXT_STYLE_SAVED_BYTES.labels(theme).inc(m["text_styles"]["saved_bytes"])
+
+
+def set_build_load(in_flight: int, workers: int):
+    if ENABLED:
+        BUILDS_IN_FLIGHT.set(in_flight)
+        BUILDS_QUEUED.set(max(0, in_flight - workers))
+
+
+def set_job_counts(counts: Dict[str, int]):
+    if ENABLED:
+        for status, count in counts.items():
+            JOBS.labels(status).set(count)
+
+
+@contextmanager
+def time_upload(backend: str, result: Optional[dict] = None):
+    """アップロード時間を計測する（result["uploaded"] で新規アップロードか重複スキップかを区別）"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        if ENABLED:
+            uploaded = "true" if (result or {}).get("uploaded") else "false"
+            UPLOAD_SECONDS.labels(backend, uploaded).observe(time.perf_counter() - t0)
+
+
+def render_latest() -> Optional[bytes]:
+    """Prometheus テキスト形式のメトリクス（無効なら None）"""
+    return generate_latest() if ENABLED else None
@@ -0,0 +1,87 @@
+# profiling.py
+"""
+ビルドのオプトイン・プロファイリング
+- 有効化: API は X-Profile ヘッダか ?profile=true、CLI は --profile、共通で環境変数 BUILD_PROFILE=1
+- build_pptx_from_plan を cProfile で包み、設計図のフィンガープリント付きのファイル名で
+  .prof（pstats 形式）と上位関数のテキスト要約、再現用の設計図 JSON を BUILD_PROFILE_DIR に書き出す
+- BUILD_PROFILE_THRESHOLD_MS を指定すると、それより遅かったビルドのプロファイルだけを残す
+- 書き出したファイルは BUILD_PROFILE_MAX_FILES 件を超えたら古いものから消す
+"""
+import cProfile
+import json
+import os
+import pstats
+import tempfile
+import time
+
+from datetime import datetime
+from typing import Any, Callable, Dict, Tuple
+
+from deck_cache import plan_fingerprint
+
+DEFAULT_PROFILE_DIR = os.path.join(tempfile.gettempdir(), "json2slide_profiles")
+DEFAULT_MAX_FILES = 200
+SUMMARY_LINES = 40
+
+
+def profile_requested(flag=None) -> bool:
+    """ヘッダ・クエリの値（"1" / "true" など）か環境変数 BUILD_PROFILE でプロファイルするか決める"""
+    if isinstance(flag, str):
+        flag = flag.strip().lower() in ("1", "true", "yes", "on")
+    return bool(flag) or os.getenv("BUILD_PROFILE", "0") == "1"
+
+
+def run_profiled(fn: Callable[[], Any], plan: Dict[str, Any], themename: str,
+                 threshold_ms: float = None, profile_dir: str = None) -> Tuple[Any, Dict[str, Any]]:
+    """fn() を cProfile 付きで実行し、(fn の戻り値, プロファイル情報) を返す"""
+    threshold_ms = float(threshold_ms if threshold_ms is not None else os.getenv("BUILD_PROFILE_THRESHOLD_MS", 0))
+    profile_dir = profile_dir or os.getenv("BUILD_PROFILE_DIR", DEFAULT_PROFILE_DIR)
+
+    profiler = cProfile.Profile()
+    t0 = time.perf_counter()
+    profiler.enable()
+    try:
+        result = fn()
+    finally:
+        profiler.disable()
+    build_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+    fingerprint = plan_fingerprint(plan)
+    info = {"fingerprint": fingerprint, "build_ms": build_ms, "threshold_ms": threshold_ms, "kept": False}
+    if build_ms < threshold_ms:
+        return result, info
+
+    os.makedirs(profile_dir, exist_ok=True)
+    name = f"{datetime.now():%Y%m%d-%H%M%S-%f}_{fingerprint[:16]}_{themename}_{int(build_ms)}ms"
+    base = os.path.join(profile_dir, name)
+
+    profiler.dump_stats(base + ".prof")
+    # snakeviz などが無くても読めるよう、累積時間の上位をテキストでも残す
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write(f"plan={fingerprint} theme={themename} build_ms={build_ms}\n\n")
+        pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(SUMMARY_LINES)
+    # 手元で再現できるよう設計図も保存する
+    with open(base + ".plan.json", "w", encoding="utf-8") as f:
+        json.dump(plan, f, ensure_ascii=False)
+
+    _prune(profile_dir, int(os.getenv("BUILD_PROFILE_MAX_FILES", DEFAULT_MAX_FILES)))
+    info.update(kept=True, path=base + ".prof", summary=base + ".txt")
+    return result, info
+
+
+def _prune(profile_dir: str, max_files: int):
+    """古いプロファイルから削除する（.prof 単位で数え、関連ファイルもまとめて消す）"""
+    try:
+        profiles = sorted(
+            (name for name in os.listdir(profile_dir) if name.endswith(".prof")),
+            key=lambda name: os.path.getmtime(os.path.join(profile_dir, name)),
+        )
+    except OSError:
+        return
+    for name in profiles[:max(0, len(profiles) - max_files)]:
+        stem = name[:-len(".prof")]
+        for suffix in (".prof", ".txt", ".plan.json"):
+            try:
+                os.remove(os.path.join(profile_dir, stem + suffix))
+            except OSError:
+                pass
@@ -0,0 +1,174 @@
+# slide_cache.py
+"""
+スライド単位のレンダリングキャッシュ（差分ビルド用）
+- キー = スライド仕様 + テーマ + 配色 + 参照画像の内容ハッシュ + レンダラーバージョン の sha256
+- 値 = その仕様から生成されたスライドの XML・ノート XML・画像リレーション（画像本体）
+- 再利用時は空スライドを追加して XML を差し替え、画像を関連付け直して rId を振り替える
+- プロセス内メモリの LRU（合計バイト数で上限管理。プロセスプールではワーカーごとに持つ）
+"""
+import hashlib
+import io
+import os
+import threading
+
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from lxml import etree
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.oxml import parse_xml
+
+from deck_cache import canonical_json
+from master_layouts import append_slide
+
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+
+_R_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+# リレーションの種類（rId 順に並べて保存し、復元時も同じ順で関連付ける）
+_REL_IMAGE = "image"
+_REL_NOTES = "notes"
+
+
+class SlideSnapshot(NamedTuple):
+    layout_index: int
+    slide_xml: bytes
+    notes_xml: Optional[bytes]
+    rels: Tuple[Tuple[str, str, Optional[bytes]], ...]   # (旧 rId, 種類, 画像バイト列)
+
+    @property
+    def nbytes(self) -> int:
+        return (len(self.slide_xml) + len(self.notes_xml or b"")
+                + sum(len(blob or b"") for _, _, blob in self.rels))
+
+
+def slide_key(spec: Dict[str, Any], themename: str, colors: Dict[str, str], global_bg: Optional[str],
+              image_hashes: Dict[str, str], renderer_version: str, slide_size: Tuple[int, int]) -> str:
+    h = hashlib.sha256()
+    h.update(canonical_json(spec).encode("utf-8"))
+    h.update(b"\0theme=" + str(themename).encode("utf-8"))
+    h.update(b"\0colors=" + canonical_json(colors).encode("utf-8"))
+    h.update(b"\0bg=" + str(global_bg).encode("utf-8"))
+    for ref in sorted(image_hashes):
+        h.update(f"\0img={ref}={image_hashes[ref]}".encode("utf-8"))
+    h.update(b"\0renderer=" + renderer_version.encode("utf-8"))
+    h.update(f"\0size={slide_size[0]}x{slide_size[1]}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _rid_order(rId: str):
+    digits = rId[3:]
+    return (0, int(digits)) if rId.startswith("rId") and digits.isdigit() else (1, rId)
+
+
+def snapshot_slide(prs, slide) -> Optional[SlideSnapshot]:
+    """スライドを復元可能な形で保存する（画像・ノート以外のリレーションを持つなら None）"""
+    part = slide.part
+    rels = []
+    for rId, rel in sorted(part.rels.items(), key=lambda item: _rid_order(item[0])):
+        if rel.reltype == RT.SLIDE_LAYOUT:
+            continue
+        if rel.is_external:
+            return None
+        if rel.reltype == RT.IMAGE:
+            rels.append((rId, _REL_IMAGE, rel.target_part.blob))
+        elif rel.reltype == RT.NOTES_SLIDE:
+            rels.append((rId, _REL_NOTES, None))
+        else:
+            return None
+
+    notes_xml = etree.tostring(slide.notes_slide._element) if slide.has_notes_slide else None
+    return SlideSnapshot(
+        layout_index=prs.slide_layouts.index(slide.slide_layout),
+        slide_xml=etree.tostring(slide._element),
+        notes_xml=notes_xml,
+        rels=tuple(rels),
+    )
+
+
+def _replace_element(dst, src):
+    """dst の子要素・属性を src のものに置き換える（python-pptx が握っている要素はそのまま使う）"""
+    for child in list(dst):
+        dst.remove(child)
+    for name, value in src.attrib.items():
+        dst.set(name, value)
+    for child in list(src):
+        dst.append(child)
+
+
+def restore_slide(prs, snapshot: SlideSnapshot):
+    """保存済みスライドをプレゼンの末尾に追加する"""
+    slide = append_slide(prs, prs.slide_layouts[snapshot.layout_index])
+    part = slide.part
+
+    rid_map = {}
+    for old_rId, kind, blob in snapshot.rels:
+        if kind == _REL_IMAGE:
+            _, rid_map[old_rId] = part.get_or_add_image_part(io.BytesIO(blob))
+        elif kind == _REL_NOTES and snapshot.notes_xml is not None:
+            _replace_element(slide.notes_slide._element, parse_xml(snapshot.notes_xml))
+
+    element = parse_xml(snapshot.slide_xml)
+    for el in element.iter():
+        for name, value in el.attrib.items():
+            if name.startswith(_R_NS) and value in rid_map:
+                el.set(name, rid_map[value])
+    _replace_element(slide._element, element)
+    return slide
+
+
+class SlideCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, List[SlideSnapshot]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: str) -> Optional[List[SlideSnapshot]]:
+        with self._lock:
+            snapshots = self._entries.get(key)
+            if snapshots is None:
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return snapshots
+
+    def put(self, key: str, snapshots: List[SlideSnapshot]):
+        size = sum(s.nbytes for s in snapshots)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= sum(s.nbytes for s in old)
+            self._entries[key] = snapshots
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= sum(s.nbytes for s in evicted)
+                self.counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, **self.counters}
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_slide_cache() -> SlideCache:
+    """プロセス全体で共有するスライドキャッシュ（環境変数で設定）"""
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_lock:
+            if _shared_cache is None:
+                _shared_cache = SlideCache(max_bytes=int(os.getenv("SLIDE_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)))
+    return _shared_cache
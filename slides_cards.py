@@ -9,7 +9,7 @@ from pptx.enum.text import MSO_ANCHOR
 def render_cards_default(factory, data: Dict[str, Any]):
     """カード形式スライド"""
     s = factory._new_slide(data)
-    factory._add_slide_title(s, data.get("title","一覧"))
+    factory._add_slide_title(s, data.get("title"), default="一覧")
 
     items = data.get("items", [])
     cols = min(3, max(1, int(data.get("columns", 3))))
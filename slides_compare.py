@@ -8,7 +8,7 @@ from pptx.util import Cm
 
 def render_compare_default(factory, data):
     s = factory._new_slide(data)
-    factory._add_slide_title(s, data.get("title","比較"))
+    factory._add_slide_title(s, data.get("title"), default="比較")
 
     # ボックス配置
     margin = Cm(1.5)
@@ -54,7 +54,7 @@ def render_compare_default(factory, data):
     body_text = data.get("bodyText", "")
     if body_text:
         b_rect = factory.layout.get_rect("contentSlide.body")
-        lbox = s.shapes.add_textbox(b_rect["left"], top + box_h + Cm(1.0), b_rect["width"], Cm(3))
+        lbox = s.shapes.add_textbox(b_rect.left, top + box_h + Cm(1.0), b_rect.width, Cm(3))
         tf2 = lbox.text_frame
         tf2.word_wrap = True
         p = tf2.paragraphs[0]
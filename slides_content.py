@@ -11,7 +11,7 @@ def render_content_default(factory, data):
     subhead = data.get("subhead")
     if subhead:
         s_rect = factory.layout.get_rect("contentSlide.subhead")
-        sbox = s.shapes.add_textbox(s_rect["left"], s_rect["top"], s_rect["width"], s_rect["height"])
+        sbox = s.shapes.add_textbox(s_rect.left, s_rect.top, s_rect.width, s_rect.height)
         sp = sbox.text_frame.paragraphs[0]
         factory._style_text(
             sp,
@@ -27,7 +27,7 @@ def render_content_default(factory, data):
     points: List[str] = data.get("points", [])
     body_text: str = data.get("bodyText", "")
 
-    last_y = b_rect["top"]
+    last_y = b_rect.top
 
     # --- 箇条書き ---
     if points:
@@ -35,7 +35,7 @@ def render_content_default(factory, data):
         line_h = factory.fonts["sizes"]["body"].pt * 1.6  # だいたい1.6倍行間
         box_h = Pt(line_h * len(points))
 
-        bbox = s.shapes.add_textbox(b_rect["left"]+ Cm(0.5), b_rect["top"], b_rect["width"], box_h)
+        bbox = s.shapes.add_textbox(b_rect.left+ Cm(0.5), b_rect.top, b_rect.width, box_h)
         tf = bbox.text_frame
         tf.clear()
         tf.word_wrap = True
@@ -45,7 +45,7 @@ def render_content_default(factory, data):
             factory._style_text(p, f"・{line}", factory.fonts["sizes"]["body"], color=factory.colors["text"],bold=True)
             p.space_after = Pt(6)
 
-        last_y = b_rect["top"] + box_h + Cm(0.5)
+        last_y = b_rect.top + box_h + Cm(0.5)
 
     # --- 長文 ---
     if body_text:
@@ -53,9 +53,9 @@ def render_content_default(factory, data):
         body_h = Cm(4.5)  # デフォルト高さ、必要に応じて調整
         bg = s.shapes.add_shape(
             MSO_SHAPE.RECTANGLE,
-            b_rect["left"],
+            b_rect.left,
             last_y,
-            b_rect["width"],
+            b_rect.width,
             body_h
         )
         bg.fill.solid()
@@ -64,8 +64,8 @@ def render_content_default(factory, data):
         bg.shadow.inherit = False
 
         # 本文テキスト
-        lbox = s.shapes.add_textbox(b_rect["left"] + Cm(0.5), last_y + Cm(0.5),
-                                    b_rect["width"] - Cm(1.0), body_h - Cm(1.0))
+        lbox = s.shapes.add_textbox(b_rect.left + Cm(0.5), last_y + Cm(0.5),
+                                    b_rect.width - Cm(1.0), body_h - Cm(1.0))
         tf2 = lbox.text_frame
         tf2.clear()
         tf2.word_wrap = True
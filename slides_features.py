@@ -9,7 +9,7 @@ from pptx.util import Pt
 
 def render_features_default(factory, data):
     s = factory._new_slide(data)
-    factory._add_slide_title(s, data.get("title", "特徴"))
+    factory._add_slide_title(s, data.get("title"), default="特徴")
 
     items = data.get("items", [])
     n = min(len(items), 4)
@@ -43,9 +43,7 @@ def render_flow_default(factory, data: Dict[str, Any]):
             tf_num.text = str(i+1)
             p_num = tf_num.paragraphs[0]
             run_num = p_num.runs[0]
-            run_num.font.size = Pt(55)
-            run_num.font.bold = True
-            run_num.font.color.rgb = factory.colors["accent"]
+            factory.text_styles.apply(run_num, Pt(55), bold=True, color=factory.colors["accent"])
             p_num.alignment = PP_ALIGN.LEFT
 
             # 本文
@@ -53,9 +51,7 @@ def render_flow_default(factory, data: Dict[str, Any]):
             tf.text = text
             p = tf.paragraphs[0]
             run = p.runs[0]
-            run.font.size = Pt(20)
-            run.font.name = "BIZ UDPゴシック"
-            run.font.color.rgb = factory.colors["text"]  
+            factory.text_styles.apply(run, Pt(20), color=factory.colors["text"], font="BIZ UDPゴシック")
             p.alignment = PP_ALIGN.CENTER
 
             # 矢印
@@ -105,9 +101,7 @@ def render_flow_default(factory, data: Dict[str, Any]):
             tf_num.text = str(i+1)
             p_num = tf_num.paragraphs[0]
             run_num = p_num.runs[0]
-            run_num.font.size = Pt(36)
-            run_num.font.bold = True
-            run_num.font.color.rgb = factory.colors["accent"]
+            factory.text_styles.apply(run_num, Pt(36), bold=True, color=factory.colors["accent"])
             p_num.alignment = PP_ALIGN.CENTER
 
             # 本文
@@ -115,9 +109,7 @@ def render_flow_default(factory, data: Dict[str, Any]):
             tf.text = text
             p = tf.paragraphs[0]
             run = p.runs[0]
-            run.font.size = Pt(20)
-            run.font.name = "BIZ UDPゴシック"
-            run.font.color.rgb = factory.colors["text"] 
+            factory.text_styles.apply(run, Pt(20), color=factory.colors["text"], font="BIZ UDPゴシック")
             p.alignment = PP_ALIGN.CENTER
 
             # 矢印（下向き）
@@ -41,10 +41,7 @@ def render_highlight_default(factory, data: Dict[str, Any]):
     tf.text = keyword
     p = tf.paragraphs[0]
     run = p.runs[0]
-    run.font.size = Pt(font_size)
-    run.font.name = "BIZ UDPゴシック"
-    run.font.bold = True
-    run.font.color.rgb = factory.colors["primary"]
+    factory.text_styles.apply(run, Pt(font_size), bold=True, color=factory.colors["primary"], font="BIZ UDPゴシック")
     p.alignment = PP_ALIGN.CENTER
 
     # ---------------- 解説文 ----------------
@@ -58,9 +55,7 @@ def render_highlight_default(factory, data: Dict[str, Any]):
         tf_desc.text = description
         p2 = tf_desc.paragraphs[0]
         run2 = p2.runs[0]
-        run2.font.size = Pt(20)
-        run2.font.name = "BIZ UDPゴシック"
-        run2.font.color.rgb = factory.colors["text"]
+        factory.text_styles.apply(run2, Pt(20), color=factory.colors["text"], font="BIZ UDPゴシック")
         p2.alignment = PP_ALIGN.CENTER    
 
     return s
\ No newline at end of file
@@ -12,7 +12,7 @@ def render_image1_default(factory, slide, images, font_size):
     slide_height = factory.prs.slide_height
     margin = Pt(20)
 
-    # factory._load_image で画像読み込み（BytesIO, PIL.Image）
+    # factory._load_image で画像読み込み（BytesIO, ImageInfo）
     stream, im = factory._load_image(img["url"])
     if stream :
         iw, ih = im.size
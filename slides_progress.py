@@ -13,7 +13,7 @@ def render_progress_default(factory, data: Dict[str, Any]):
     """進捗バー"""
     s = factory._new_slide(data)
 
-    factory._add_slide_title(s, data.get("title","進捗状況"))
+    factory._add_slide_title(s, data.get("title"), default="進捗状況")
 
     items = data.get("items", [])
     bar_left = Cm(6)
@@ -19,9 +19,7 @@ def render_qa_answer_default(factory, data: Dict[str, Any]):
     ap = tf_a.paragraphs[0]
     run = ap.add_run()
     run.text = "Ａ"
-    run.font.size = Pt(200)   # ゴーストA専用サイズ
-    run.font.bold = True
-    run.font.color.rgb = factory.colors["ghost"]
+    factory.text_styles.apply(run, Pt(200), bold=True, color=factory.colors["ghost"])  # ゴーストA専用サイズ
     ap.alignment = PP_ALIGN.LEFT
 
     # 答え（中央に一言）
@@ -19,9 +19,7 @@ def render_qa_question_defaults(factory, data: Dict[str, Any]):
     qp = tf_q.paragraphs[0]
     run = qp.add_run()
     run.text = "Ｑ"
-    run.font.size = Pt(200)   # ゴーストQ専用サイズ（必要に応じて調整）
-    run.font.bold = True
-    run.font.color.rgb = factory.colors["ghost"]
+    factory.text_styles.apply(run, Pt(200), bold=True, color=factory.colors["ghost"])  # ゴーストQ専用サイズ（必要に応じて調整）
     qp.alignment = PP_ALIGN.LEFT
 
     # 質問文（中央揃え）
@@ -52,10 +52,7 @@ def render_quote_default(factory, data):
     qp = qf.paragraphs[0]
     qp.text = "“"   # フォント依存でシャープな形を狙う
     run = qp.runs[0]
-    run.font.name = "Arial"   
-    run.font.size = Pt(150)
-    run.font.bold = True
-    run.font.color.rgb = factory.colors["ghost"]
+    factory.text_styles.apply(run, Pt(150), bold=True, color=factory.colors["ghost"], font="Arial")
     qp.alignment = PP_ALIGN.LEFT
 
     # --- 引用文 ---
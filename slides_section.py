@@ -6,7 +6,7 @@ def render_section_default(factory, data):
 
     # ゴースト番号
     g_rect = factory.layout.get_rect("sectionSlide.ghostNum")
-    gbox = s.shapes.add_textbox(g_rect["left"], g_rect["top"], g_rect["width"], g_rect["height"])
+    gbox = s.shapes.add_textbox(g_rect.left, g_rect.top, g_rect.width, g_rect.height)
     gp = gbox.text_frame.paragraphs[0]
     factory._style_text(
         gp,
@@ -18,7 +18,7 @@ def render_section_default(factory, data):
 
     # セクションタイトル
     t_rect = factory.layout.get_rect("sectionSlide.title")
-    tbox = s.shapes.add_textbox(t_rect["left"], t_rect["top"], t_rect["width"], t_rect["height"])
+    tbox = s.shapes.add_textbox(t_rect.left, t_rect.top, t_rect.width, t_rect.height)
     tp = tbox.text_frame.paragraphs[0]
     factory._style_text(
         tp,
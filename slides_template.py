@@ -0,0 +1,115 @@
+# slides_template.py
+"""
+テンプレートのレイアウトを割り当てたスライド種別の描画
+- テキストボックスを手で配置せず、レイアウトのプレースホルダーに設計図の値を流し込む
+  （書式・位置はテンプレートのものを使う）
+- 値の無いプレースホルダーは「クリックしてタイトルを入力」が残らないよう取り除く
+- どのプレースホルダーにも入らなかった設計図の項目は警告を出す（黙って落とさない）
+"""
+import sys
+
+
+# 役割 -> 値を探す設計図のキー（先に見つかったものを使う）
+# テーマの template.placeholders で種別ごとに上書きでき、"left.items" のようにドットで入れ子を辿れる
+# 2つ目以降の同じ役割（body2 など）は上書きで指定したときだけ埋める
+DEFAULT_PLACEHOLDER_FIELDS = {
+    "title": ("title",),
+    "subtitle": ("subtitle", "subject", "subhead"),
+    "body": ("points", "items", "bodyText", "headline"),
+    "picture": ("image",),
+    "date": ("date",),
+}
+
+# スライド種別ごとの既定（レイアウトの本文の枠の数 -> 役割 -> キー）。DEFAULT_PLACEHOLDER_FIELDS より優先する
+TYPE_PLACEHOLDER_FIELDS = {
+    "compare": {
+        # Two Content / Content with Caption
+        2: {"body": ("leftItems",), "body2": ("rightItems",)},
+        # Comparison（左見出し・左本文・右見出し・右本文）
+        4: {"body": ("leftTitle",), "body2": ("leftItems",), "body3": ("rightTitle",), "body4": ("rightItems",)},
+    },
+}
+
+# プレースホルダーに流し込む対象ではない項目（未使用でも警告しない）
+_NON_CONTENT_FIELDS = ("type", "note", "background-image", "columns", "direction")
+
+
+def _is_empty(value) -> bool:
+    return value in (None, "", [], {})
+
+
+def _lookup(data, field):
+    value = data
+    for key in field.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _as_text(value) -> str:
+    if isinstance(value, dict):
+        return " - ".join(str(v) for v in value.values() if isinstance(v, (str, int, float)))
+    return str(value)
+
+
+def _remove(shape):
+    shape._element.getparent().remove(shape._element)
+
+
+def render_template_default(factory, data):
+    s = factory._new_slide(data)
+    slide_type = data.get("type")
+    layout = factory.template.slide_layouts[slide_type]
+    overrides = factory.template.placeholders.get(slide_type, {})
+    n_bodies = sum(1 for info in layout.placeholders if info.role.startswith("body"))
+    type_defaults = TYPE_PLACEHOLDER_FIELDS.get(slide_type, {}).get(n_bodies, {})
+
+    used = set()
+    shapes = {shape.placeholder_format.idx: shape for shape in s.placeholders}
+    for info in layout.placeholders:
+        shape = shapes.pop(info.idx, None)
+        if shape is None:
+            continue
+
+        value = None
+        if info.role in overrides:
+            fields = overrides[info.role]
+        else:
+            fields = type_defaults.get(info.role) or DEFAULT_PLACEHOLDER_FIELDS.get(info.role, ())
+        for field in fields:
+            value = _lookup(data, field)
+            if not _is_empty(value):
+                used.add(field.split(".")[0])
+                break
+        if _is_empty(value):
+            _remove(shape)
+            continue
+
+        if info.role == "picture":
+            # 画像はプレースホルダーの枠（テンプレート読み込み時に索引済み）に収まるよう縦横比を保って置く
+            stream, im = factory._load_image(value)
+            if stream and im:
+                iw, ih = im.size
+                scale = min(info.width / iw, info.height / ih)
+                w, h = int(iw * scale), int(ih * scale)
+                s.shapes.add_picture(stream, info.left + (info.width - w) // 2, info.top + (info.height - h) // 2, w, h)
+            _remove(shape)
+            continue
+
+        # リストは1項目1段落（改行は段落の区切りになる）
+        lines = value if isinstance(value, (list, tuple)) else [value]
+        shape.text_frame.text = "\n".join(_as_text(line) for line in lines)
+
+    # 役割を持たないプレースホルダー（表・グラフなど）も空のまま残さない
+    for shape in shapes.values():
+        _remove(shape)
+
+    dropped = [key for key, value in data.items()
+               if key not in used and key not in _NON_CONTENT_FIELDS and not _is_empty(value)]
+    if dropped:
+        print(f"[WARN] テンプレートのレイアウト {layout.name!r} に入らない項目を省きました"
+              f"（{slide_type}: {', '.join(dropped)}）。テーマの template.placeholders で割り当てられます",
+              file=sys.stderr, flush=True)
+
+    return s
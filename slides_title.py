@@ -38,7 +38,7 @@ def render_title_default(factory, data):
 
     # 教科名
     subj_rect = factory.layout.get_rect("titleSlide.subject")
-    subj_box = s.shapes.add_textbox(subj_rect["left"], subj_rect["top"], subj_rect["width"], subj_rect["height"])
+    subj_box = s.shapes.add_textbox(subj_rect.left, subj_rect.top, subj_rect.width, subj_rect.height)
     subj_p = subj_box.text_frame.paragraphs[0]
     factory._style_text(
         subj_p,
@@ -49,7 +49,7 @@ def render_title_default(factory, data):
 
     # タイトル
     rect = factory.layout.get_rect("titleSlide.title")
-    box = s.shapes.add_textbox(rect["left"], rect["top"], rect["width"], rect["height"])
+    box = s.shapes.add_textbox(rect.left, rect.top, rect.width, rect.height)
     p = box.text_frame.paragraphs[0]
     factory._style_text(
         p,
@@ -61,7 +61,7 @@ def render_title_default(factory, data):
 
     # 講師名（固定）
     l_rect = factory.layout.get_rect("titleSlide.lecturer")
-    lbox = s.shapes.add_textbox(l_rect["left"], l_rect["top"], l_rect["width"], l_rect["height"])
+    lbox = s.shapes.add_textbox(l_rect.left, l_rect.top, l_rect.width, l_rect.height)
     lp = lbox.text_frame.paragraphs[0]
     factory._style_text(
         lp,
@@ -72,7 +72,7 @@ def render_title_default(factory, data):
 
     # 日付
     d_rect = factory.layout.get_rect("titleSlide.date")
-    dbox = s.shapes.add_textbox(d_rect["left"], d_rect["top"], d_rect["width"], d_rect["height"])
+    dbox = s.shapes.add_textbox(d_rect.left, d_rect.top, d_rect.width, d_rect.height)
     dp = dbox.text_frame.paragraphs[0]
     factory._style_text(
         dp,
@@ -0,0 +1,281 @@
+# storage.py
+"""
+生成した PPTX の保存先（ストレージバックエンド）
+- AzureBlobStorage: Azure Blob（Azurite も接続文字列で指定可）
+    クライアントは1つを使い回し（HTTP 接続プールを共有）、大きいデッキはブロック分割して並列アップロード
+- LocalStorage: ローカルディレクトリに保存する開発・テスト用の代替
+- Blob 名は内容ハッシュ。同じ内容のデッキは再アップロードせず既存 Blob の URL を返す
+  アップロード済みと分かっている Blob 名は上限件数つき・期限つき（STORAGE_KNOWN_MAX / STORAGE_KNOWN_TTL）で覚え、
+  期限が切れたら存在を確認し直す（ライフサイクル管理などで消えた Blob は再アップロードする）
+- 同期 SDK の呼び出しは upload_async で別スレッドに逃がし、イベントループを塞がない
+- SDK の読み込み・クライアント生成・コンテナ作成は起動時には行わず、prepare（API の起動後に
+  バックグラウンドで呼ぶ）か最初のアップロードまで遅らせる
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import metrics
+
+PPTX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+DEFAULT_CONTAINER = "pptx-output"
+DEFAULT_URL_VALID_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+DEFAULT_SINGLE_PUT_SIZE = 8 * 1024 * 1024
+DEFAULT_LOCAL_DIR = os.path.join(tempfile.gettempdir(), "json2slide_storage")
+DEFAULT_KNOWN_MAX = 10000
+DEFAULT_KNOWN_TTL = 60 * 60
+
+
+def blob_name_for(data: bytes) -> str:
+    return f"{hashlib.sha256(data).hexdigest()}.pptx"
+
+
+class StorageBackend(ABC):
+    name = ""
+
+    def __init__(self, url_valid_seconds: float = DEFAULT_URL_VALID_SECONDS,
+                 known_max: int = DEFAULT_KNOWN_MAX, known_ttl: float = DEFAULT_KNOWN_TTL):
+        self.url_valid_seconds = url_valid_seconds
+        # アップロード済みと分かっている Blob 名 -> 確認した時刻（存在確認の往復を省く。LRU で上限件数まで）
+        self.known_max = known_max
+        self.known_ttl = known_ttl
+        self._known: "OrderedDict[str, float]" = OrderedDict()
+        self._known_lock = threading.Lock()
+
+    def _is_known(self, blob_name: str) -> bool:
+        with self._known_lock:
+            checked_at = self._known.get(blob_name)
+            if checked_at is None:
+                return False
+            if time.time() - checked_at > self.known_ttl:
+                del self._known[blob_name]
+                return False
+            self._known.move_to_end(blob_name)
+            return True
+
+    def _remember(self, blob_name: str):
+        with self._known_lock:
+            self._known[blob_name] = time.time()
+            self._known.move_to_end(blob_name)
+            while len(self._known) > self.known_max:
+                self._known.popitem(last=False)
+
+    def forget(self, blob_name: str):
+        """Blob が無かった（ダウンロード・URL が失敗した）ので、次は存在を確認し直す"""
+        with self._known_lock:
+            self._known.pop(blob_name, None)
+
+    def verify(self, blob_name: str) -> bool:
+        """Blob がまだ保存先にあるか（覚えている期限内なら確認を省く。無ければ忘れる）"""
+        if self._is_known(blob_name):
+            return True
+        if self.exists(blob_name):
+            self._remember(blob_name)
+            return True
+        self.forget(blob_name)
+        return False
+
+    async def verify_async(self, blob_name: str) -> bool:
+        return await asyncio.to_thread(self.verify, blob_name)
+
+    def prepare(self):
+        """使い始める前の準備（クライアント生成・コンテナ作成など。ブロッキング）"""
+
+    @abstractmethod
+    def exists(self, blob_name: str) -> bool:
+        ...
+
+    @abstractmethod
+    def put(self, blob_name: str, data: bytes):
+        ...
+
+    @abstractmethod
+    def url_for(self, blob_name: str, expires_at: float) -> str:
+        ...
+
+    def upload(self, data: bytes) -> Dict[str, Any]:
+        """内容ハッシュ名で保存し、URL とその有効期限を返す（同じ内容なら再アップロードしない）"""
+        blob_name = blob_name_for(data)
+        result = {"blob_name": blob_name, "uploaded": False}
+        with metrics.time_upload(self.name, result):
+            if not self._is_known(blob_name) and not self.exists(blob_name):
+                self.put(blob_name, data)
+                result["uploaded"] = True
+            self._remember(blob_name)
+
+            result["expires_at"] = time.time() + self.url_valid_seconds
+            result["url"] = self.url_for(blob_name, result["expires_at"])
+        return result
+
+    async def upload_async(self, data: bytes) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.upload, data)
+
+
+# ---------------- Azure Blob ----------------
+class AzureBlobStorage(StorageBackend):
+    name = "azure"
+
+    def __init__(self, conn_str: str, container: str = DEFAULT_CONTAINER,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, block_size: int = DEFAULT_BLOCK_SIZE,
+                 single_put_size: int = DEFAULT_SINGLE_PUT_SIZE, **kwargs):
+        super().__init__(**kwargs)
+        self.conn_str = conn_str
+        self.container = container
+        self.max_concurrency = max_concurrency
+        self.block_size = block_size
+        self.single_put_size = single_put_size
+        self._service = None
+        self._container = None
+        self._lock = threading.Lock()
+
+    def _container_client(self, **request_options):
+        # クライアントとコンテナは prepare か最初のアップロードの時に1度だけ用意する
+        if self._container is None:
+            with self._lock:
+                if self._container is None:
+                    import requests
+                    from azure.core.exceptions import ResourceExistsError
+                    from azure.core.pipeline.transport import RequestsTransport
+                    from azure.storage.blob import BlobServiceClient
+
+                    # 並列ブロックアップロード分の接続をプールに確保しておく
+                    session = requests.Session()
+                    adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(10, self.max_concurrency * 2))
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+
+                    service = BlobServiceClient.from_connection_string(
+                        self.conn_str,
+                        transport=RequestsTransport(session=session, session_owner=False),
+                        max_block_size=self.block_size,
+                        max_single_put_size=self.single_put_size,
+                    )
+                    container = service.get_container_client(self.container)
+                    try:
+                        container.create_container(**request_options)
+                    except ResourceExistsError:
+                        pass
+                    self._service = service
+                    self._container = container
+        return self._container
+
+    def prepare(self):
+        # 失敗時の再試行は呼び出し側（起動後の準備処理）が間隔を空けて行うので、SDK の再試行はしない
+        self._container_client(retry_total=0)
+
+    def exists(self, blob_name: str) -> bool:
+        return self._container_client().get_blob_client(blob_name).exists()
+
+    def put(self, blob_name: str, data: bytes):
+        from azure.storage.blob import ContentSettings
+
+        # single_put_size を超えるデッキは block_size ごとに分割し max_concurrency 本で並列に送る
+        self._container_client().get_blob_client(blob_name).upload_blob(
+            data,
+            overwrite=True,
+            max_concurrency=self.max_concurrency,
+            content_settings=ContentSettings(content_type=PPTX_MEDIA_TYPE),
+        )
+
+    def url_for(self, blob_name: str, expires_at: float) -> str:
+        from azure.storage.blob import BlobSasPermissions, generate_blob_sas
+
+        container = self._container_client()
+        sas_token = generate_blob_sas(
+            account_name=self._service.account_name,
+            container_name=self.container,
+            blob_name=blob_name,
+            account_key=self._service.credential.account_key,
+            permission=BlobSasPermissions(read=True),
+            expiry=datetime.fromtimestamp(expires_at, tz=timezone.utc),
+        )
+        return f"{container.url}/{blob_name}?{sas_token}"
+
+
+# ---------------- ローカル ----------------
+class LocalStorage(StorageBackend):
+    name = "local"
+
+    def __init__(self, root: str = DEFAULT_LOCAL_DIR, base_url: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, blob_name: str) -> Path:
+        return self.root / os.path.basename(blob_name)
+
+    def exists(self, blob_name: str) -> bool:
+        return self.path_for(blob_name).exists()
+
+    def put(self, blob_name: str, data: bytes):
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.path_for(blob_name))
+
+    def url_for(self, blob_name: str, expires_at: float) -> str:
+        if self.base_url:
+            return f"{self.base_url}/{blob_name}"
+        return self.path_for(blob_name).resolve().as_uri()
+
+
+_shared_storage = None
+_shared_lock = threading.Lock()
+
+
+def get_storage() -> Optional[StorageBackend]:
+    """
+    環境変数で選んだストレージを返す（未設定なら None）
+    STORAGE_BACKEND=azure|local（省略時は AZURE_STORAGE_CONNECTION_STRING があれば azure）
+    """
+    global _shared_storage
+    if _shared_storage is None:
+        with _shared_lock:
+            if _shared_storage is None:
+                _shared_storage = _create_storage()
+    return _shared_storage or None
+
+
+def _create_storage():
+    conn_str = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+    backend = os.getenv("STORAGE_BACKEND", "azure" if conn_str else "").lower()
+    common = {
+        "url_valid_seconds": float(os.getenv("STORAGE_URL_VALID_SECONDS", DEFAULT_URL_VALID_SECONDS)),
+        "known_max": int(os.getenv("STORAGE_KNOWN_MAX", DEFAULT_KNOWN_MAX)),
+        "known_ttl": float(os.getenv("STORAGE_KNOWN_TTL", DEFAULT_KNOWN_TTL)),
+    }
+
+    if backend == "azure":
+        if not conn_str:
+            raise RuntimeError("STORAGE_BACKEND=azure には AZURE_STORAGE_CONNECTION_STRING が必要です")
+        return AzureBlobStorage(
+            conn_str,
+            container=os.getenv("STORAGE_CONTAINER", DEFAULT_CONTAINER),
+            max_concurrency=int(os.getenv("STORAGE_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+            block_size=int(os.getenv("STORAGE_BLOCK_SIZE", DEFAULT_BLOCK_SIZE)),
+            single_put_size=int(os.getenv("STORAGE_SINGLE_PUT_SIZE", DEFAULT_SINGLE_PUT_SIZE)),
+            **common,
+        )
+    if backend == "local":
+        return LocalStorage(
+            root=os.getenv("STORAGE_LOCAL_DIR", DEFAULT_LOCAL_DIR),
+            base_url=os.getenv("STORAGE_PUBLIC_BASE_URL"),
+            **common,
+        )
+    if backend:
+        raise ValueError(f"STORAGE_BACKEND は azure / local のいずれかを指定してください: {backend}")
+    # 未設定（False を入れて再判定しないようにする）
+    return False
@@ -0,0 +1,239 @@
+# table_engine.py
+"""
+表（table スライド）の組み立て
+- a:tbl は python-pptx のセルのプロキシ（table.cell / text_frame / fill）を1つずつ触らずに、
+  行の配列から1ページ分の p:graphicFrame の XML 文字列をまとめて組み立て、1度だけパースして差し込む
+  書式（a:rPr）と塗りは1度だけ文字列にしておき、セルごとには本文だけを埋める（行数に比例する処理だけ）
+- 行の高さは文字数と列幅から見積もり（折り返し・改行を考慮）、1枚に収まらない表は
+  見出し行を繰り返した続きのスライドに分ける
+- 1枚に収まる表は従来どおり、表の領域（スライド高さの 55%）を全行で等分する
+"""
+import re
+
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls
+from pptx.util import Pt
+
+TABLE_FONT = "BIZ UDゴシック"
+HEADER_SIZE = Pt(18)
+BODY_SIZE = Pt(16)
+
+# python-pptx の add_table と同じ既定の表スタイル（Medium Style 2 - Accent 1）
+TABLE_STYLE_ID = "{5C22544A-7EE6-4342-B048-85BDC9FD1C3A}"
+_GRAPHIC_DATA_URI = "http://schemas.openxmlformats.org/drawingml/2006/table"
+
+# セルの既定の余白（左右 0.1 インチ・上下 0.05 インチ）と行送り
+_CELL_MARGIN_X = Pt(7.2)
+_CELL_MARGIN_Y = Pt(3.6)
+_LINE_SPACING = 1.2
+# 表の下端からスライド下端までの余白（続きのあるページ）
+_BOTTOM_MARGIN = Pt(40)
+
+# python-pptx の _Run.text と同じく、タブ・改行以外の制御文字は _xHHHH_ に置き換える
+_CTRL_CHARS = re.compile(r"[\x00-\x08\x0B-\x1F]")
+
+
+class TableStyle(NamedTuple):
+    header_fill: Any
+    band_fills: Tuple[Any, Any]
+    header_color: Any
+    body_color: Any
+    font: str = TABLE_FONT
+    header_size: int = HEADER_SIZE
+    body_size: int = BODY_SIZE
+
+
+def _cell_text(value) -> str:
+    text = "" if value is None else str(value)
+    text = escape(text)
+    if _CTRL_CHARS.search(text):
+        text = _CTRL_CHARS.sub(lambda m: "_x%04X_" % ord(m.group()), text)
+    return text
+
+
+def normalize(data: Dict[str, Any]) -> Tuple[List[str], List[List[Any]]]:
+    """見出しと行を列数の揃った配列にする（足りないセルは空、列数は見出しと最長の行の多い方）"""
+    headers = list(data.get("headers") or [])
+    rows = [list(row) if isinstance(row, (list, tuple)) else [row] for row in data.get("rows") or []]
+    n_cols = max([len(headers)] + [len(row) for row in rows])
+    headers += [""] * (n_cols - len(headers))
+    for row in rows:
+        if len(row) < n_cols:
+            row += [""] * (n_cols - len(row))
+    return headers, rows
+
+
+# ---- 行の高さの見積もり ----
+def _text_width(text: str, size: int) -> float:
+    """文字幅の概算（全角は1文字 = フォントサイズ、半角は 0.6 倍）"""
+    wide = sum(1 for ch in text if ord(ch) >= 0x1100)
+    return (wide + (len(text) - wide) * 0.6) * size
+
+
+def row_height(cells: Sequence[Any], col_width: int, size: int) -> int:
+    """1行の高さ（EMU）。最も行数の多いセルに合わせる"""
+    usable = max(col_width - 2 * _CELL_MARGIN_X, size)
+    lines = 1
+    for value in cells:
+        text = "" if value is None else str(value)
+        if not text:
+            continue
+        n = 0
+        for line in text.split("\n"):
+            n += max(1, -(-int(_text_width(line, size)) // usable))
+        lines = max(lines, n)
+    return int(lines * size * _LINE_SPACING + 2 * _CELL_MARGIN_Y)
+
+
+def paginate(header_h: int, heights: Sequence[int], capacity: int, last_capacity: int) -> List[Tuple[int, int]]:
+    """
+    行を (開始, 終了) のページに分ける（各ページは見出し行 + 1行以上。1行で溢れる行はそのまま置く）
+    last_capacity は最後のページの上限（表の下に本文を置くぶん狭い）。残りがそこに収まった時点で最後のページにする
+    """
+    pages, start, n = [], 0, len(heights)
+    remaining = sum(heights)
+    while start < n and header_h + remaining > last_capacity:
+        end, used = start + 1, header_h + heights[start]
+        while end < n and used + heights[end] <= capacity:
+            used += heights[end]
+            end += 1
+        if end == n:
+            # 残り全部は入るが最後のページとしては本文に食い込む
+            # -> 本文の上に収まる範囲で、残りの半分ほどを最後のページに送る
+            if end - start == 1:
+                break
+            tail, tail_h = 1, header_h + heights[n - 1]
+            while tail < (n - start) // 2 and tail_h + heights[n - tail - 1] <= last_capacity:
+                tail_h += heights[n - tail - 1]
+                tail += 1
+            end = n - tail
+            used = header_h + remaining - (tail_h - header_h)
+        pages.append((start, end))
+        remaining -= used - header_h
+        start = end
+    pages.append((start, n))
+    return pages
+
+
+# ---- XML の組み立て ----
+def _fill_xml(rgb) -> str:
+    return f'<a:solidFill><a:srgbClr val="{rgb}"/></a:solidFill>'
+
+
+def _row_xml(height: int, cells: Sequence[Any], prefix: str, suffix: str) -> str:
+    # セル = prefix + 本文 + suffix。セルの間は suffix + prefix でつなぐ
+    return f'<a:tr h="{height}">{prefix}{(suffix + prefix).join(map(_cell_text, cells))}{suffix}</a:tr>'
+
+
+def _cell_parts(rpr: str, fill: str) -> Tuple[str, str]:
+    prefix = f'<a:tc><a:txBody><a:bodyPr/><a:lstStyle/><a:p><a:pPr algn="ctr"/><a:r>{rpr}<a:t>'
+    suffix = f"</a:t></a:r></a:p></a:txBody><a:tcPr>{fill}</a:tcPr></a:tc>"
+    return prefix, suffix
+
+
+def add_table(slide, text_styles, style: TableStyle, headers: Sequence[Any], rows: Sequence[Sequence[Any]],
+              left: int, top: int, width: int, header_h: int, row_heights: Sequence[int]):
+    """
+    見出し + rows の表を1つの p:graphicFrame としてスライドに追加する
+    列幅は width の等分（整数に切り捨て）、枠の大きさは列幅・行の高さの合計（python-pptx で設定した場合と同じ）
+    """
+    n_cols = len(headers)
+    col_width = int(width / n_cols)
+
+    header_rpr = text_styles.rpr_xml(n_cols, style.header_size, bold=True,
+                                     color=style.header_color, font=style.font)
+    body_rpr = text_styles.rpr_xml(n_cols * len(rows), style.body_size,
+                                   color=style.body_color, font=style.font)
+    header_cell = _cell_parts(header_rpr, _fill_xml(style.header_fill))
+    band_cells = [_cell_parts(body_rpr, _fill_xml(fill)) for fill in style.band_fills]
+
+    parts = [_row_xml(header_h, headers, *header_cell)]
+    for i, (cells, h) in enumerate(zip(rows, row_heights)):
+        parts.append(_row_xml(h, cells, *band_cells[i % 2]))
+
+    spTree = slide.shapes._spTree
+    shape_id = spTree._next_shape_id
+    grid = f'<a:gridCol w="{col_width}"/>' * n_cols
+    frame = parse_xml(
+        f"<p:graphicFrame {nsdecls('a', 'p')}>"
+        f"<p:nvGraphicFramePr><p:cNvPr id=\"{shape_id}\" name=\"Table {shape_id - 1}\"/>"
+        f'<p:cNvGraphicFramePr><a:graphicFrameLocks noGrp="1"/></p:cNvGraphicFramePr><p:nvPr/></p:nvGraphicFramePr>'
+        f'<p:xfrm><a:off x="{int(left)}" y="{int(top)}"/><a:ext cx="{col_width * n_cols}" cy="{header_h + sum(row_heights)}"/></p:xfrm>'
+        f'<a:graphic><a:graphicData uri="{_GRAPHIC_DATA_URI}"><a:tbl>'
+        f'<a:tblPr firstRow="1" bandRow="1"><a:tableStyleId>{TABLE_STYLE_ID}</a:tableStyleId></a:tblPr>'
+        f"<a:tblGrid>{grid}</a:tblGrid>{''.join(parts)}</a:tbl></a:graphicData></a:graphic></p:graphicFrame>"
+    )
+    spTree.insert_element_before(frame, "p:extLst")
+    return frame
+
+
+# ---- スライドへの配置 ----
+def render_table(factory, data: Dict[str, Any], style: TableStyle, add_title,
+                 left: int, width: int, body_left: int, body_width: int,
+                 default_title=None, top: int = Pt(100)):
+    """
+    表のスライドを追加する（1枚に収まらなければ続きのスライドに分ける）。戻り値は先頭のスライド
+    add_title(slide, title) はテーマのタイトル描画。分けた場合のタイトルには「（n/総数）」を付ける
+    本文（bodyText）は最後のスライドの表の下に置く。ノートは先頭のスライドにだけ付ける
+    """
+    slide_h = factory.prs.slide_height
+    headers, rows = normalize(data)
+    title = data.get("title", default_title)
+    body_text = data.get("bodyText")
+
+    # 従来の表の領域（1枚に収まる表はこの高さを全行で等分する）
+    area = int(slide_h * 0.55)
+
+    slides = []
+    if not headers:
+        # 列が無い表は描かない（タイトルと本文だけのスライドにする）
+        s = factory._new_slide(data)
+        add_title(s, title)
+        slides.append(s)
+        pages = []
+    else:
+        col_width = int(width / len(headers))
+        header_h = row_height(headers, col_width, style.header_size)
+        heights = [row_height(cells, col_width, style.body_size) for cells in rows]
+
+        n_rows = len(rows) + 1
+        if header_h + sum(heights) <= area:
+            even = int(area / n_rows)
+            if max([header_h] + heights) <= even:
+                header_h, heights = even, [even] * len(rows)
+            else:
+                # 折り返す行があれば見積もりの高さを保ち、余りを全行に配る
+                spare = (area - header_h - sum(heights)) // n_rows
+                header_h, heights = header_h + spare, [h + spare for h in heights]
+            pages = [(0, len(rows))]
+        else:
+            capacity = int(slide_h - top - _BOTTOM_MARGIN)
+            pages = paginate(header_h, heights, capacity, area if body_text else capacity)
+
+    table_h = area
+    for n, (start, end) in enumerate(pages, 1):
+        s = factory._new_slide(data, notes=n == 1)
+        add_title(s, f"{title}（{n}/{len(pages)}）" if title and len(pages) > 1 else title)
+        page_heights = heights[start:end]
+        add_table(s, factory.text_styles, style, headers, rows[start:end],
+                  left, top, width, header_h, page_heights)
+        # 本文の位置は、1枚に収まる表では従来どおり領域の下端を基準にする
+        table_h = area if len(pages) == 1 else header_h + sum(page_heights)
+        slides.append(s)
+
+    # bodyText（高さが溢れないように制限）
+    if body_text:
+        s = slides[-1]
+        b_top = min(top + table_h + Pt(20), slide_h - Pt(100))
+        b_height = int(slide_h - b_top - Pt(40))
+        box = s.shapes.add_textbox(body_left, b_top, body_width, b_height)
+        tf = box.text_frame
+        tf.clear()
+        run = tf.paragraphs[0].add_run()
+        run.text = body_text
+        factory.text_styles.apply(run, BODY_SIZE, color=factory.colors["text"], font=TABLE_FONT)
+
+    return slides[0]
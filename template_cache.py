@@ -0,0 +1,299 @@
+# template_cache.py
+"""
+テーマごとに準備済みのベースプレゼンテーションを保持し、リクエストごとに複製する
+- Presentation() は既定テンプレートの zip 展開と XML パースを毎回行うため、
+  スライドサイズ設定・テーマ固有の下ごしらえまで済ませたものを1回だけ作る
+- 複製は deepcopy（パース済み XML のコピー）なので再パースより安い
+- テーマの静的アセット（simplenote1.png など）も準備時に画像キャッシュへ読み込んでおく
+  アセットの内容ハッシュ（asset_digest）をベースとデッキ・スライドキャッシュのキーに含め、
+  ファイルを差し替えたら作り直す
+- テーマの静的な装飾は、準備時に生成するスライドレイアウトへ描いておく（master_layouts）
+- テーマ定義の "template" で社内テンプレートなどの .pptx / .potx をベースにできる
+    ファイルはハッシュごとに1度だけパースし、レイアウトの索引とプレースホルダーの位置を保持する
+    （ファイルの stat が変わらない限りハッシュも計算し直さない）
+"""
+import copy
+import hashlib
+import io
+import os
+import sys
+import threading
+import time
+import zipfile
+
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from pptx import Presentation
+from pptx.enum.shapes import PP_PLACEHOLDER
+
+from image_cache import content_hash, read_local_image
+from theme_registry import ThemeError
+
+# 既定テンプレート（python-pptx 同梱）のレイアウト。テーマの template.layouts でもこの名前で指定できる
+DEFAULT_LAYOUT_MAP = {
+    "title": 0,           # Title Slide
+    "content": 1,         # Title and Content
+    "section": 2,         # Section Header
+    "two_content": 3,     # Two Content
+    "comparison": 4,      # Comparison
+    "title_only": 5,      # Title Only
+    "blank": 6,           # Blank
+    "with_caption": 7,    # Content with Caption
+    "pic_with_caption": 8 # Picture with Caption
+}
+
+# プレースホルダーの種類 -> 設計図の値を流し込むときの役割名（同じ役割の2つ目以降は body2, body3 ...）
+PLACEHOLDER_ROLES = {
+    PP_PLACEHOLDER.TITLE: "title",
+    PP_PLACEHOLDER.CENTER_TITLE: "title",
+    PP_PLACEHOLDER.VERTICAL_TITLE: "title",
+    PP_PLACEHOLDER.SUBTITLE: "subtitle",
+    PP_PLACEHOLDER.BODY: "body",
+    PP_PLACEHOLDER.VERTICAL_BODY: "body",
+    PP_PLACEHOLDER.OBJECT: "body",
+    PP_PLACEHOLDER.VERTICAL_OBJECT: "body",
+    PP_PLACEHOLDER.PICTURE: "picture",
+    PP_PLACEHOLDER.DATE: "date",
+}
+
+_TEMPLATE_CONTENT_TYPE = b"application/vnd.openxmlformats-officedocument.presentationml.template.main+xml"
+_PRESENTATION_CONTENT_TYPE = b"application/vnd.openxmlformats-officedocument.presentationml.presentation.main+xml"
+
+_bases: Dict[Tuple, object] = {}
+_templates: Dict[str, "SlideTemplate"] = {}
+_template_stats: Dict[str, Tuple] = {}
+# 静的アセットのパス -> ((mtime_ns, size), 内容ハッシュ)
+_asset_stats: Dict[str, Tuple] = {}
+_bindings: Dict[Tuple, "TemplateBinding"] = {}
+_lock = threading.Lock()
+
+counters = {"builds": 0, "clones": 0, "build_ms": 0.0, "clone_ms": 0.0, "template_parses": 0}
+
+
+class Placeholder(NamedTuple):
+    role: str
+    idx: int
+    left: int
+    top: int
+    width: int
+    height: int
+
+
+class LayoutInfo(NamedTuple):
+    index: int
+    name: str
+    placeholders: Tuple[Placeholder, ...]
+
+
+class SlideTemplate:
+    """パース済みのテンプレートファイル（ファイルのハッシュごとに1つ）"""
+    __slots__ = ("digest", "path", "data", "slide_size", "layouts")
+
+    def __init__(self, digest: str, path: Optional[str], data: Optional[bytes]):
+        self.digest = digest
+        self.path = path
+        self.data = data
+        prs = self.open()
+        self.slide_size = (prs.slide_width, prs.slide_height)
+        self.layouts = tuple(_index_layout(i, layout) for i, layout in enumerate(prs.slide_layouts))
+
+    def open(self):
+        """テンプレートを新しく開く（.potx は本体の Content-Type を .pptx のものに読み替える）"""
+        return Presentation(io.BytesIO(self.data) if self.data is not None else None)
+
+    def layout(self, ref) -> LayoutInfo:
+        """レイアウトを番号・DEFAULT_LAYOUT_MAP の名前・テンプレート内のレイアウト名のいずれかで引く"""
+        if isinstance(ref, str) and ref in DEFAULT_LAYOUT_MAP and not any(l.name == ref for l in self.layouts):
+            ref = DEFAULT_LAYOUT_MAP[ref]
+        for layout in self.layouts:
+            if layout.index == ref or layout.name == ref:
+                return layout
+        raise KeyError(ref)
+
+
+class TemplateBinding(NamedTuple):
+    """テーマの template 設定をテンプレートに当てはめた結果（スライド種別 -> レイアウト）"""
+    template: SlideTemplate
+    blank_index: int
+    slide_layouts: Dict[str, LayoutInfo]
+    placeholders: Dict[str, Dict[str, Tuple[str, ...]]]
+
+
+def _index_layout(index: int, layout) -> LayoutInfo:
+    placeholders, seen = [], {}
+    for ph in layout.placeholders:
+        role = PLACEHOLDER_ROLES.get(ph.placeholder_format.type)
+        if role is None:
+            continue
+        seen[role] = seen.get(role, 0) + 1
+        if seen[role] > 1:
+            role = f"{role}{seen[role]}"
+        # 位置を持たないプレースホルダーはマスターから継承した値になる
+        placeholders.append(Placeholder(role, ph.placeholder_format.idx,
+                                        int(ph.left or 0), int(ph.top or 0), int(ph.width or 0), int(ph.height or 0)))
+    return LayoutInfo(index, layout.name, tuple(placeholders))
+
+
+def _as_pptx(data: bytes) -> bytes:
+    """.potx の [Content_Types].xml を .pptx として開けるように書き換える（.pptx はそのまま）"""
+    with zipfile.ZipFile(io.BytesIO(data)) as src:
+        content_types = src.read("[Content_Types].xml")
+        if _TEMPLATE_CONTENT_TYPE not in content_types:
+            return data
+        out = io.BytesIO()
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as dst:
+            for item in src.infolist():
+                body = src.read(item.filename)
+                if item.filename == "[Content_Types].xml":
+                    body = content_types.replace(_TEMPLATE_CONTENT_TYPE, _PRESENTATION_CONTENT_TYPE)
+                dst.writestr(item, body)
+    return out.getvalue()
+
+
+def _file_digest(path: str) -> Tuple[str, Optional[bytes]]:
+    """ファイルの sha256 を返す（stat が前回と同じでパース済みなら読み込まず、内容は None）"""
+    st = os.stat(path)
+    stat_key = (st.st_mtime_ns, st.st_size)
+    cached = _template_stats.get(path)
+    if cached is not None and cached[0] == stat_key and cached[1] in _templates:
+        return cached[1], None
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    _template_stats[path] = (stat_key, digest)
+    return digest, data
+
+
+def load_template(path: Optional[str] = None) -> SlideTemplate:
+    """テンプレートファイルを読み込む（None なら python-pptx 同梱の既定テンプレート）"""
+    digest, data = ("default", None) if path is None else _file_digest(path)
+    template = _templates.get(digest)
+    if template is None:
+        with _lock:
+            template = _templates.get(digest)
+            if template is None:
+                template = _templates[digest] = SlideTemplate(digest, path, None if data is None else _as_pptx(data))
+                counters["template_parses"] += 1
+    return template
+
+
+def template_for(theme) -> TemplateBinding:
+    """テーマの template 設定（無ければ既定テンプレート）を解決して返す"""
+    config = theme.template or {}
+    template = load_template(config.get("file"))
+    key = (theme.name, theme.fingerprint, template.digest)
+    binding = _bindings.get(key)
+    if binding is None:
+        layouts = config.get("layouts", {})
+        try:
+            blank = template.layout(layouts.get("blank", "blank"))
+            slide_layouts = {t: template.layout(ref) for t, ref in layouts.items() if t != "blank"}
+        except KeyError as e:
+            names = ", ".join(l.name for l in template.layouts)
+            raise ThemeError(f"テーマ {theme.name}: テンプレートにレイアウト {e.args[0]!r} がありません"
+                             f"（{template.path}: {names}）") from None
+        binding = _bindings[key] = TemplateBinding(
+            template, blank.index, slide_layouts,
+            {t: {role: tuple(fields) for role, fields in roles.items()}
+             for t, roles in config.get("placeholders", {}).items()},
+        )
+    return binding
+
+
+def asset_digest(theme, resolve_path: Callable[[str], str]) -> str:
+    """
+    テーマの静的アセットの内容ハッシュをまとめたもの（ファイルの stat が変わらなければ読み直さない）
+    読めないアセットは「読めない」ことをキーにする（後から置かれたら作り直す）
+    """
+    parts = []
+    for asset in theme.asset_paths():
+        path = resolve_path(asset)
+        try:
+            st = os.stat(path)
+        except OSError:
+            parts.append(f"{asset}=!unavailable")
+            continue
+        stat_key = (st.st_mtime_ns, st.st_size)
+        cached = _asset_stats.get(path)
+        if cached is None or cached[0] != stat_key:
+            try:
+                cached = _asset_stats[path] = (stat_key, content_hash(read_local_image(path)))
+            except OSError:
+                parts.append(f"{asset}=!unavailable")
+                continue
+        parts.append(f"{asset}={cached[1]}")
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:16] if parts else "none"
+
+
+def _template_key(theme, width: int, height: int, digest: str, assets: str) -> Tuple:
+    return (theme.name, int(width), int(height), digest, assets)
+
+
+def _build_base(theme, binding: TemplateBinding, width: int, height: int, resolve_path: Callable[[str], str]):
+    prs = binding.template.open()
+    if binding.template.path is not None and binding.template.slide_size != (width, height):
+        # テンプレートのプレースホルダーはテンプレートのスライドサイズで配置されている
+        print(f"[WARN] テンプレートのスライドサイズ {binding.template.slide_size} が {(width, height)} と異なります: "
+              f"{binding.template.path}", file=sys.stderr, flush=True)
+    prs.slide_width = width
+    prs.slide_height = height
+
+    def load_asset(asset):
+        try:
+            return read_local_image(resolve_path(asset))
+        except OSError as e:
+            print(f"[WARN] テーマ画像を読み込めません: {asset} -> {repr(e)}", file=sys.stderr, flush=True)
+            return None
+
+    # テーマの静的アセットを先読み（以後のリクエストはメモリから読む）
+    for asset in theme.static_assets:
+        load_asset(asset)
+
+    # 装飾入りのスライドレイアウトを生成（ベースごと複製されるので、デッキごとには作らない）
+    theme.prepare_template(prs, load_asset, binding.blank_index)
+
+    # python-pptx はコレクション（slide_layouts など）を子要素ごとキャッシュするので、そのまま deepcopy すると
+    # 複製側のキャッシュがツリーから切り離されたコピーになる。保存して読み直し、キャッシュの無い状態で持つ
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    buffer.seek(0)
+    return Presentation(buffer)
+
+
+def get_base_presentation(theme, width: int, height: int, resolve_path: Callable[[str], str]):
+    """テーマ・スライドサイズごとのベースを返す（初回のみ構築。呼び出し側で変更しないこと）"""
+    binding = template_for(theme)
+    key = _template_key(theme, width, height, binding.template.digest, asset_digest(theme, resolve_path))
+    base = _bases.get(key)
+    if base is None:
+        with _lock:
+            base = _bases.get(key)
+            if base is None:
+                t0 = time.perf_counter()
+                base = _build_base(theme, binding, width, height, resolve_path)
+                # 同じテーマ・サイズの古いベース（アセットやテンプレートの差し替え前）は捨てる
+                for old in [k for k in _bases if k[:3] == key[:3]]:
+                    del _bases[old]
+                _bases[key] = base
+                counters["builds"] += 1
+                counters["build_ms"] += (time.perf_counter() - t0) * 1000
+    return base
+
+
+def new_presentation(theme, width: int, height: int, resolve_path: Callable[[str], str]):
+    """準備済みベースを複製して新しいプレゼンテーションを返す"""
+    base = get_base_presentation(theme, width, height, resolve_path)
+    t0 = time.perf_counter()
+    prs = copy.deepcopy(base)
+    counters["clones"] += 1
+    counters["clone_ms"] += (time.perf_counter() - t0) * 1000
+    return prs
+
+
+def clear():
+    with _lock:
+        _bases.clear()
+        _templates.clear()
+        _template_stats.clear()
+        _asset_stats.clear()
+        _bindings.clear()
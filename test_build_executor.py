@@ -0,0 +1,44 @@
+# test_build_executor.py
+"""
+プロセスプールのワーカーが異常終了しても、次のビルドはプールを作り直して通る
+"""
+import asyncio
+import os
+import signal
+
+import pytest
+
+from build_executor import BuildExecutor
+
+PLAN = {"slides": [{"type": "title", "title": "ワーカー再起動"}]}
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    monkeypatch.setenv("DECK_CACHE", "0")
+    monkeypatch.setenv("SLIDE_CACHE", "0")
+    monkeypatch.setenv("BUILD_WARMUP", "0")
+    ex = BuildExecutor("process", workers=1)
+    yield ex
+    ex.shutdown()
+
+
+def _kill_worker(ex):
+    pool = ex._get_pool()
+    pid = pool.submit(os.getpid).result()
+    os.kill(pid, signal.SIGKILL)
+    return pool
+
+
+def test_run_recovers_from_killed_worker(executor):
+    broken = _kill_worker(executor)
+
+    info = asyncio.run(executor.run(PLAN, None, "default"))
+    assert info["data"].startswith(b"PK")
+    assert executor._pool is not broken
+
+    # 作り直したプールは続くビルドでもそのまま使える
+    pool = executor._pool
+    info = asyncio.run(executor.run(PLAN, None, "default"))
+    assert info["data"].startswith(b"PK")
+    assert executor._pool is pool
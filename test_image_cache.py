@@ -0,0 +1,27 @@
+# test_image_cache.py
+"""
+URL 索引のメモリ上の件数上限と、溢れたエントリのディスク索引からの読み直し
+"""
+from image_cache import ImageCache
+
+
+def test_index_is_bounded_and_falls_back_to_disk(tmp_path):
+    cache = ImageCache(cache_dir=str(tmp_path), index_entries=3)
+    urls = [f"https://example.com/{i}.png" for i in range(10)]
+    for i, url in enumerate(urls):
+        cache.put(url, b"image-%d" % i)
+
+    assert len(cache._index) == 3
+    assert cache.stats()["index_evictions"] == 7
+    # メモリの索引から外れた URL もディスクの索引から引ける
+    assert cache.get(urls[0]) == b"image-0"
+    assert len(cache._index) == 3
+
+
+def test_index_bound_without_disk_layer():
+    cache = ImageCache(cache_dir=None, index_entries=2)
+    for i in range(5):
+        cache.put(f"k{i}", b"v%d" % i)
+    assert list(cache._index) == ["k3", "k4"]
+    assert cache.get("k0") is None
+    assert cache.get("k4") == b"v4"
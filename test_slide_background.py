@@ -0,0 +1,54 @@
+# test_slide_background.py
+"""
+スライド固有の background-image
+- 画像はスライドの背景（p:bg の画像塗り）になり、図形として置かない
+- そのためレイアウト側の装飾（simplenote の帯画像・罫線）が背景画像に隠れない
+"""
+import io
+
+import pytest
+from PIL import Image
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.oxml.ns import qn
+
+
+@pytest.fixture(autouse=True)
+def _no_cache(monkeypatch):
+    monkeypatch.setenv("DECK_CACHE", "0")
+    monkeypatch.setenv("SLIDE_CACHE", "0")
+
+
+@pytest.fixture
+def background_png(tmp_path):
+    path = tmp_path / "background.png"
+    Image.new("RGB", (64, 36), (200, 30, 30)).save(path)
+    return str(path)
+
+
+def _build(spec, themename):
+    from json2Slide import build_pptx_from_plan
+
+    out = io.BytesIO()
+    build_pptx_from_plan({"slides": [spec]}, out, themename=themename)
+    out.seek(0)
+    return Presentation(out).slides[0]
+
+
+def test_background_image_is_slide_background(background_png):
+    slide = _build({"type": "content", "title": "背景つき", "points": ["本文"],
+                    "background-image": background_png}, "simplenote")
+
+    # 背景は画像塗り（レイアウトの図形はこの上に描かれる）
+    blip = slide._element.cSld.bg.find(f"{qn('p:bgPr')}/{qn('a:blipFill')}/{qn('a:blip')}")
+    assert blip is not None
+    assert slide.part.related_part(blip.get(qn("r:embed"))).content_type == "image/png"
+
+    # スライド全面を覆う画像図形は置かない
+    assert not [shape for shape in slide.shapes if shape.shape_type == MSO_SHAPE_TYPE.PICTURE]
+
+    # 帯画像・罫線はレイアウトにあり、表示される
+    layout = slide.slide_layout
+    assert layout.name.startswith("simplenote:")
+    assert "side_image" in layout.name and "rule" in layout.name
+    assert [shape for shape in layout.shapes if shape.shape_type == MSO_SHAPE_TYPE.PICTURE]
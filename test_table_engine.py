@@ -0,0 +1,114 @@
+# test_table_engine.py
+"""
+表スライドの行の高さの見積もり・ページ分割と、分割した表スライドの組み立て
+"""
+import io
+import random
+
+import pytest
+from pptx import Presentation
+from pptx.util import Pt
+
+import table_engine
+
+
+# ---- row_height ----
+def test_row_height_grows_with_wrapping_and_newlines():
+    width, size = Pt(200), table_engine.BODY_SIZE
+    one = table_engine.row_height(["短い"], width, size)
+    assert table_engine.row_height([""], width, size) == one
+    assert table_engine.row_height([None, 3], width, size) == one
+    # 折り返し・改行で行数が増え、最も高いセルに合わせる
+    assert table_engine.row_height(["長い文章" * 20], width, size) > one
+    assert table_engine.row_height(["1\n2\n3"], width, size) == table_engine.row_height(["1", "a\nb\nc"], width, size)
+    assert table_engine.row_height(["1\n2\n3"], width, size) > table_engine.row_height(["1\n2"], width, size)
+
+
+# ---- paginate ----
+def _check_pages(header_h, heights, capacity, last_capacity, pages):
+    # 先頭から末尾まで、隙間も重なりもなく続く（各ページ1行以上）
+    assert pages[0][0] == 0 and pages[-1][1] == len(heights)
+    for (_, end), (start, _) in zip(pages, pages[1:]):
+        assert end == start
+    for start, end in pages:
+        assert end > start or len(heights) == 0
+
+    for i, (start, end) in enumerate(pages):
+        used = header_h + sum(heights[start:end])
+        limit = last_capacity if i == len(pages) - 1 else capacity
+        # 1行だけで溢れる行はそのまま置く
+        assert used <= limit or end - start == 1
+
+
+def test_paginate_properties():
+    rng = random.Random(20261018)
+    for _ in range(3000):
+        header_h = rng.randint(10, 60)
+        capacity = rng.randint(200, 600)
+        last_capacity = rng.randint(header_h + 60, capacity)
+        # どの行も見出し行と合わせて最後のページに収まる高さ
+        heights = [rng.randint(5, last_capacity - header_h) for _ in range(rng.randint(0, 80))]
+        pages = table_engine.paginate(header_h, heights, capacity, last_capacity)
+        _check_pages(header_h, heights, capacity, last_capacity, pages)
+
+
+def test_paginate_single_page_and_oversized_row():
+    assert table_engine.paginate(20, [10, 10], 100, 100) == [(0, 2)]
+    assert table_engine.paginate(20, [], 100, 100) == [(0, 0)]
+    # 1行で溢れる行は1ページに1行
+    assert table_engine.paginate(20, [10, 500, 10], 100, 100) == [(0, 1), (1, 2), (2, 3)]
+
+
+# ---- render_table ----
+@pytest.fixture(autouse=True)
+def _no_cache(monkeypatch):
+    monkeypatch.setenv("DECK_CACHE", "0")
+    monkeypatch.setenv("SLIDE_CACHE", "0")
+
+
+def _build(spec, themename="default"):
+    from json2Slide import build_pptx_from_plan
+
+    out = io.BytesIO()
+    build_pptx_from_plan({"slides": [spec]}, out, themename=themename)
+    out.seek(0)
+    return list(Presentation(out).slides)
+
+
+def _texts(slide):
+    return [shape.text_frame.text for shape in slide.shapes if shape.has_text_frame]
+
+
+def _table(slide):
+    return next(shape.table for shape in slide.shapes if shape.has_table)
+
+
+@pytest.mark.parametrize("themename", ["default", "simplenote"])
+def test_long_table_is_split_across_slides(themename):
+    headers = ["項目", "内容", "担当"]
+    rows = [[f"項目{i}", f"内容{i}", f"担当{i}"] for i in range(60)]
+    slides = _build({"type": "table", "title": "一覧表", "headers": headers, "rows": rows,
+                     "bodyText": "まとめの本文", "note": "読み上げ"}, themename)
+
+    n = len(slides)
+    assert n > 1
+    seen = []
+    for i, slide in enumerate(slides, 1):
+        texts = _texts(slide)
+        assert f"一覧表（{i}/{n}）" in texts
+        # 見出し行は各ページで繰り返す
+        table = _table(slide)
+        assert [cell.text for cell in table.rows[0].cells] == headers
+        seen += [[cell.text for cell in row.cells] for row in list(table.rows)[1:]]
+        # ノートは先頭、本文は最後のスライドだけ
+        assert slide.has_notes_slide == (i == 1)
+        assert ("まとめの本文" in texts) == (i == n)
+
+    assert seen == rows
+    assert slides[0].notes_slide.notes_text_frame.text == "読み上げ"
+
+
+def test_short_table_stays_on_one_slide():
+    slides = _build({"type": "table", "title": "小さな表", "headers": ["a", "b"], "rows": [["1", "2"]]})
+    assert len(slides) == 1
+    assert "小さな表" in _texts(slides[0])
@@ -0,0 +1,64 @@
+# test_template_placeholders.py
+"""
+テンプレートのレイアウトに割り当てたスライド種別のプレースホルダー
+- compare は既定テンプレートの Two Content / Comparison の本文の枠に左右の見出し・項目を入れる
+- どの枠にも入らなかった項目は警告する
+"""
+import io
+import json
+import shutil
+
+import pytest
+from pptx import Presentation
+
+import theme_registry
+
+COMPARE = {"type": "compare", "title": "旧来運用と新運用",
+           "leftTitle": "旧来運用", "leftItems": ["属人", "再現性が低い"],
+           "rightTitle": "新運用", "rightItems": ["標準化", "引き継ぎが容易"]}
+
+
+@pytest.fixture
+def template_theme(tmp_path, monkeypatch):
+    """既定テンプレートの .pptx をベースにした default の派生テーマ "stock" を使えるようにする"""
+    monkeypatch.setenv("DECK_CACHE", "0")
+    monkeypatch.setenv("SLIDE_CACHE", "0")
+    shutil.copy(f"{theme_registry.DEFAULT_THEMES_DIR}/default.json", tmp_path / "default.json")
+    stock = Presentation()
+    stock.slide_width, stock.slide_height = 12188952, 6858000
+    stock.save(tmp_path / "stock.pptx")
+
+    def use_layouts(layouts):
+        (tmp_path / "stock.json").write_text(json.dumps({
+            "extends": "default",
+            "template": {"file": "stock.pptx", "layouts": layouts},
+        }), encoding="utf-8")
+        monkeypatch.setattr(theme_registry, "_shared_registry", theme_registry.ThemeRegistry(str(tmp_path)))
+        return "stock"
+
+    return use_layouts
+
+
+def _placeholder_texts(spec, themename):
+    from json2Slide import build_pptx_from_plan
+
+    out = io.BytesIO()
+    build_pptx_from_plan({"slides": [spec]}, out, themename=themename)
+    out.seek(0)
+    slide = Presentation(out).slides[0]
+    return [shape.text_frame.text for shape in slide.placeholders]
+
+
+def test_compare_on_comparison_layout(template_theme, capsys):
+    texts = _placeholder_texts(COMPARE, template_theme({"compare": "comparison"}))
+    assert texts == ["旧来運用と新運用", "旧来運用", "属人\n再現性が低い", "新運用", "標準化\n引き継ぎが容易"]
+    assert "項目を省きました" not in capsys.readouterr().err
+
+
+def test_compare_on_two_content_layout(template_theme, capsys):
+    texts = _placeholder_texts(dict(COMPARE, bodyText="まとめ"), template_theme({"compare": "two_content"}))
+    assert texts == ["旧来運用と新運用", "属人\n再現性が低い", "標準化\n引き継ぎが容易"]
+    # 入らなかった見出しと bodyText は警告に出る
+    err = capsys.readouterr().err
+    assert "項目を省きました" in err
+    assert "leftTitle" in err and "rightTitle" in err and "bodyText" in err
@@ -0,0 +1,52 @@
+# test_untitled_titles.py
+"""
+タイトルの無いスライドの見出し
+- simplenote は共通レンダラーの既定の見出し（「一覧」など）を描かない
+- 既定テーマは従来どおり既定の見出しを描く
+"""
+import io
+
+import pytest
+from pptx import Presentation
+
+from json2Slide import build_pptx_from_plan
+
+# スライド種別 -> (タイトルを除いた設計図, レンダラーの既定の見出し)
+UNTITLED_SLIDES = {
+    "cards": ({"type": "cards", "items": [{"title": "管理者の可視化", "desc": "指標で状況を把握"}], "columns": 1}, "一覧"),
+    "compare": ({"type": "compare", "leftTitle": "旧来運用", "leftItems": ["属人"],
+                 "rightTitle": "新運用", "rightItems": ["標準"]}, "比較"),
+    "progress": ({"type": "progress", "items": [{"label": "要件定義", "percent": 25}]}, "進捗状況"),
+    "features": ({"type": "features", "items": [{"title": "現場適合", "desc": "運用に乗る標準化"}]}, "特徴"),
+}
+
+
+@pytest.fixture(autouse=True)
+def _no_cache(monkeypatch):
+    monkeypatch.setenv("DECK_CACHE", "0")
+    monkeypatch.setenv("SLIDE_CACHE", "0")
+
+
+def _slide_texts(spec, themename):
+    out = io.BytesIO()
+    build_pptx_from_plan({"slides": [spec]}, out, themename=themename)
+    out.seek(0)
+    slide = Presentation(out).slides[0]
+    return [shape.text_frame.text for shape in slide.shapes if shape.has_text_frame]
+
+
+@pytest.mark.parametrize("slide_type", sorted(UNTITLED_SLIDES))
+def test_simplenote_omits_fallback_title(slide_type):
+    spec, fallback = UNTITLED_SLIDES[slide_type]
+    assert fallback not in _slide_texts(spec, "simplenote")
+
+
+@pytest.mark.parametrize("slide_type", sorted(UNTITLED_SLIDES))
+def test_default_theme_keeps_fallback_title(slide_type):
+    spec, fallback = UNTITLED_SLIDES[slide_type]
+    assert fallback in _slide_texts(spec, "default")
+
+
+def test_simplenote_draws_given_title():
+    spec, _ = UNTITLED_SLIDES["cards"]
+    assert "導入メリット" in _slide_texts(dict(spec, title="導入メリット"), "simplenote")
@@ -0,0 +1,152 @@
+# text_styles.py
+"""
+テキストの書式（a:rPr）の共有
+- テーマのフォントとパレットの本文色を、デッキの既定テキストスタイル（presentation.xml の
+  defaultTextStyle。テキストボックスが継承する）に書き込む
+- ランの書式は (サイズ, 太字, 斜体, 色, フォント) ごとに1度だけ a:rPr を組み立て、以後は複製して差し込む
+  （python-pptx のプロパティ経由で1項目ずつ設定しない）
+- テキストボックスのランには既定と同じ項目（テーマのフォント・本文色・太字/斜体なし）を省いた a:rPr を使う
+  図形（p:style のフォント参照が優先される）と表のセル（表スタイルが優先される）は既定を継承しないので、
+  全項目を書いた a:rPr を使う
+- 表のセルのように XML を文字列でまとめて組み立てる側には、同じ a:rPr を文字列で渡す（TextStyler.rpr_xml）
+- 省いたバイト数を数え、ビルド情報（metrics.text_styles）で返す
+"""
+import copy
+
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+from xml.sax.saxutils import quoteattr
+
+from lxml import etree
+
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls, qn
+
+# 既定テンプレートのテキストボックスが元々継承していた値（テーマ指定のないランはこれを明示して見た目を保つ）
+_TEMPLATE_FONT = "+mn-lt"
+_TEMPLATE_COLOR = '<a:schemeClr val="tx1"/>'
+
+
+def _rpr_xml(size: int, bold, italic, color: Optional[str], font: Optional[str],
+             default_color: Optional[str] = None, default_font: Optional[str] = None) -> str:
+    """
+    a:rPr の XML を組み立てる
+    default_* を渡すとテキストボックス用に、既定と同じ項目を省く（渡さなければ全項目を書く）
+    """
+    elide = default_font is not None
+    attrs = [f'sz="{int(size) // 127}"'] if size else []
+    for name, value in (("b", bold), ("i", italic)):
+        if value is not None and (value or not elide):
+            attrs.append(f'{name}="{int(bool(value))}"')
+
+    children = []
+    if color is not None and color != default_color:
+        children.append(f'<a:solidFill><a:srgbClr val="{color}"/></a:solidFill>')
+    elif color is None and elide:
+        children.append(f"<a:solidFill>{_TEMPLATE_COLOR}</a:solidFill>")
+    if font is not None and font != default_font:
+        children.append(f"<a:latin typeface={quoteattr(font)}/>")
+    elif font is None and elide:
+        children.append(f'<a:latin typeface="{_TEMPLATE_FONT}"/>')
+
+    return f'<a:rPr {nsdecls("a")} {" ".join(attrs)}>{"".join(children)}</a:rPr>'
+
+
+@lru_cache(maxsize=1024)
+def _compile(size: int, bold, italic, color: Optional[str], font: Optional[str],
+             default_color: Optional[str], default_font: Optional[str]) -> Tuple[object, object, int, int]:
+    """(全項目の rPr, テキストボックス用の rPr, それぞれのシリアライズ後のバイト数) を返す"""
+    full = parse_xml(_rpr_xml(size, bold, italic, color, font))
+    box = parse_xml(_rpr_xml(size, bold, italic, color, font, default_color, default_font))
+    # 名前空間宣言は保存時には親要素に寄るので、バイト数からは除く
+    decl = len(f' {nsdecls("a")}')
+    return full, box, len(etree.tostring(full)) - decl, len(etree.tostring(box)) - decl
+
+
+@lru_cache(maxsize=256)
+def _rpr_string(size: int, bold, italic, color: Optional[str], font: Optional[str]) -> str:
+    """全項目の a:rPr の XML 文字列（名前空間宣言なし。親要素の宣言を使う）"""
+    return _rpr_xml(size, bold, italic, color, font).replace(f' {nsdecls("a")}', "", 1)
+
+
+def _inherits_default(r) -> bool:
+    """ランが既定テキストスタイルを継承するか（p:style を持たない p:sp のテキスト = テキストボックス）"""
+    txBody = r.getparent().getparent()
+    host = txBody.getparent() if txBody is not None else None
+    return host is not None and host.tag == qn("p:sp") and host.find(qn("p:style")) is None
+
+
+def _replace_rpr(r, rPr):
+    old = r.find(qn("a:rPr"))
+    if old is not None:
+        r.remove(old)
+    r.insert(0, copy.deepcopy(rPr))
+
+
+def style_run(run, size, bold=None, italic=None, color=None, font=None):
+    """既定テキストスタイルを前提にせず、全項目を書いた書式をランに設定する"""
+    rPr, _, _, _ = _compile(size, bold, italic, None if color is None else str(color), font, None, None)
+    _replace_rpr(run._r, rPr)
+
+
+def set_default_text_style(prs, font: str, color) -> None:
+    """デッキの既定テキストスタイル（全レベル）のフォントと色をテーマのものにする"""
+    style = prs.part._element.find(qn("p:defaultTextStyle"))
+    if style is None:
+        return
+    for pPr in style:
+        defRPr = pPr.find(qn("a:defRPr"))
+        if defRPr is None:
+            continue
+        for tag in ("a:solidFill", "a:latin"):
+            for old in defRPr.findall(qn(tag)):
+                defRPr.remove(old)
+        fill = parse_xml(f'<a:solidFill {nsdecls("a")}><a:srgbClr val="{color}"/></a:solidFill>')
+        latin = parse_xml(f'<a:latin {nsdecls("a")} typeface={quoteattr(font)}/>')
+        # a:defRPr の子要素の順序（ln → 塗り → ... → latin → ea → cs）を守る
+        ln = defRPr.find(qn("a:ln"))
+        defRPr.insert(0 if ln is None else defRPr.index(ln) + 1, fill)
+        ea = defRPr.find(qn("a:ea"))
+        if ea is not None:
+            ea.addprevious(latin)
+        else:
+            defRPr.insert(defRPr.index(fill) + 1, latin)
+
+
+class TextStyler:
+    """デッキごとの書式適用（既定テキストスタイルを設定し、ランには共有の rPr を複製して差し込む）"""
+
+    def __init__(self, prs, font: str, color):
+        self.font = font
+        self.color = str(color)
+        set_default_text_style(prs, self.font, self.color)
+        self.stats: Dict[str, int] = {"runs": 0, "rpr_bytes": 0, "saved_bytes": 0}
+
+    def apply(self, run, size, bold=None, italic=None, color=None, font=None):
+        """
+        ランに書式を設定する（run.font.* を個別に設定するのと同じ見た目）
+        font / color を省略すると、そのランはテーマではなくテンプレート本来の既定（+mn-lt / tx1）になる
+        """
+        full, box, full_bytes, box_bytes = _compile(
+            size, bold, italic, None if color is None else str(color), font, self.color, self.font
+        )
+        r = run._r
+        if _inherits_default(r):
+            _replace_rpr(r, box)
+            self.stats["rpr_bytes"] += box_bytes
+            self.stats["saved_bytes"] += full_bytes - box_bytes
+        else:
+            _replace_rpr(r, full)
+            self.stats["rpr_bytes"] += full_bytes
+        self.stats["runs"] += 1
+
+    def rpr_xml(self, runs: int, size, bold=None, italic=None, color=None, font=None) -> str:
+        """
+        runs 個のランにまとめて使う、全項目を書いた a:rPr の XML 文字列を返す（集計にも加える）
+        既定テキストスタイルを継承しない表のセルなどを、XML を一括で組み立てて作る場合に使う
+        """
+        color = None if color is None else str(color)
+        _, _, full_bytes, _ = _compile(size, bold, italic, color, font, self.color, self.font)
+        self.stats["runs"] += runs
+        self.stats["rpr_bytes"] += full_bytes * runs
+        return _rpr_string(size, bold, italic, color, font)
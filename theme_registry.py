@@ -0,0 +1,335 @@
+# theme_registry.py
+"""
+テーマレジストリ
+- テーマ定義（配色パレット・フォント・POS_PX 座標・装飾とスライド種別ごとの使い方）を
+  themes/*.json から1度だけ読み込んで検証する
+- 色は RGBColor、フォントサイズは Pt、座標はアスペクト比（16:9 / 16:10 / 4:3 など）ごとの
+  EMU 整数の矩形に変換した状態で保持する（アスペクト比ごとに pos_px を上書きできる）
+- get_theme(name) はプロセス内で共有するテーマオブジェクト（変更不可）を返す
+  （リクエストごとのテーマ生成・色の解析・座標計算をしない）
+- "extends" で別テーマの定義を引き継げる（辞書は再帰的にマージ）
+- "template" で .pptx / .potx をベースにし、スライド種別をそのレイアウト・プレースホルダーに割り当てられる
+  （file はテーマ定義のディレクトリからの相対パス。レイアウトの解決は template_cache がベース準備時に行う）
+- THEMES_DIR でテーマ定義の置き場所を変えられる
+"""
+import hashlib
+import importlib
+import json
+import os
+import re
+import sys
+import threading
+
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, NamedTuple, Optional
+
+from pptx.dml.color import RGBColor
+from pptx.util import Emu, Inches, Pt
+
+from deck_cache import canonical_json
+
+DEFAULT_THEMES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "themes")
+DEFAULT_THEME = "default"
+DEFAULT_PALETTE = "Default"
+DEFAULT_ASPECT = "16:9"
+
+PALETTE_KEYS = ("primary", "accent", "background", "surface", "text", "subtext", "ghost")
+FONT_SIZE_KEYS = ("title", "sectionTitle", "contentTitle", "subhead", "body", "caption", "ghostNum")
+RECT_KEYS = ("left", "top", "width", "height")
+
+_HEX_COLOR = re.compile(r"^#[0-9A-Fa-f]{6}$")
+
+
+class ThemeError(ValueError):
+    """テーマ定義ファイルの内容が不正"""
+
+
+def _freeze(value):
+    """辞書・リストを読み取り専用に変換する（共有テーマを誤って書き換えないように）"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    merged = dict(base)
+    for k, v in override.items():
+        if isinstance(v, dict) and isinstance(merged.get(k), dict):
+            merged[k] = _merge(merged[k], v)
+        else:
+            merged[k] = v
+    return merged
+
+
+def _parse_color(value: str, where: str) -> RGBColor:
+    if not isinstance(value, str) or not _HEX_COLOR.match(value):
+        raise ThemeError(f"{where}: 色は #RRGGBB 形式で指定してください: {value!r}")
+    return RGBColor.from_string(value[1:].upper())
+
+
+# ---------------- 座標 ----------------
+class Rect(NamedTuple):
+    """スライド上の矩形（EMU の整数）"""
+    left: int
+    top: int
+    width: int
+    height: int
+
+
+class LayoutManager:
+    """
+    POS_PX（BASE_PX 基準の px）を、スライドサイズに合わせた EMU 整数の矩形に変換した表
+    全パスを生成時に1度だけ変換するので、get_rect は辞書を引くだけ（描画側ごとの丸めの差も出ない）
+    """
+    __slots__ = ("aspect", "page_w", "page_h", "_rects")
+
+    def __init__(self, base_px, pos_px, page_w: int, page_h: int, aspect: str = DEFAULT_ASPECT):
+        self.aspect = aspect
+        self.page_w = Emu(page_w)
+        self.page_h = Emu(page_h)
+        rects = {}
+        self._compile(pos_px, "", base_px["W"], base_px["H"], rects)
+        self._rects = MappingProxyType(rects)
+
+    def _compile(self, node, prefix: str, base_w, base_h, rects):
+        for name, pos in node.items():
+            path = f"{prefix}{name}"
+            if all(k in pos for k in RECT_KEYS):
+                # px -> EMU を1回の掛け算・割り算で行い、最後に1度だけ丸める
+                rects[path] = Rect(
+                    round(pos["left"] * self.page_w / base_w),
+                    round(pos["top"] * self.page_h / base_h),
+                    round(pos["width"] * self.page_w / base_w),
+                    round(pos["height"] * self.page_h / base_h),
+                )
+            else:
+                self._compile(pos, path + ".", base_w, base_h, rects)
+
+    def get_rect(self, path: str) -> Rect:
+        try:
+            return self._rects[path]
+        except KeyError:
+            raise KeyError(f"POS_PX に {path} がありません") from None
+
+    def paths(self):
+        return tuple(self._rects)
+
+
+# ---------------- 読み込みと検証 ----------------
+def _validate(name: str, definition: Dict[str, Any]):
+    where = f"テーマ {name}"
+    for key in ("renderer", "palettes", "fonts", "base_px", "pos_px"):
+        if key not in definition:
+            raise ThemeError(f"{where}: {key} がありません")
+
+    palettes = definition["palettes"]
+    if DEFAULT_PALETTE not in palettes:
+        raise ThemeError(f"{where}: palettes に {DEFAULT_PALETTE} がありません")
+    for palette_name, palette in palettes.items():
+        missing = [k for k in PALETTE_KEYS if k not in palette]
+        if missing:
+            raise ThemeError(f"{where}: palettes.{palette_name} に {', '.join(missing)} がありません")
+
+    fonts = definition["fonts"]
+    if not isinstance(fonts.get("family"), str):
+        raise ThemeError(f"{where}: fonts.family がありません")
+    for key in FONT_SIZE_KEYS:
+        size = fonts.get("sizes", {}).get(key)
+        if not isinstance(size, (int, float)) or size <= 0:
+            raise ThemeError(f"{where}: fonts.sizes.{key} は正の数で指定してください: {size!r}")
+
+    base = definition["base_px"]
+    if not all(isinstance(base.get(k), (int, float)) and base[k] > 0 for k in ("W", "H")):
+        raise ThemeError(f"{where}: base_px は W / H を正の数で指定してください")
+
+    def check_rects(node, path):
+        if not isinstance(node, dict) or not node:
+            raise ThemeError(f"{where}: pos_px.{path} が不正です")
+        if any(k in node for k in RECT_KEYS):
+            bad = [k for k in RECT_KEYS if not isinstance(node.get(k), (int, float))]
+            if bad:
+                raise ThemeError(f"{where}: pos_px.{path} の {', '.join(bad)} は数値で指定してください")
+            return
+        for k, v in node.items():
+            check_rects(v, f"{path}.{k}" if path else k)
+
+    check_rects(definition["pos_px"], "")
+
+    template = definition.get("template")
+    if template is not None:
+        if not isinstance(template, dict) or not isinstance(template.get("file"), str):
+            raise ThemeError(f"{where}: template.file にテンプレートのパスを指定してください")
+        for slide_type, ref in template.get("layouts", {}).items():
+            if not isinstance(ref, (int, str)) or isinstance(ref, bool):
+                raise ThemeError(f"{where}: template.layouts.{slide_type} はレイアウトの番号か名前で指定してください")
+        for slide_type, roles in template.get("placeholders", {}).items():
+            if not isinstance(roles, dict) or not all(
+                    isinstance(fields, list) and fields and all(isinstance(f, str) for f in fields)
+                    for fields in roles.values()):
+                raise ThemeError(f"{where}: template.placeholders.{slide_type} は "
+                                 f"{{役割: [設計図のキー, ...]}} で指定してください")
+
+    aspects = definition.get("aspects", {})
+    if DEFAULT_ASPECT not in aspects:
+        raise ThemeError(f"{where}: aspects に {DEFAULT_ASPECT} がありません")
+    for aspect, variant in aspects.items():
+        page = variant.get("page_in")
+        if not (isinstance(page, list) and len(page) == 2
+                and all(isinstance(v, (int, float)) and v > 0 for v in page)):
+            raise ThemeError(f"{where}: aspects.{aspect}.page_in は [幅, 高さ]（インチ）で指定してください")
+        if "pos_px" in variant:
+            check_rects(_merge(definition["pos_px"], variant["pos_px"]), "")
+
+
+def _load_renderer(name: str, dotted: str):
+    from themes_base import SlideTheme
+
+    module_name, _, class_name = dotted.rpartition(".")
+    try:
+        cls = getattr(importlib.import_module(module_name), class_name)
+    except (ImportError, AttributeError, ValueError) as e:
+        raise ThemeError(f"テーマ {name}: renderer {dotted} を読み込めません: {repr(e)}") from e
+    if not (isinstance(cls, type) and issubclass(cls, SlideTheme)):
+        raise ThemeError(f"テーマ {name}: renderer {dotted} は SlideTheme のサブクラスではありません")
+    return cls
+
+
+def _compile_theme(name: str, definition: Dict[str, Any], themes_dir: str = DEFAULT_THEMES_DIR):
+    """検証済みの定義から共有テーマオブジェクト（renderer クラスのインスタンス）を作る"""
+    _validate(name, definition)
+
+    template = definition.get("template")
+    if template is not None:
+        template = dict(template, file=os.path.abspath(os.path.join(themes_dir, template["file"])))
+        if not os.path.isfile(template["file"]):
+            raise ThemeError(f"テーマ {name}: テンプレートがありません: {template['file']}")
+
+    palettes = {
+        palette_name: MappingProxyType({
+            k: _parse_color(v, f"テーマ {name}: palettes.{palette_name}.{k}") for k, v in palette.items()
+        })
+        for palette_name, palette in definition["palettes"].items()
+    }
+    fonts = MappingProxyType({
+        "family": definition["fonts"]["family"],
+        "sizes": MappingProxyType({k: Pt(v) for k, v in definition["fonts"]["sizes"].items()}),
+    })
+    decorations = {
+        k: _parse_color(v, f"テーマ {name}: decorations.{k}") if isinstance(v, str) and v.startswith("#") else _freeze(v)
+        for k, v in definition.get("decorations", {}).items()
+    }
+
+    cls = _load_renderer(name, definition["renderer"])
+    slide_decorations = definition.get("slide_decorations", {})
+    for slide_type, names in slide_decorations.items():
+        if not isinstance(names, list) or any(n not in cls.decoration_names for n in names):
+            raise ThemeError(f"テーマ {name}: slide_decorations.{slide_type} に未対応の装飾があります: {names!r}"
+                             f"（使えるのは {', '.join(cls.decoration_names) or 'なし'}）")
+
+    return cls(
+        name=name,
+        fingerprint=hashlib.sha256(canonical_json(definition).encode("utf-8")).hexdigest(),
+        palettes=MappingProxyType(palettes),
+        fonts=fonts,
+        layouts=MappingProxyType({
+            aspect: LayoutManager(
+                definition["base_px"],
+                _merge(definition["pos_px"], variant.get("pos_px", {})),
+                Inches(variant["page_in"][0]), Inches(variant["page_in"][1]),
+                aspect,
+            )
+            for aspect, variant in definition["aspects"].items()
+        }),
+        static_assets=tuple(definition.get("static_assets", ())),
+        decorations=MappingProxyType(decorations),
+        slide_decorations=_freeze(slide_decorations),
+        template=_freeze(template),
+    )
+
+
+class ThemeRegistry:
+    def __init__(self, themes_dir: str = DEFAULT_THEMES_DIR):
+        self.themes_dir = themes_dir
+        self._raw = self._read_all()
+        self._themes = {name: _compile_theme(name, self._resolve(name, ()), themes_dir) for name in sorted(self._raw)}
+        if DEFAULT_THEME not in self._themes:
+            raise ThemeError(f"{themes_dir} に {DEFAULT_THEME}.json がありません")
+
+    def _read_all(self) -> Dict[str, Dict[str, Any]]:
+        raw = {}
+        for filename in sorted(os.listdir(self.themes_dir)):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(self.themes_dir, filename)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    definition = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                raise ThemeError(f"テーマ定義を読み込めません: {path} -> {repr(e)}") from e
+            name = definition.get("name") or filename[:-len(".json")]
+            if name in raw:
+                raise ThemeError(f"テーマ名が重複しています: {name} ({path})")
+            raw[name] = definition
+        return raw
+
+    def _resolve(self, name: str, chain) -> Dict[str, Any]:
+        """extends をたどって定義をマージする"""
+        if name in chain:
+            raise ThemeError(f"extends が循環しています: {' -> '.join(chain + (name,))}")
+        if name not in self._raw:
+            raise ThemeError(f"extends 先のテーマがありません: {name}")
+        definition = dict(self._raw[name])
+        parent = definition.pop("extends", None)
+        if parent:
+            definition = _merge(self._resolve(parent, chain + (name,)), definition)
+        definition["name"] = name
+        return definition
+
+    def get(self, name: Optional[str]):
+        theme = self._themes.get(name)
+        if theme is None:
+            print(f"[WARN] 未知のテーマ {name!r} のため {DEFAULT_THEME} を使います", file=sys.stderr, flush=True)
+            theme = self._themes[DEFAULT_THEME]
+        return theme
+
+    def names(self):
+        return tuple(self._themes)
+
+
+_shared_registry = None
+_shared_lock = threading.Lock()
+
+
+def get_registry() -> ThemeRegistry:
+    """プロセス全体で共有するテーマレジストリ（初回に THEMES_DIR から読み込む）"""
+    global _shared_registry
+    if _shared_registry is None:
+        with _shared_lock:
+            if _shared_registry is None:
+                _shared_registry = ThemeRegistry(os.getenv("THEMES_DIR", DEFAULT_THEMES_DIR))
+    return _shared_registry
+
+
+def get_theme(name: Optional[str]):
+    """名前に対応する共有テーマオブジェクトを返す（未知の名前なら default）"""
+    return get_registry().get(name)
+
+
+def theme_names():
+    return get_registry().names()
+
+
+def layout_for(theme, aspect: Optional[str]) -> LayoutManager:
+    """テーマのアスペクト比ごとの座標表（未指定なら 16:9、未知の比率なら警告して 16:9）"""
+    layout = theme.layouts.get(aspect or DEFAULT_ASPECT)
+    if layout is None:
+        print(f"[WARN] 未対応のアスペクト比 {aspect!r} のため {DEFAULT_ASPECT} を使います", file=sys.stderr, flush=True)
+        layout = theme.layouts[DEFAULT_ASPECT]
+    return layout
+
+
+def palette_for(theme, palette_name: Optional[str]) -> Mapping[str, RGBColor]:
+    """テーマの配色パレット（未知の名前なら Default）"""
+    return theme.palettes.get(palette_name) or theme.palettes[DEFAULT_PALETTE]
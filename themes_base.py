@@ -3,14 +3,93 @@
 from abc import ABC, abstractmethod
 from pptx.util import Pt
 
-class SlideTheme(ABC):
+import master_layouts
+import slides_template
 
-    def delete_default_title(self, slide):
-        #DefaultTitleの削除
-        for shape in slide.shapes:
-            if shape.name in ("TitleText", "TitleBar"):
-                sp = shape._element
-                sp.getparent().remove(sp)
+class SlideTheme(ABC):
+    """
+    テーマの描画処理。インスタンスは theme_registry が定義ファイルから1度だけ作り、全リクエストで共有する
+    （配色・フォント・座標・装飾は読み取り専用）
+    """
+
+    # テーマが描ける静的な装飾の名前（定義ファイルの slide_decorations で使える値）
+    decoration_names = ()
+
+    def __init__(self, name, fingerprint, palettes, fonts, layouts, static_assets=(), decorations=None,
+                 slide_decorations=None, template=None):
+        self.name = name
+        self.fingerprint = fingerprint      # 定義内容のハッシュ（キャッシュキーに使う）
+        self.palettes = palettes
+        self.fonts = fonts
+        self.layouts = layouts              # アスペクト比 -> LayoutManager
+        # テーマが毎スライドで使う静的画像（ベーステンプレート準備時に先読みする）
+        self.static_assets = static_assets
+        self.decorations = decorations or {}
+        # スライド種別 -> 装飾の組み合わせ（生成したレイアウトに描いておき、スライドには描かない）
+        self.slide_decorations = slide_decorations or {}
+        # ベースにするテンプレートファイルと、スライド種別 -> レイアウト・プレースホルダーの対応（無ければ None）
+        self.template = template
+        self._frozen = True
+
+    def asset_paths(self):
+        """内容がデッキの見た目に効く静的アセット（内容ハッシュをキャッシュキーに含める）"""
+        return tuple(self.static_assets)
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError(f"共有テーマ {self.name} は変更できません: {name}")
+        super().__setattr__(name, value)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name}>"
+
+    def prepare_template(self, prs, load_asset, blank_index=master_layouts.BLANK_LAYOUT_INDEX):
+        """
+        テーマ共通のベースプレゼンテーションを整える（プロセスで1回だけ呼ばれる）
+        装飾の組み合わせごとに、通常版とマスターの図形（全体背景）を隠す版のレイアウトを
+        テンプレートの Blank レイアウト（blank_index）から作る
+        """
+        for decorations, hide_master_shapes in self._layout_variants():
+            layout = master_layouts.add_layout(
+                prs, master_layouts.layout_name(self.name, decorations, hide_master_shapes), hide_master_shapes,
+                source_index=blank_index
+            )
+            for name in decorations:
+                self.draw_decoration(prs, layout, name, load_asset)
+
+    def _layout_variants(self):
+        for decorations in sorted(set(self.slide_decorations.values()) | {()}):
+            for hide_master_shapes in (False, True):
+                # 装飾なし・マスター表示はテンプレートの Blank レイアウトをそのまま使う
+                if decorations or hide_master_shapes:
+                    yield decorations, hide_master_shapes
+
+    def layout_name(self, slide_type, hide_master_shapes=False):
+        """スライド種別に対応する生成済みレイアウトの名前（None ならテンプレートの Blank レイアウト）"""
+        decorations = self.slide_decorations.get(slide_type, ())
+        if not decorations and not hide_master_shapes:
+            return None
+        return master_layouts.layout_name(self.name, decorations, hide_master_shapes)
+
+    def generated_layout_names(self):
+        """prepare_template が生成するレイアウトの名前（保存前に未使用のものを取り除くのに使う）"""
+        return {master_layouts.layout_name(self.name, decorations, hide)
+                for decorations, hide in self._layout_variants()}
+
+    def draw_decoration(self, prs, layout, name, load_asset):
+        """レイアウトに静的な装飾を描く（load_asset(パス) は画像のバイト列か None を返す）"""
+        raise ValueError(f"テーマ {self.name} は装飾 {name} に対応していません")
+
+    def add_title(self, factory, slide, title, default=None):
+        """
+        共通レンダラーが描くスライドタイトル（既定はアクセントカラーの縦長バー + タイトル）
+        title が無ければ default（「一覧」などのレンダラーの既定の見出し）を描く
+        """
+        factory._add_accent_title(slide, default if title is None else title)
+
+    def render_template(self, factory, data):
+        """テンプレートのレイアウトを割り当てたスライド種別は、プレースホルダーに値を流し込んで描く"""
+        return slides_template.render_template_default(factory, data)
 
     def render_image_auto(self, factory, data):
         """画像の枚数に応じて適切なメソッドを呼び分ける"""